@@ -0,0 +1,249 @@
+"""Admission control for the API.
+
+Every request first passes a per-client token bucket, then waits for one of
+``admission_max_concurrency`` slots. Cheap reads are queued ahead of
+expensive scoring requests, which may only hold a share of the slots, so a
+burst of rent checks can't starve cached page loads. When the expected wait
+for a slot would exceed ``admission_queue_budget_ms`` the request is shed
+right away with 503 and ``Retry-After`` instead of joining a queue it would
+time out in, which keeps tail latency bounded under a spike.
+"""
+
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+
+from api.config import settings
+
+CHEAP, EXPENSIVE = 0, 1
+PRIORITY_NAMES = ("cheap", "expensive")
+
+# Scoring endpoints; everything else is a cached or indexed read
+EXPENSIVE_ROUTES = {("POST", "/api/check")}
+# Never queued or shed: health and readiness checks, the admission stats
+# themselves, and the long-lived event stream, which would otherwise hold a
+# slot per connection
+EXEMPT_PATHS = {"/api/health", "/api/ready", "/api/admission", "/api/events"}
+
+MAX_TRACKED_CLIENTS = 10_000
+
+
+class RejectedError(Exception):
+    def __init__(self, status_code: int, retry_after: float, reason: str):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, now: float) -> float:
+        """Spend a token; returns 0, or the seconds until one is available."""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+@dataclass
+class _ClassStats:
+    limit: int
+    active: int = 0
+    waiting: deque = field(default_factory=deque)
+    # Moving average of seconds a request of this class holds its slot
+    service_time: float = 0.05
+    admitted: int = 0
+    shed: int = 0
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        max_concurrency: int | None = None,
+        queue_budget_ms: float | None = None,
+        client_rps: float | None = None,
+        client_burst: int | None = None,
+        expensive_share: float | None = None,
+        clock=time.monotonic,
+    ):
+        self.max_concurrency = max_concurrency or settings.admission_max_concurrency
+        budget = settings.admission_queue_budget_ms if queue_budget_ms is None else queue_budget_ms
+        self.queue_budget = budget / 1000
+        self.client_rps = client_rps or settings.admission_client_rps
+        self.client_burst = client_burst or settings.admission_client_burst
+        share = settings.admission_expensive_share if expensive_share is None else expensive_share
+        self.clock = clock
+
+        self.active = 0
+        self.classes = (
+            _ClassStats(limit=self.max_concurrency),
+            _ClassStats(limit=max(1, math.floor(self.max_concurrency * share))),
+        )
+        self.clients: OrderedDict[str, TokenBucket] = OrderedDict()
+        self.rate_limited = 0
+
+    def check_client(self, client: str):
+        now = self.clock()
+        bucket = self.clients.pop(client, None) or TokenBucket(
+            self.client_rps, self.client_burst, now
+        )
+        self.clients[client] = bucket
+        if len(self.clients) > MAX_TRACKED_CLIENTS:
+            self.clients.popitem(last=False)
+        wait = bucket.take(now)
+        if wait:
+            self.rate_limited += 1
+            raise RejectedError(429, wait, "Too many requests from this client")
+
+    def _can_start(self, priority: int) -> bool:
+        stats = self.classes[priority]
+        return self.active < self.max_concurrency and stats.active < stats.limit
+
+    def _expected_wait(self, priority: int) -> float:
+        """Rough time until a new request of ``priority`` would get a slot."""
+        ahead = len(self.classes[CHEAP].waiting)
+        per_slot = self.classes[CHEAP].service_time / self.max_concurrency
+        if priority == EXPENSIVE:
+            stats = self.classes[EXPENSIVE]
+            ahead_expensive = len(stats.waiting) + 1
+            return ahead * per_slot + ahead_expensive * stats.service_time / stats.limit
+        return (ahead + 1) * per_slot
+
+    async def acquire(self, priority: int):
+        stats = self.classes[priority]
+        queue_empty = not self.classes[CHEAP].waiting and (priority == CHEAP or not stats.waiting)
+        if queue_empty and self._can_start(priority):
+            self._start(priority)
+            return
+
+        expected = self._expected_wait(priority)
+        if expected > self.queue_budget:
+            stats.shed += 1
+            raise RejectedError(503, expected, "Server busy")
+
+        ticket = asyncio.get_running_loop().create_future()
+        stats.waiting.append(ticket)
+        try:
+            await asyncio.wait_for(asyncio.shield(ticket), self.queue_budget)
+        except TimeoutError:
+            if ticket.done() and not ticket.cancelled():
+                # Granted just as the budget ran out; give the slot back
+                self.release(priority, 0.0)
+            else:
+                ticket.cancel()
+                stats.waiting.remove(ticket)
+            stats.shed += 1
+            raise RejectedError(503, self._expected_wait(priority), "Server busy") from None
+        except BaseException:
+            if ticket.done() and not ticket.cancelled():
+                self.release(priority, 0.0)
+            else:
+                ticket.cancel()
+                if ticket in stats.waiting:
+                    stats.waiting.remove(ticket)
+            raise
+
+    def _start(self, priority: int):
+        self.active += 1
+        self.classes[priority].active += 1
+        self.classes[priority].admitted += 1
+
+    def release(self, priority: int, held: float):
+        stats = self.classes[priority]
+        self.active -= 1
+        stats.active -= 1
+        if held:
+            stats.service_time += 0.1 * (held - stats.service_time)
+        # Hand freed slots to waiters, cheap ones first
+        for waiting_priority in (CHEAP, EXPENSIVE):
+            waiting = self.classes[waiting_priority].waiting
+            while waiting and self._can_start(waiting_priority):
+                ticket = waiting.popleft()
+                if not ticket.done():
+                    self._start(waiting_priority)
+                    ticket.set_result(None)
+
+    def stats(self) -> dict:
+        return {
+            "active": self.active,
+            "max_concurrency": self.max_concurrency,
+            "rate_limited": self.rate_limited,
+            "tracked_clients": len(self.clients),
+            **{
+                name: {
+                    "active": stats.active,
+                    "limit": stats.limit,
+                    "queue_depth": len(stats.waiting),
+                    "admitted": stats.admitted,
+                    "shed": stats.shed,
+                    "avg_service_ms": round(stats.service_time * 1000, 1),
+                }
+                for name, stats in zip(PRIORITY_NAMES, self.classes)
+            },
+        }
+
+
+def _client_key(scope) -> str:
+    if settings.admission_trust_forwarded:
+        for name, value in scope.get("headers", ()):
+            if name == b"x-forwarded-for":
+                return value.decode("latin-1").split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying an :class:`AdmissionController` to HTTP requests."""
+
+    def __init__(self, app, controller: AdmissionController | None = None):
+        self.app = app
+        self.controller = controller or admission
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        controller = self.controller
+        priority = EXPENSIVE if (scope["method"], scope["path"]) in EXPENSIVE_ROUTES else CHEAP
+        try:
+            controller.check_client(_client_key(scope))
+            await controller.acquire(priority)
+        except RejectedError as rejected:
+            await _reject(send, rejected)
+            return
+
+        started = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            controller.release(priority, time.monotonic() - started)
+
+
+async def _reject(send, rejected: RejectedError):
+    body = f'{{"detail": "{rejected.reason}"}}'.encode()
+    await send(
+        {
+            "type": "http.response.start",
+            "status": rejected.status_code,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(rejected.retry_after))).encode()),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+admission = AdmissionController()
@@ -0,0 +1,234 @@
+"""City registry.
+
+Every supported city is its own partition: a separate SQLite database with
+its own neighborhoods, listings, data generations and, since derived caches
+and indexes are keyed on the engine, its own caches. Queries and indexes in
+one city never grow with another city's data.
+
+A city also carries what the scrapers and the scorer need to know about it:
+its name as CBS and nadlan.gov.il spell it, its Yad2 codes, and the mapping
+from Hebrew area and street names to our neighborhood ids.
+"""
+
+from dataclasses import dataclass, field
+
+from api.config import settings
+
+
+@dataclass(frozen=True)
+class City:
+    id: str
+    name_en: str
+    # CBS and nadlan.gov.il spelling
+    name_he: str
+    # CBS locality code, which Yad2 also uses as its city filter
+    yad2_city: str
+    lat: float
+    lng: float
+    # Rough city-wide rent, only used when CBS has no figure for the city
+    fallback_rent: int
+    neighborhoods_file: str
+    yad2_area: str | None = None
+    # Yad2 area names -> neighborhood ids
+    neighborhood_map: dict[str, str] = field(default_factory=dict, compare=False, hash=False)
+    # nadlan.gov.il street keywords -> neighborhood ids; production would geocode
+    street_map: dict[str, str] = field(default_factory=dict, compare=False, hash=False)
+    # Hebrew street names -> their English spelling, for autocomplete
+    street_names_en: dict[str, str] = field(default_factory=dict, compare=False, hash=False)
+    # Spellings of the city's name that listing sites add to or drop from addresses
+    address_names: tuple[str, ...] = ()
+
+    def guess_neighborhood(self, *texts: str | None) -> str | None:
+        """First neighborhood whose area or street name appears in ``texts``, in order."""
+        for text in texts:
+            if not text:
+                continue
+            for mapping in (self.neighborhood_map, self.street_map):
+                for name, hood_id in mapping.items():
+                    if name in text:
+                        return hood_id
+        return None
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "name_en": self.name_en,
+            "name_he": self.name_he,
+            "lat": self.lat,
+            "lng": self.lng,
+        }
+
+
+TEL_AVIV = City(
+    id="tel-aviv",
+    name_en="Tel Aviv-Yafo",
+    name_he="\u05ea\u05dc \u05d0\u05d1\u05d9\u05d1-\u05d9\u05e4\u05d5",
+    yad2_city="5000",
+    yad2_area="2",
+    lat=32.08,
+    lng=34.78,
+    fallback_rent=8000,
+    neighborhoods_file="neighborhoods.json",
+    address_names=(
+        "\u05ea\u05dc \u05d0\u05d1\u05d9\u05d1 \u05d9\u05e4\u05d5",  # tel aviv yafo
+        "\u05ea\u05dc \u05d0\u05d1\u05d9\u05d1",  # tel aviv
+        '\u05ea"\u05d0',  # t"a
+        "\u05ea\u05d0",
+        "tel aviv yafo",
+        "tel aviv",
+    ),
+    neighborhood_map={
+        "\u05e4\u05dc\u05d5\u05e8\u05e0\u05d8\u05d9\u05df": "florentin",
+        "\u05dc\u05d1 \u05d4\u05e2\u05d9\u05e8": "lev-hair",
+        "\u05d4\u05e6\u05e4\u05d5\u05df \u05d4\u05d9\u05e9\u05df": "old-north",
+        "\u05d4\u05e6\u05e4\u05d5\u05df \u05d4\u05d7\u05d3\u05e9": "new-north",
+        "\u05e0\u05d5\u05d5\u05d4 \u05e6\u05d3\u05e7": "neve-tzedek",
+        "\u05db\u05e8\u05dd \u05d4\u05ea\u05d9\u05de\u05e0\u05d9\u05dd": "kerem-hateimanim",
+        "\u05e8\u05d5\u05d8\u05e9\u05d9\u05dc\u05d3": "lev-hair",
+        "\u05e0\u05d7\u05dc\u05ea \u05d1\u05e0\u05d9\u05de\u05d9\u05df": "neve-tzedek",
+        "\u05d9\u05e4\u05d5": "jaffa",
+        "\u05e2\u05d2'\u05de\u05d9": "ajami",
+        "\u05e8\u05de\u05ea \u05d0\u05d1\u05d9\u05d1": "ramat-aviv",
+        "\u05d1\u05d1\u05dc\u05d9": "bavli",
+        "\u05e6\u05d4\u05dc\u05d4": "tzahala",
+        "\u05e0\u05d5\u05d5\u05d4 \u05e9\u05d0\u05e0\u05df": "neve-shaanan",
+        "\u05e9\u05e4\u05d9\u05e8\u05d0": "shapira",
+        "\u05de\u05d5\u05e0\u05d8\u05d9\u05e4\u05d9\u05d5\u05e8\u05d9": "montefiore",
+        "\u05e9\u05e8\u05d5\u05e0\u05d4": "sarona",
+        "\u05d9\u05d3 \u05d0\u05dc\u05d9\u05d4\u05d5": "yad-eliyahu",
+        "\u05e0\u05d7\u05dc\u05ea \u05d9\u05e6\u05d7\u05e7": "nahalat-yitzhak",
+        "\u05e7\u05e8\u05d9\u05ea \u05e9\u05dc\u05d5\u05dd": "kiryat-shalom",
+        "\u05d4\u05ea\u05e7\u05d5\u05d5\u05d4": "hatikva",
+    },
+    street_map={
+        "\u05e4\u05dc\u05d5\u05e8\u05e0\u05d8\u05d9\u05df": "florentin",
+        "\u05d0\u05dc\u05e0\u05d1\u05d9": "florentin",
+        "\u05d3\u05d9\u05d6\u05e0\u05d2\u05d5\u05e3": "old-north",
+        "\u05d1\u05df \u05d9\u05d4\u05d5\u05d3\u05d4": "old-north",
+        "\u05e8\u05d5\u05d8\u05e9\u05d9\u05dc\u05d3": "lev-hair",
+        "\u05d4\u05e8\u05e6\u05dc": "lev-hair",
+        "\u05e9\u05d9\u05e0\u05e7\u05d9\u05df": "lev-hair",
+        "\u05e0\u05d7\u05dc\u05ea \u05d1\u05e0\u05d9\u05de\u05d9\u05df": "neve-tzedek",
+        "\u05e9\u05d1\u05d6\u05d9": "neve-tzedek",
+        "\u05d0\u05d1\u05df \u05d2\u05d1\u05d9\u05e8\u05d5\u05dc": "old-north",
+        "\u05d0\u05e8\u05dc\u05d5\u05d6\u05d5\u05e8\u05d5\u05d1": "old-north",
+        "\u05e0\u05d5\u05e8\u05d3\u05d0\u05d5": "old-north",
+        "\u05d1\u05d5\u05d2\u05e8\u05e9\u05d5\u05d1": "lev-hair",
+        "\u05d9\u05e4\u05d5": "jaffa",
+        "\u05e2\u05d2'\u05de\u05d9": "ajami",
+        "\u05e8\u05de\u05ea \u05d0\u05d1\u05d9\u05d1": "ramat-aviv",
+        "\u05d1\u05d1\u05dc\u05d9": "bavli",
+        "\u05e6\u05d4\u05dc\u05d4": "tzahala",
+    },
+    street_names_en={
+        "\u05e4\u05dc\u05d5\u05e8\u05e0\u05d8\u05d9\u05df": "Florentin",
+        "\u05d0\u05dc\u05e0\u05d1\u05d9": "Allenby",
+        "\u05d3\u05d9\u05d6\u05e0\u05d2\u05d5\u05e3": "Dizengoff",
+        "\u05d1\u05df \u05d9\u05d4\u05d5\u05d3\u05d4": "Ben Yehuda",
+        "\u05e8\u05d5\u05d8\u05e9\u05d9\u05dc\u05d3": "Rothschild",
+        "\u05d4\u05e8\u05e6\u05dc": "Herzl",
+        "\u05e9\u05d9\u05e0\u05e7\u05d9\u05df": "Sheinkin",
+        "\u05e0\u05d7\u05dc\u05ea \u05d1\u05e0\u05d9\u05de\u05d9\u05df": "Nahalat Binyamin",
+        "\u05e9\u05d1\u05d6\u05d9": "Shabazi",
+        "\u05d0\u05d1\u05df \u05d2\u05d1\u05d9\u05e8\u05d5\u05dc": "Ibn Gabirol",
+        "\u05d0\u05e8\u05dc\u05d5\u05d6\u05d5\u05e8\u05d5\u05d1": "Arlozorov",
+        "\u05e0\u05d5\u05e8\u05d3\u05d0\u05d5": "Nordau",
+        "\u05d1\u05d5\u05d2\u05e8\u05e9\u05d5\u05d1": "Bograshov",
+    },
+)
+
+JERUSALEM = City(
+    id="jerusalem",
+    name_en="Jerusalem",
+    name_he="\u05d9\u05e8\u05d5\u05e9\u05dc\u05d9\u05dd",
+    yad2_city="3000",
+    lat=31.78,
+    lng=35.22,
+    fallback_rent=6000,
+    neighborhoods_file="neighborhoods-jerusalem.json",
+    address_names=("\u05d9\u05e8\u05d5\u05e9\u05dc\u05d9\u05dd", "\u05d9-\u05dd", "jerusalem"),
+    neighborhood_map={
+        "\u05e8\u05d7\u05d1\u05d9\u05d4": "rehavia",
+        "\u05d4\u05d2\u05e8\u05de\u05e0\u05d9\u05ea": "german-colony",
+        "\u05e2\u05de\u05e7 \u05e8\u05e4\u05d0\u05d9\u05dd": "german-colony",
+        "\u05e7\u05d8\u05de\u05d5\u05df": "katamon",
+        "\u05e0\u05d7\u05dc\u05d0\u05d5\u05ea": "nachlaot",
+        "\u05d1\u05e7\u05e2\u05d4": "baka",
+        "\u05ea\u05dc\u05e4\u05d9\u05d5\u05ea": "talpiot",
+        "\u05e7\u05e8\u05d9\u05ea \u05d9\u05d5\u05d1\u05dc": "kiryat-yovel",
+        "\u05d4\u05d2\u05d1\u05e2\u05d4 \u05d4\u05e6\u05e8\u05e4\u05ea\u05d9\u05ea": "french-hill",
+    },
+)
+
+HAIFA = City(
+    id="haifa",
+    name_en="Haifa",
+    name_he="\u05d7\u05d9\u05e4\u05d4",
+    yad2_city="4000",
+    lat=32.79,
+    lng=34.99,
+    fallback_rent=4200,
+    neighborhoods_file="neighborhoods-haifa.json",
+    address_names=("\u05d7\u05d9\u05e4\u05d4", "haifa"),
+    neighborhood_map={
+        "\u05de\u05e8\u05db\u05d6 \u05d4\u05db\u05e8\u05de\u05dc": "carmel-center",
+        "\u05d4\u05d3\u05e8": "hadar",
+        "\u05d4\u05d2\u05e8\u05de\u05e0\u05d9\u05ea": "german-colony",
+        "\u05d1\u05ea \u05d2\u05dc\u05d9\u05dd": "bat-galim",
+        "\u05d0\u05d7\u05d5\u05d6\u05d4": "ahuza",
+        "\u05e0\u05d5\u05d5\u05d4 \u05e9\u05d0\u05e0\u05df": "neve-shaanan",
+    },
+)
+
+RAMAT_GAN = City(
+    id="ramat-gan",
+    name_en="Ramat Gan",
+    name_he="\u05e8\u05de\u05ea \u05d2\u05df",
+    yad2_city="8600",
+    lat=32.07,
+    lng=34.82,
+    fallback_rent=6800,
+    neighborhoods_file="neighborhoods-ramat-gan.json",
+    address_names=("\u05e8\u05de\u05ea \u05d2\u05df", '\u05e8"\u05d2', "ramat gan"),
+    neighborhood_map={
+        "\u05d4\u05d1\u05d5\u05e8\u05e1\u05d4": "bursa",
+        "\u05de\u05e8\u05db\u05d6 \u05d4\u05e2\u05d9\u05e8": "city-center",
+        "\u05ea\u05dc \u05d1\u05e0\u05d9\u05de\u05d9\u05df": "tel-binyamin",
+        "\u05e8\u05de\u05ea \u05d7\u05df": "ramat-chen",
+        "\u05e7\u05e8\u05d9\u05ea \u05e7\u05e8\u05d9\u05e0\u05d9\u05e6\u05d9": "kiryat-krinitzi",
+    },
+)
+
+GIVATAYIM = City(
+    id="givatayim",
+    name_en="Givatayim",
+    name_he="\u05d2\u05d1\u05e2\u05ea\u05d9\u05d9\u05dd",
+    yad2_city="6300",
+    lat=32.07,
+    lng=34.81,
+    fallback_rent=7000,
+    neighborhoods_file="neighborhoods-givatayim.json",
+    address_names=("\u05d2\u05d1\u05e2\u05ea\u05d9\u05d9\u05dd", "givatayim", "givataim"),
+    neighborhood_map={
+        "\u05d1\u05d5\u05e8\u05d5\u05db\u05d5\u05d1": "borochov",
+        "\u05e9\u05d9\u05e0\u05e7\u05d9\u05df": "sheinkin",
+        '\u05d2\u05d1\u05e2\u05ea \u05e8\u05de\u05d1"\u05dd': "givat-rambam",
+        "\u05d0\u05e8\u05dc\u05d5\u05d6\u05d5\u05e8\u05d5\u05d1": "arlozorov",
+    },
+)
+
+CITIES: dict[str, City] = {
+    city.id: city for city in (TEL_AVIV, JERUSALEM, HAIFA, RAMAT_GAN, GIVATAYIM)
+}
+
+
+def lookup_city(city_id: str | None = None) -> City:
+    """An enabled city by id, or the default city; raises KeyError for anything else."""
+    city_id = city_id or settings.default_city
+    if city_id not in settings.cities:
+        raise KeyError(city_id)
+    return CITIES[city_id]
+
+
+def enabled_cities() -> list[City]:
+    return [CITIES[city_id] for city_id in settings.cities]
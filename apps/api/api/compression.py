@@ -0,0 +1,216 @@
+"""Response compression.
+
+Cacheable JSON payloads go through :func:`cached_json`, which renders and
+compresses them once per data generation and keeps every encoding next to
+the raw bytes, so a hit only picks the variant the client accepts. Anything
+else is compressed on the fly by :class:`CompressionMiddleware`, flushing
+each chunk so streamed responses stay incremental. Brotli is used when the
+``brotli`` package is installed; gzip is always available.
+"""
+
+import json
+import zlib
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from sqlmodel import Session
+
+from api.config import settings
+from api.services.generation import get_or_compute_current
+from api.services.result_cache import ResultCache
+
+try:
+    import brotli
+except ImportError:  # optional; gzip only
+    brotli = None
+
+# Server preference when the client accepts several equally
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+# Never compressed on the fly: already compressed, or must reach the client unbuffered
+SKIP_CONTENT_TYPES = ("image/", "video/", "audio/", "application/zip", "text/event-stream")
+
+response_cache = ResultCache(
+    maxsize=settings.response_cache_size, ttl=settings.response_cache_ttl_seconds
+)
+
+
+def negotiate(accept_encoding: str | None) -> str | None:
+    """Best of :data:`ENCODINGS` allowed by an ``Accept-Encoding`` header."""
+    if not accept_encoding:
+        return None
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        weights[name.strip().lower()] = quality
+    best, best_quality = None, 0.0
+    for encoding in ENCODINGS:
+        quality = weights.get(encoding, weights.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=11)
+    # wbits 31: gzip container
+    compressor = zlib.compressobj(9, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+@dataclass(frozen=True)
+class PrecompressedBody:
+    raw: bytes
+    encoded: dict[str, bytes]
+
+    @classmethod
+    def from_content(cls, content: Any) -> "PrecompressedBody":
+        # Same rendering as FastAPI's JSONResponse
+        raw = json.dumps(
+            jsonable_encoder(content),
+            ensure_ascii=False,
+            allow_nan=False,
+            indent=None,
+            separators=(",", ":"),
+        ).encode("utf-8")
+        encoded = {}
+        if len(raw) >= settings.compression_min_bytes:
+            encoded = {encoding: compress(raw, encoding) for encoding in ENCODINGS}
+        return cls(raw, encoded)
+
+    def response(self, accept_encoding: str | None) -> Response:
+        encoding = negotiate(accept_encoding)
+        headers = {"Vary": "Accept-Encoding"}
+        body = self.encoded.get(encoding)
+        if body is None:
+            body = self.raw
+        else:
+            headers["Content-Encoding"] = encoding
+        return Response(body, media_type="application/json", headers=headers)
+
+
+def cached_json(
+    request: Request, session: Session, build: Callable[[], Any], vary: tuple = ()
+) -> Response:
+    """JSON response for ``build()``, reused until the URL or data generation changes.
+
+    Only for payloads that depend on nothing but the request URL, the
+    scraped data and ``vary``, e.g. the date a default range was resolved
+    from. A payload built from an index still being rebuilt for the new
+    generation is served but not cached.
+    """
+    key = (
+        session.get_bind(),
+        request.url.path,
+        tuple(sorted(request.query_params.multi_items())),
+        *vary,
+    )
+    body = get_or_compute_current(
+        response_cache, key, session, lambda: PrecompressedBody.from_content(build())
+    )
+    return body.response(request.headers.get("accept-encoding"))
+
+
+class _Compressor:
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=5)
+        else:
+            self._brotli = None
+            self._zlib = zlib.compressobj(6, zlib.DEFLATED, 31)
+
+    def chunk(self, data: bytes, final: bool) -> bytes:
+        if self._brotli is not None:
+            out = self._brotli.process(data)
+            return out + (self._brotli.finish() if final else self._brotli.flush())
+        out = self._zlib.compress(data)
+        return out + self._zlib.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class CompressionMiddleware:
+    """Streaming compression for responses that aren't already encoded."""
+
+    def __init__(self, app, minimum_size: int | None = None):
+        self.app = app
+        self.minimum_size = settings.compression_min_bytes if minimum_size is None else minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept = next((v for k, v in scope["headers"] if k == b"accept-encoding"), b"")
+        encoding = negotiate(accept.decode("latin-1"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        compressor = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, compressor, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                headers = {k.lower(): v for k, v in start["headers"]}
+                content_type = headers.get(b"content-type", b"").decode("latin-1")
+                if (
+                    b"content-encoding" in headers
+                    or content_type.startswith(SKIP_CONTENT_TYPES)
+                    or (not more_body and len(body) < self.minimum_size)
+                ):
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                compressor = _Compressor(encoding)
+                start["headers"] = [
+                    (k, v)
+                    for k, v in start["headers"]
+                    if k.lower() not in (b"content-length", b"vary")
+                ] + [
+                    (b"content-encoding", encoding.encode()),
+                    (b"vary", _vary(headers.get(b"vary"))),
+                ]
+                if not more_body:
+                    body = compressor.chunk(body, final=True)
+                    start["headers"].append((b"content-length", str(len(body)).encode()))
+                    await send(start)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                await send(start)
+            await send(
+                {
+                    "type": "http.response.body",
+                    "body": compressor.chunk(body, final=not more_body),
+                    "more_body": more_body,
+                }
+            )
+
+        await self.app(scope, receive, send_compressed)
+
+
+def _vary(existing: bytes | None) -> bytes:
+    if not existing:
+        return b"Accept-Encoding"
+    if b"accept-encoding" in existing.lower():
+        return existing
+    return existing + b", Accept-Encoding"
@@ -3,12 +3,53 @@ from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     database_url: str = "sqlite:///data/dira-fair.db"
+    city_database_url: str = "sqlite:///data/dira-fair-{city}.db"
+    cities: list[str] = ["tel-aviv", "jerusalem", "haifa", "ramat-gan", "givatayim"]
+    default_city: str = "tel-aviv"
+    read_snapshots_enabled: bool = True
+    read_snapshot_dir: str = "data/read-snapshots"
+    read_snapshot_keep: int = 2
     cbs_api_base: str = "https://apis.cbs.gov.il/series/data/list"
     nadlan_api_base: str = "https://www.nadlan.gov.il/Nadlan.REST/Main/GetAssestAndDeals"
     yad2_base_url: str = "https://www.yad2.co.il/realestate/rent"
     scrape_interval_hours: int = 24
     proxy_url: str | None = None
     cors_origins: list[str] = ["http://localhost:3000"]
+    generation_poll_seconds: float = 2.0
+    check_cache_size: int = 4096
+    check_cache_ttl_seconds: float = 300.0
+    check_cache_sqm_bucket: int = 5
+    min_comparables: int = 5
+    nearby_neighborhood_count: int = 3
+    nearby_neighborhood_radius_km: float = 2.0
+    knn_comparables: int = 20
+    knn_max_distance: float = 2.0
+    distribution_bin_width: int = 250
+    archive_after_days: int = 30
+    trend_max_points: int = 120
+    trends_cache_size: int = 256
+    trends_cache_ttl_seconds: float = 3600.0
+    response_cache_size: int = 512
+    response_cache_ttl_seconds: float = 3600.0
+    compression_min_bytes: int = 1024
+    events_poll_seconds: float = 2.0
+    events_keepalive_seconds: float = 15.0
+    events_history: int = 64
+    profile_header: str = "X-Dira-Profile"
+    profile_token: str | None = None
+    profile_sample_rate: float = 0.0
+    profile_interval_ms: float = 1.0
+    profile_dir: str = "data/profiles"
+    slow_query_log_enabled: bool = True
+    slow_query_ms: float = 100.0
+    slow_query_max_shapes: int = 500
+    admission_enabled: bool = True
+    admission_max_concurrency: int = 32
+    admission_queue_budget_ms: float = 250.0
+    admission_client_rps: float = 20.0
+    admission_client_burst: int = 40
+    admission_expensive_share: float = 0.5
+    admission_trust_forwarded: bool = False
 
     model_config = {"env_prefix": "DIRA_"}
 
@@ -1,14 +1,81 @@
+import threading
+
+from fastapi import Depends, HTTPException, Query
+from sqlalchemy.engine import Engine
 from sqlmodel import Session, SQLModel, create_engine
 
+import api.models  # noqa: F401  (registers the tables with SQLModel.metadata)
+from api.cities import City, lookup_city
 from api.config import settings
+from api.migrations import mark_schema_current, run_migrations, schema_is_current
+from api.services.read_snapshot import SnapshotReader, publish, snapshot_dir
+from api.services.slow_queries import slow_query_log
+
+
+def _create_engine(url: str) -> Engine:
+    city_engine = create_engine(url, echo=False)
+    if settings.slow_query_log_enabled:
+        slow_query_log.install(city_engine)
+    return city_engine
+
+
+# The default city's partition
+engine = _create_engine(settings.database_url)
+_engines: dict[str, Engine] = {settings.default_city: engine}
+_readers: dict[str, SnapshotReader] = {}
+_engines_lock = threading.Lock()
+
+
+def get_engine(city_id: str | None = None) -> Engine:
+    """Engine for a city's partition, created on first use."""
+    city_id = city_id or settings.default_city
+    with _engines_lock:
+        if city_id not in _engines:
+            _engines[city_id] = _create_engine(settings.city_database_url.format(city=city_id))
+        return _engines[city_id]
+
+
+def get_read_engine(city_id: str | None = None) -> Engine:
+    """Engine the API reads a city from: its published snapshot, else its live database."""
+    city_id = city_id or settings.default_city
+    if not settings.read_snapshots_enabled:
+        return get_engine(city_id)
+    with _engines_lock:
+        reader = _readers.get(city_id)
+        if reader is None:
+            reader = _readers[city_id] = SnapshotReader(snapshot_dir(city_id))
+            if settings.slow_query_log_enabled:
+                slow_query_log.install(reader.engine)
+    return reader.engine if reader.refresh() else get_engine(city_id)
+
+
+def publish_read_snapshot(city_id: str | None = None) -> dict:
+    """Publish the city's live database as the snapshot the API reads; call after scraping."""
+    city_id = city_id or settings.default_city
+    return publish(get_engine(city_id), snapshot_dir(city_id))
+
+
+def create_db_and_tables(city_id: str | None = None) -> list[str]:
+    """Create missing tables and apply pending migrations; returns the migrations applied.
 
-engine = create_engine(settings.database_url, echo=False)
+    A no-op beyond one pragma when the schema fingerprint already matches.
+    """
+    city_engine = get_engine(city_id)
+    if schema_is_current(city_engine):
+        return []
+    SQLModel.metadata.create_all(city_engine)
+    applied = run_migrations(city_engine)
+    mark_schema_current(city_engine)
+    return applied
 
 
-def create_db_and_tables():
-    SQLModel.metadata.create_all(engine)
+def get_city(city: str | None = Query(default=None, description="City id")) -> City:
+    try:
+        return lookup_city(city)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown city: {city}") from None
 
 
-def get_session():
-    with Session(engine) as session:
+def get_session(city: City = Depends(get_city)):
+    with Session(get_read_engine(city.id)) as session:
         yield session
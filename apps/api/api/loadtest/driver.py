@@ -0,0 +1,272 @@
+"""Scrape-plus-read load driver against the local fake upstream.
+
+Starts a :class:`FakeUpstream`, points the scraper settings at it, serves the
+API with uvicorn on a scratch database and runs a read mix against it while
+full scrape runs (CBS survey, nadlan transactions, Yad2 listings) go through
+fetch, retry and ingest. Reports end-to-end scrape throughput and the latency
+percentiles of successful API responses split by whether a scrape was in
+flight, with other responses counted apart. Admission control is off, since
+every reader comes from the same address and its per-client rate limit would
+turn most of the mix into 429s.
+
+Usage:
+    python -m api.loadtest.driver --pages 20 --latency-ms 50 --error-rate 0.05 \\
+        --rate-limit-rps 40 --scrape-runs 3 --readers 8
+"""
+
+import argparse
+import random
+import socket
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+
+import httpx
+import uvicorn
+from sqlmodel import Session, SQLModel, create_engine
+
+from api.config import settings
+from api.database import get_session
+from api.loadtest.fake_upstream import FakeUpstream, UpstreamConfig
+from api.scrapers.base import fetch_json
+from api.scrapers.cbs import CBSScraper
+from api.scrapers.nadlan import NadlanScraper
+from api.scrapers.yad2 import Yad2Scraper
+from api.seed import seed_neighborhoods
+
+NEIGHBORHOOD_IDS = ["florentin", "old-north", "lev-hair", "neve-tzedek", "jaffa", "ramat-aviv"]
+
+# (weight, method, path factory, body factory)
+READ_MIX = [
+    (3, "GET", lambda rng: "/api/neighborhoods", None),
+    (3, "GET", lambda rng: f"/api/neighborhoods/{rng.choice(NEIGHBORHOOD_IDS)}", None),
+    (2, "GET", lambda rng: "/api/stats/trends", None),
+    (
+        4,
+        "POST",
+        lambda rng: "/api/check",
+        lambda rng: {
+            "neighborhood_id": rng.choice(NEIGHBORHOOD_IDS),
+            "rooms": rng.choice([1, 2, 2.5, 3, 4]),
+            "sqm": rng.choice([40, 55, 70, 90]),
+            "monthly_rent": rng.randrange(4000, 16000, 100),
+        },
+    ),
+]
+
+
+@dataclass
+class ScrapeRun:
+    seconds: float
+    pages: int
+    records: int
+    failed_pages: int
+
+
+@dataclass
+class LoadResult:
+    scrapes: list[ScrapeRun] = field(default_factory=list)
+    # Successful responses only; everything else is counted in ``failures``
+    latencies: dict[bool, list[float]] = field(default_factory=lambda: {True: [], False: []})
+    failures: dict[bool, Counter] = field(
+        default_factory=lambda: {True: Counter(), False: Counter()}
+    )
+    statuses: Counter = field(default_factory=Counter)
+    upstream_statuses: Counter = field(default_factory=Counter)
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def fetch_all_pages(client: httpx.Client, url: str, retries: int) -> tuple[list[dict], int, int]:
+    """Fetch every page of a fake-upstream listing. Returns (items, pages, failed_pages)."""
+    first = fetch_json(client, url, params={"page": 1}, retries=retries)
+    items = list(first["items"])
+    pages, failed = 1, 0
+    for page in range(2, first["total_pages"] + 1):
+        try:
+            body = fetch_json(client, url, params={"page": page}, retries=retries)
+        except httpx.HTTPError:
+            failed += 1
+            continue
+        items.extend(body["items"])
+        pages += 1
+    return items, pages, failed
+
+
+def run_scrape(engine, result: LoadResult, retries: int) -> ScrapeRun:
+    def record(response: httpx.Response):
+        result.upstream_statuses[response.status_code] += 1
+
+    hooks = {"response": [record]}
+    cbs, nadlan, yad2 = CBSScraper(), NadlanScraper(), Yad2Scraper()
+    cbs.client.event_hooks = hooks
+    nadlan.client.event_hooks = hooks
+    yad2_client = httpx.Client(base_url=settings.yad2_base_url, timeout=30.0, event_hooks=hooks)
+
+    start = time.perf_counter()
+    pages = records = failed = 0
+    with Session(engine) as session:
+        for client, url, ingest in (
+            (cbs.client, "", cbs.ingest_rent_survey),
+            (nadlan.client, settings.nadlan_api_base, nadlan.ingest_transactions),
+            (yad2_client, "", yad2.ingest_listings),
+        ):
+            try:
+                items, n_pages, n_failed = fetch_all_pages(client, url, retries)
+            except httpx.HTTPError:
+                failed += 1
+                continue
+            records += ingest(session, items)
+            pages += n_pages
+            failed += n_failed
+    yad2_client.close()
+    return ScrapeRun(time.perf_counter() - start, pages, records, failed)
+
+
+def reader(api_url: str, seed: int, stop: threading.Event, scraping: threading.Event, result):
+    rng = random.Random(seed)
+    weights = [entry[0] for entry in READ_MIX]
+    with httpx.Client(base_url=api_url, timeout=30.0) as client:
+        while not stop.is_set():
+            _, method, path, body = rng.choices(READ_MIX, weights=weights)[0]
+            in_scrape = scraping.is_set()
+            start = time.perf_counter()
+            try:
+                response = client.request(method, path(rng), json=body(rng) if body else None)
+                status = response.status_code
+            except httpx.HTTPError:
+                status = 0
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if status == 200:
+                result.latencies[in_scrape].append(elapsed_ms)
+            else:
+                result.failures[in_scrape][status] += 1
+            result.statuses[status] += 1
+
+
+def run(args) -> LoadResult:
+    # Read at app construction, so it has to be off before the import
+    settings.admission_enabled = False
+    from api.main import app
+
+    upstream = FakeUpstream(
+        UpstreamConfig(
+            latency_ms=args.latency_ms,
+            latency_jitter_ms=args.latency_jitter_ms,
+            error_rate=args.error_rate,
+            rate_limit_rps=args.rate_limit_rps,
+            retry_after_seconds=args.retry_after,
+            pages=args.pages,
+        )
+    ).start()
+    settings.cbs_api_base = upstream.url_for("cbs")
+    settings.nadlan_api_base = upstream.url_for("nadlan")
+    settings.yad2_base_url = upstream.url_for("yad2")
+
+    engine = create_engine(args.database_url, connect_args={"check_same_thread": False})
+    SQLModel.metadata.drop_all(engine)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        seed_neighborhoods(session)
+
+    def loadtest_session():
+        with Session(engine) as session:
+            yield session
+
+    app.dependency_overrides[get_session] = loadtest_session
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    server_thread = threading.Thread(target=server.run, daemon=True)
+    server_thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    result = LoadResult()
+    stop, scraping = threading.Event(), threading.Event()
+    readers = [
+        threading.Thread(
+            target=reader,
+            args=(f"http://127.0.0.1:{port}", i, stop, scraping, result),
+            daemon=True,
+        )
+        for i in range(args.readers)
+    ]
+    for thread in readers:
+        thread.start()
+
+    try:
+        time.sleep(args.idle_seconds)
+        for _ in range(args.scrape_runs):
+            scraping.set()
+            result.scrapes.append(run_scrape(engine, result, args.retries))
+            scraping.clear()
+            time.sleep(args.idle_seconds)
+    finally:
+        stop.set()
+        for thread in readers:
+            thread.join()
+        server.should_exit = True
+        server_thread.join()
+        app.dependency_overrides.pop(get_session, None)
+        upstream.stop()
+
+    return result
+
+
+def report(result: LoadResult):
+    print("Scrape runs")
+    for i, run_ in enumerate(result.scrapes, 1):
+        rate = run_.records / run_.seconds if run_.seconds else 0.0
+        print(
+            f"  #{i}: {run_.records} records, {run_.pages} pages in {run_.seconds:.2f}s "
+            f"({rate:.0f} records/s, {run_.failed_pages} failed pages)"
+        )
+    total_records = sum(r.records for r in result.scrapes)
+    total_seconds = sum(r.seconds for r in result.scrapes)
+    if total_seconds:
+        print(f"  overall: {total_records / total_seconds:.0f} records/s")
+    print(f"Upstream responses: {dict(sorted(result.upstream_statuses.items()))}")
+
+    print("API latency of 200 responses (ms)")
+    for in_scrape, label in ((False, "idle"), (True, "during scrape")):
+        values = result.latencies[in_scrape]
+        failures = dict(sorted(result.failures[in_scrape].items()))
+        print(
+            f"  {label:>13}: n={len(values)} p50={percentile(values, 50):.1f} "
+            f"p95={percentile(values, 95):.1f} p99={percentile(values, 99):.1f} "
+            f"max={max(values, default=0.0):.1f} non-200={failures}"
+        )
+    print(f"API responses: {dict(sorted(result.statuses.items()))}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test scrapers and API against fixtures")
+    parser.add_argument("--database-url", default="sqlite:///data/loadtest.db")
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--latency-jitter-ms", type=float, default=10.0)
+    parser.add_argument("--error-rate", type=float, default=0.02)
+    parser.add_argument("--rate-limit-rps", type=float, default=None)
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--scrape-runs", type=int, default=3)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--idle-seconds", type=float, default=2.0)
+    report(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""Local stand-in for the CBS, nadlan.gov.il and Yad2 upstreams.
+
+Replays the recorded fixtures in ``fixtures/`` over HTTP so scrapers can be
+exercised offline. Each source is mounted under its own prefix
+(``/cbs``, ``/nadlan``, ``/yad2``) and answers any path below it with a page of
+``{"items": [...], "page": n, "total_pages": m}``. Pages past the first replay
+the fixture with page-suffixed ids and jittered prices, so deep pagination
+yields distinct records.
+
+Usage:
+    python -m api.loadtest.fake_upstream --port 8900 --latency-ms 80 --error-rate 0.05
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+FIXTURE_FILES = {
+    "cbs": "cbs_rent_survey.json",
+    "nadlan": "nadlan_transactions.json",
+    "yad2": "yad2_listings.json",
+}
+
+# CBS publishes one survey table per period; it is never paginated.
+UNPAGINATED_SOURCES = {"cbs"}
+
+
+@dataclass
+class UpstreamConfig:
+    latency_ms: float = 0.0
+    latency_jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    rate_limit_rps: float | None = None
+    retry_after_seconds: int = 1
+    pages: int = 1
+    seed: int = 42
+
+
+class _TokenBucket:
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self) -> bool:
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+def load_fixtures() -> dict[str, list[dict]]:
+    return {
+        source: json.loads((FIXTURES_DIR / filename).read_text())
+        for source, filename in FIXTURE_FILES.items()
+    }
+
+
+def build_page(source: str, items: list[dict], page: int, seed: int) -> list[dict]:
+    """Return fixture ``items`` as they would appear on ``page`` (1-based)."""
+    if page == 1:
+        return items
+    rng = random.Random(f"{seed}-{source}-{page}")
+    varied = []
+    for item in items:
+        copy = dict(item)
+        if "id" in copy:
+            copy["id"] = f"{copy['id']}-p{page}"
+        if "price" in copy:
+            copy["price"] = int(round(copy["price"] * rng.uniform(0.9, 1.1), -1))
+        varied.append(copy)
+    return varied
+
+
+class FakeUpstream:
+    """Threaded HTTP server replaying fixtures with injected latency and faults."""
+
+    def __init__(
+        self, config: UpstreamConfig | None = None, host: str = "127.0.0.1", port: int = 0
+    ):
+        self.config = config or UpstreamConfig()
+        self.fixtures = load_fixtures()
+        rate = self.config.rate_limit_rps
+        self.bucket = _TokenBucket(rate) if rate else None
+        self.rng = random.Random(self.config.seed)
+        self.rng_lock = threading.Lock()
+        self.stats = {"requests": 0, "served": 0, "errors": 0, "rate_limited": 0}
+        self.stats_lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url_for(self, source: str) -> str:
+        return f"{self.base_url}/{source}"
+
+    def start(self) -> "FakeUpstream":
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _count(self, key: str):
+        with self.stats_lock:
+            self.stats[key] += 1
+
+    def _random(self) -> float:
+        with self.rng_lock:
+            return self.rng.random()
+
+    def _handler_class(self):
+        upstream = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status: int, body: dict, headers: dict | None = None):
+                payload = json.dumps(body, ensure_ascii=False).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):  # noqa: N802
+                config = upstream.config
+                upstream._count("requests")
+                url = urlparse(self.path)
+                source = url.path.strip("/").split("/", 1)[0]
+                if source not in upstream.fixtures:
+                    self._send_json(404, {"error": f"unknown source {source!r}"})
+                    return
+
+                if upstream.bucket and not upstream.bucket.take():
+                    upstream._count("rate_limited")
+                    self._send_json(
+                        429,
+                        {"error": "rate limited"},
+                        {"Retry-After": str(config.retry_after_seconds)},
+                    )
+                    return
+
+                if config.latency_ms or config.latency_jitter_ms:
+                    jitter = (upstream._random() * 2 - 1) * config.latency_jitter_ms
+                    time.sleep(max(0.0, config.latency_ms + jitter) / 1000)
+
+                if config.error_rate and upstream._random() < config.error_rate:
+                    upstream._count("errors")
+                    self._send_json(503, {"error": "injected upstream failure"})
+                    return
+
+                total_pages = 1 if source in UNPAGINATED_SOURCES else config.pages
+                try:
+                    page = int(parse_qs(url.query).get("page", ["1"])[0])
+                except ValueError:
+                    page = 1
+                items = (
+                    build_page(source, upstream.fixtures[source], page, config.seed)
+                    if 1 <= page <= total_pages
+                    else []
+                )
+                upstream._count("served")
+                self._send_json(200, {"items": items, "page": page, "total_pages": total_pages})
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve recorded upstream fixtures locally")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--latency-jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rps", type=float, default=None)
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--pages", type=int, default=1)
+    args = parser.parse_args()
+
+    config = UpstreamConfig(
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.latency_jitter_ms,
+        error_rate=args.error_rate,
+        rate_limit_rps=args.rate_limit_rps,
+        retry_after_seconds=args.retry_after,
+        pages=args.pages,
+    )
+    upstream = FakeUpstream(config, host=args.host, port=args.port)
+    print(f"Fake upstream listening on {upstream.base_url} (cbs, nadlan, yad2)")
+    try:
+        upstream.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        upstream.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
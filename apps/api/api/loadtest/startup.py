@@ -0,0 +1,107 @@
+"""Cold-start benchmark.
+
+Measures, over several fresh processes, how long ``import api.main`` takes
+and how long a uvicorn worker takes from spawn to its first ``/api/health``
+response (started) and to a 200 from ``/api/ready`` (warm). Also lists the
+modules with the largest cumulative import time, to see what a change to
+the import graph bought. Run it against a seeded, published database for
+warm-up numbers that mean something.
+
+Usage:
+    python -m api.loadtest.startup --runs 5
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+IMPORT_SNIPPET = (
+    "import time; t = time.perf_counter(); import api.main; print(time.perf_counter() - t)"
+)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def import_seconds() -> float:
+    out = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET], capture_output=True, text=True, check=True
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(limit: int) -> list[tuple[int, str]]:
+    """(cumulative microseconds, module) of the costliest imports under ``api.main``."""
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import api.main"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    timings = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line.split("|")
+        timings.append((int(cumulative), module.rstrip()))
+    timings.sort(reverse=True)
+    return timings[:limit]
+
+
+def serve_seconds(timeout: float) -> tuple[float, float]:
+    """Seconds from spawning a worker to its first health response and to readiness."""
+    port = _free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.main:app", "--port", str(port)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        env={**os.environ, "DIRA_ADMISSION_ENABLED": "false"},
+    )
+    healthy = None
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=1.0) as client:
+            while time.perf_counter() - started < timeout:
+                try:
+                    if healthy is None and client.get("/api/health").status_code == 200:
+                        healthy = time.perf_counter() - started
+                    if healthy is not None and client.get("/api/ready").status_code == 200:
+                        return healthy, time.perf_counter() - started
+                except httpx.TransportError:
+                    pass
+                time.sleep(0.005)
+    finally:
+        server.terminate()
+        server.wait()
+    raise TimeoutError(f"Worker not ready within {timeout}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure API import time and time to ready")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="slowest imports to list")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    args = parser.parse_args()
+
+    imports = [import_seconds() for _ in range(args.runs)]
+    serves = [serve_seconds(args.timeout) for _ in range(args.runs)]
+    print(f"Median over {args.runs} runs (ms)")
+    print(f"  import api.main: {statistics.median(imports) * 1000:.0f}")
+    print(f"  first response:  {statistics.median(s[0] for s in serves) * 1000:.0f}")
+    print(f"  ready (warm):    {statistics.median(s[1] for s in serves) * 1000:.0f}")
+    print("Slowest imports (cumulative ms)")
+    for micros, module in slowest_imports(args.top):
+        print(f"  {micros / 1000:8.1f}  {module}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,55 @@
+import asyncio
 from contextlib import asynccontextmanager
+from functools import partial
+from typing import Literal
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
+from api.admission import AdmissionMiddleware, admission
+from api.cities import enabled_cities
+from api.compression import CompressionMiddleware
 from api.config import settings
-from api.database import create_db_and_tables
-from api.routers import neighborhoods, rent_check, stats
+from api.database import create_db_and_tables, get_read_engine
+from api.routers import autocomplete, events, listings, neighborhoods, overview, rent_check, stats
+from api.services.events import get_broadcaster
+from api.services.slow_queries import slow_query_log
+from api.warmup import warmup
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    create_db_and_tables()
+    pollers = []
+    for city in enabled_cities():
+        create_db_and_tables(city.id)
+        poller = get_broadcaster(city.id).run(partial(get_read_engine, city.id))
+        pollers.append(asyncio.create_task(poller))
+    # Serve right away; /api/ready flips once the caches are built
+    warming = asyncio.create_task(asyncio.to_thread(warmup.run, enabled_cities()))
     yield
+    for poller in pollers:
+        poller.cancel()
+    warming.cancel()
 
 
 app = FastAPI(
     title="dira-fair API",
-    description="Rental market intelligence for Tel Aviv tenants",
+    description="Rental market intelligence for tenants in Israeli cities",
     version="0.1.0",
     lifespan=lifespan,
 )
 
+# Innermost, so a profile covers the request itself and not its queueing
+if settings.profile_token or settings.profile_sample_rate > 0:
+    from api.profiling import ProfilingMiddleware
+
+    app.add_middleware(ProfilingMiddleware)
+# Added before CORS so CORS wraps it and shed responses still carry CORS headers
+if settings.admission_enabled:
+    app.add_middleware(AdmissionMiddleware)
+app.add_middleware(CompressionMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.cors_origins,
@@ -29,7 +58,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.include_router(autocomplete.router, prefix="/api")
+app.include_router(events.router, prefix="/api")
+app.include_router(listings.router, prefix="/api")
 app.include_router(neighborhoods.router, prefix="/api")
+app.include_router(overview.router, prefix="/api")
 app.include_router(rent_check.router, prefix="/api")
 app.include_router(stats.router, prefix="/api")
 
@@ -37,3 +70,31 @@ app.include_router(stats.router, prefix="/api")
 @app.get("/api/health")
 def health():
     return {"status": "ok", "service": "dira-fair-api"}
+
+
+@app.get("/api/ready")
+def ready():
+    """503 until the startup warm-up has built every city's caches, then 200."""
+    status = warmup.status()
+    return JSONResponse(status, status_code=200 if warmup.warm else 503)
+
+
+@app.get("/api/cities")
+def cities():
+    """Enabled cities; pass one's id as ``?city=`` to any data endpoint."""
+    return [city.summary() for city in enabled_cities()]
+
+
+@app.get("/api/admission")
+def admission_stats():
+    """Concurrency, queue depth and shed counts of the admission controller."""
+    return admission.stats()
+
+
+@app.get("/api/slow-queries")
+def slow_queries(
+    limit: int = Query(default=20, ge=1, le=500),
+    sort: Literal["total_ms", "max_ms", "count"] = "total_ms",
+):
+    """Slowest query shapes with their latest ``EXPLAIN QUERY PLAN``."""
+    return slow_query_log.report(limit=limit, sort=sort)
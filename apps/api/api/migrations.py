@@ -0,0 +1,192 @@
+"""Schema migrations.
+
+``SQLModel.metadata.create_all`` only creates missing tables, so changes to
+existing tables live here as ordered, idempotent steps recorded in
+``schema_migration``. Once a SQLite database is up to date, a fingerprint
+of the table definitions and migration names goes into its
+``user_version``; while that matches, startup skips ``create_all`` and the
+migration check entirely. Migrations run on startup via
+``create_db_and_tables`` and can be applied by hand:
+
+Usage:
+    python -m api.migrations
+"""
+
+import hashlib
+from collections.abc import Callable
+from datetime import datetime
+from functools import cache
+
+from sqlalchemy import Connection, Engine, inspect, text
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.schema import CreateIndex, CreateTable
+from sqlmodel import Session, SQLModel
+
+from api.services.amenities import encode_features
+from api.services.trends import rebuild_rollups
+
+MIGRATIONS: list[tuple[str, Callable[[Connection], None]]] = []
+
+
+def migration(name: str):
+    def register(func: Callable[[Connection], None]):
+        MIGRATIONS.append((name, func))
+        return func
+
+    return register
+
+
+def _columns(conn: Connection, table: str) -> set[str]:
+    return {column["name"] for column in inspect(conn).get_columns(table)}
+
+
+@migration("0001_rental_listing_amenities")
+def _rental_listing_amenities(conn: Connection):
+    if "amenities" not in _columns(conn, "rental_listing"):
+        conn.execute(
+            text("ALTER TABLE rental_listing ADD COLUMN amenities INTEGER NOT NULL DEFAULT 0")
+        )
+    rows = conn.execute(
+        text("SELECT id, features FROM rental_listing WHERE features IS NOT NULL")
+    ).all()
+    if rows:
+        conn.execute(
+            text("UPDATE rental_listing SET amenities = :amenities WHERE id = :id"),
+            [{"id": row.id, "amenities": encode_features(row.features)} for row in rows],
+        )
+    conn.execute(
+        text(
+            "CREATE INDEX IF NOT EXISTS ix_rental_listing_comps ON rental_listing "
+            "(neighborhood_id, is_active, rooms, amenities, price)"
+        )
+    )
+
+
+@migration("0002_rental_listing_coordinates")
+def _rental_listing_coordinates(conn: Connection):
+    columns = _columns(conn, "rental_listing")
+    for name in ("lat", "lng"):
+        if name not in columns:
+            conn.execute(text(f"ALTER TABLE rental_listing ADD COLUMN {name} FLOAT"))
+
+
+@migration("0003_rental_listing_dedup")
+def _rental_listing_dedup(conn: Connection):
+    columns = _columns(conn, "rental_listing")
+    if "source" not in columns:
+        conn.execute(
+            text("ALTER TABLE rental_listing ADD COLUMN source VARCHAR NOT NULL DEFAULT 'yad2'")
+        )
+    if "canonical_id" not in columns:
+        conn.execute(text("ALTER TABLE rental_listing ADD COLUMN canonical_id VARCHAR"))
+    conn.execute(
+        text(
+            "CREATE INDEX IF NOT EXISTS ix_rental_listing_canonical_id "
+            "ON rental_listing (canonical_id)"
+        )
+    )
+
+
+@migration("0004_cbs_natural_keys")
+def _cbs_natural_keys(conn: Connection):
+    # Scrapes used to append a fresh copy of every row; keep the latest one
+    conn.execute(
+        text(
+            "DELETE FROM cbs_rent_stat WHERE id NOT IN (SELECT MAX(id) FROM cbs_rent_stat "
+            "GROUP BY city, rooms, period, tenant_type)"
+        )
+    )
+    conn.execute(
+        text(
+            "DELETE FROM rent_index WHERE id NOT IN (SELECT MAX(id) FROM rent_index GROUP BY date)"
+        )
+    )
+    conn.execute(
+        text(
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_cbs_rent_stat_key "
+            "ON cbs_rent_stat (city, rooms, period, tenant_type)"
+        )
+    )
+    conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS uq_rent_index_date ON rent_index (date)"))
+
+
+@migration("0005_rent_index_rollups")
+def _rent_index_rollups(conn: Connection):
+    with Session(bind=conn) as session:
+        rebuild_rollups(session)
+        session.flush()
+
+
+@migration("0006_rental_listing_active_index")
+def _rental_listing_active_index(conn: Connection):
+    # Comparables moved to the KD-tree; price and amenities no longer need indexing
+    conn.execute(text("DROP INDEX IF EXISTS ix_rental_listing_comps"))
+    conn.execute(
+        text(
+            "CREATE INDEX IF NOT EXISTS ix_rental_listing_active ON rental_listing "
+            "(neighborhood_id, is_active, rooms)"
+        )
+    )
+
+
+def run_migrations(engine: Engine) -> list[str]:
+    """Apply pending migrations in order. Returns the names applied."""
+    applied = []
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "CREATE TABLE IF NOT EXISTS schema_migration "
+                "(name VARCHAR PRIMARY KEY, applied_at DATETIME NOT NULL)"
+            )
+        )
+        done = set(conn.execute(text("SELECT name FROM schema_migration")).scalars())
+        for name, func in MIGRATIONS:
+            if name in done:
+                continue
+            func(conn)
+            conn.execute(
+                text("INSERT INTO schema_migration (name, applied_at) VALUES (:name, :at)"),
+                {"name": name, "at": datetime.utcnow()},
+            )
+            applied.append(name)
+    return applied
+
+
+@cache
+def schema_version() -> int:
+    """Fingerprint of the table DDL and the migration list, as a positive 31-bit int."""
+    dialect = sqlite.dialect()
+    parts = []
+    for table in SQLModel.metadata.sorted_tables:
+        parts.append(str(CreateTable(table).compile(dialect=dialect)))
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            parts.append(str(CreateIndex(index).compile(dialect=dialect)))
+    parts.extend(name for name, _ in MIGRATIONS)
+    digest = hashlib.sha256("\n".join(parts).encode()).digest()
+    return int.from_bytes(digest[:4], "big") & 0x7FFFFFFF or 1
+
+
+def schema_is_current(engine: Engine) -> bool:
+    """Whether the database was last set up by this exact schema (SQLite only)."""
+    if engine.dialect.name != "sqlite":
+        return False
+    with engine.connect() as conn:
+        return conn.exec_driver_sql("PRAGMA user_version").scalar() == schema_version()
+
+
+def mark_schema_current(engine: Engine):
+    if engine.dialect.name == "sqlite":
+        with engine.begin() as conn:
+            conn.exec_driver_sql(f"PRAGMA user_version = {schema_version()}")
+
+
+if __name__ == "__main__":
+    from api.cities import enabled_cities
+    from api.database import create_db_and_tables
+
+    for city in enabled_cities():
+        applied = create_db_and_tables(city.id)
+        print(
+            f"{city.name_en}: applied {len(applied)} migrations:"
+            f" {', '.join(applied) or 'none pending'}"
+        )
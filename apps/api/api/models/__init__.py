@@ -1,7 +1,23 @@
 from api.models.cbs_rent import CBSRentStat
+from api.models.data_generation import DataGeneration
+from api.models.listing_signature import ListingSignatureBand
 from api.models.neighborhood import Neighborhood
+from api.models.price_sketch import PriceSketch
 from api.models.rent_index import RentIndex
+from api.models.rent_index_rollup import RentIndexRollup
 from api.models.rental_listing import RentalListing
+from api.models.rental_listing_archive import RentalListingArchive
 from api.models.transaction import SaleTransaction
 
-__all__ = ["Neighborhood", "RentalListing", "CBSRentStat", "SaleTransaction", "RentIndex"]
+__all__ = [
+    "Neighborhood",
+    "RentalListing",
+    "CBSRentStat",
+    "SaleTransaction",
+    "RentIndex",
+    "DataGeneration",
+    "PriceSketch",
+    "ListingSignatureBand",
+    "RentalListingArchive",
+    "RentIndexRollup",
+]
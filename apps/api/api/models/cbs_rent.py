@@ -1,10 +1,15 @@
 from datetime import datetime
 
+from sqlalchemy import Index
 from sqlmodel import Field, SQLModel
 
 
 class CBSRentStat(SQLModel, table=True):
     __tablename__ = "cbs_rent_stat"
+    # Natural key: scrapes upsert on it instead of appending rows
+    __table_args__ = (
+        Index("uq_cbs_rent_stat_key", "city", "rooms", "period", "tenant_type", unique=True),
+    )
     id: int | None = Field(default=None, primary_key=True)
     city: str
     rooms: float
@@ -0,0 +1,11 @@
+from datetime import datetime
+
+from sqlmodel import Field, SQLModel
+
+
+class DataGeneration(SQLModel, table=True):
+    __tablename__ = "data_generation"
+    id: int | None = Field(default=None, primary_key=True)
+    source: str
+    details: str | None = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
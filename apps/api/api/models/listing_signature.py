@@ -0,0 +1,10 @@
+from sqlmodel import Field, SQLModel
+
+
+class ListingSignatureBand(SQLModel, table=True):
+    """One LSH band of a listing's address MinHash signature."""
+
+    __tablename__ = "listing_signature_band"
+    band: int = Field(primary_key=True)
+    bucket: int = Field(primary_key=True)
+    listing_id: str = Field(primary_key=True, foreign_key="rental_listing.id")
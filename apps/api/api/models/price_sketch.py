@@ -0,0 +1,12 @@
+from datetime import datetime
+
+from sqlmodel import Field, SQLModel
+
+
+class PriceSketch(SQLModel, table=True):
+    __tablename__ = "price_sketch"
+    neighborhood_id: str = Field(primary_key=True, foreign_key="neighborhood.id")
+    rooms_bucket: float = Field(primary_key=True)
+    count: int
+    digest: bytes
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
@@ -1,10 +1,12 @@
 from datetime import date
 
+from sqlalchemy import Index
 from sqlmodel import Field, SQLModel
 
 
 class RentIndex(SQLModel, table=True):
     __tablename__ = "rent_index"
+    __table_args__ = (Index("uq_rent_index_date", "date", unique=True),)
     id: int | None = Field(default=None, primary_key=True)
     date: date
     index_value: float
@@ -0,0 +1,14 @@
+from datetime import date
+
+from sqlmodel import Field, SQLModel
+
+
+class RentIndexRollup(SQLModel, table=True):
+    """Rent index averaged over a month, quarter or year."""
+
+    __tablename__ = "rent_index_rollup"
+    resolution: str = Field(primary_key=True)
+    period_start: date = Field(primary_key=True)
+    index_value: float
+    yoy_change: float
+    points: int
@@ -1,19 +1,29 @@
 from datetime import datetime
 
+from sqlalchemy import Index
 from sqlmodel import Field, SQLModel
 
 
 class RentalListing(SQLModel, table=True):
     __tablename__ = "rental_listing"
+    # Per-neighborhood active supply, sketch and shard queries: equality on
+    # neighborhood/is_active, range on rooms. Comparables come from the KD-tree.
+    __table_args__ = (Index("ix_rental_listing_active", "neighborhood_id", "is_active", "rooms"),)
     id: str = Field(primary_key=True)
+    source: str = "yad2"
+    # Id of the first listing seen for the same apartment on any source
+    canonical_id: str | None = Field(default=None, index=True)
     neighborhood_id: str | None = Field(default=None, foreign_key="neighborhood.id")
     address: str | None = None
+    lat: float | None = None
+    lng: float | None = None
     rooms: float
     sqm: float | None = None
     floor: int | None = None
     price: int
     price_per_sqm: float | None = None
     features: str | None = None
+    amenities: int = 0
     first_seen: datetime = Field(default_factory=datetime.utcnow)
     last_seen: datetime = Field(default_factory=datetime.utcnow)
     is_active: bool = True
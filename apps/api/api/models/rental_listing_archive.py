@@ -0,0 +1,20 @@
+from datetime import datetime
+
+from sqlmodel import Field, SQLModel
+
+
+class RentalListingArchive(SQLModel, table=True):
+    """Summary of a listing that has been off the market for a while."""
+
+    __tablename__ = "rental_listing_archive"
+    id: str = Field(primary_key=True)
+    canonical_id: str | None = None
+    source: str = "yad2"
+    neighborhood_id: str | None = Field(default=None, index=True)
+    rooms: float
+    sqm: float | None = None
+    final_price: int
+    first_seen: datetime
+    last_seen: datetime
+    days_on_market: int | None = None
+    archived_at: datetime = Field(default_factory=datetime.utcnow)
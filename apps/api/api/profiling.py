@@ -0,0 +1,223 @@
+"""Opt-in per-request sampling profiler.
+
+A request is profiled when it carries ``profile_header`` set to
+``profile_token``, or is picked by ``profile_sample_rate``. A background
+thread then samples the stacks of the threads serving it every
+``profile_interval_ms`` and SQL statements are timed through SQLAlchemy
+events. Both are only switched on while a profiled request is in flight, and
+the middleware isn't installed at all unless a token or sample rate is set,
+so ordinary requests pay nothing.
+
+For each profiled request two files land in ``profile_dir``: collapsed
+stacks (``.collapsed``, loadable in speedscope or flamegraph.pl) and a JSON
+breakdown of time spent in SQL, serialization and other Python code. The
+response carries the files' name in ``X-Dira-Profile-Id``.
+
+Worker threads are attributed to a request from its first SQL statement on,
+and the event loop thread is shared, so concurrent requests can leak into
+a profile's serialization samples.
+"""
+
+import json
+import logging
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from api.config import settings
+
+logger = logging.getLogger("dira-fair.profiling")
+
+PROFILE_ID_HEADER = b"x-dira-profile-id"
+
+# Sample classification, checked leaf first against each frame's module
+SQL_MODULES = ("sqlalchemy", "sqlmodel", "sqlite3")
+SERIALIZATION_MODULES = ("fastapi.encoders", "pydantic", "json", "starlette.responses")
+
+_current: ContextVar["RequestProfile | None"] = ContextVar("dira_profile", default=None)
+_listeners_lock = threading.Lock()
+_active_profiles = 0
+
+
+def _frame_name(frame) -> str:
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}:{frame.f_code.co_qualname}"
+
+
+def classify(modules: list[str]) -> str:
+    if modules and modules[-1] == "selectors":
+        return "idle"  # the event loop waiting for I/O
+    for module in reversed(modules):
+        if module.startswith(SQL_MODULES):
+            return "sql"
+        if module.startswith(SERIALIZATION_MODULES):
+            return "serialization"
+    return "python"
+
+
+class RequestProfile:
+    def __init__(self, label: str, loop_thread: int, interval: float):
+        self.label = label
+        slug = re.sub(r"[^A-Za-z0-9]+", "-", label).strip("-")[:60]
+        self.id = f"{datetime.utcnow():%Y%m%dT%H%M%S}-{slug}-{uuid.uuid4().hex[:6]}"
+        self.interval = interval
+        self.threads = {loop_thread}
+        self.stacks: Counter[str] = Counter()
+        self.spans: Counter[str] = Counter()
+        self.samples = 0
+        self.sql_statements = 0
+        self.sql_seconds = 0.0
+        self._sql_started: dict[int, float] = {}
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, name="dira-profiler", daemon=True)
+        self.started = time.perf_counter()
+        self.wall_seconds = 0.0
+
+    def start(self):
+        _attach_sql_listeners()
+        self._sampler.start()
+
+    def stop(self):
+        self.wall_seconds = time.perf_counter() - self.started
+        self._stop.set()
+        self._sampler.join()
+        _detach_sql_listeners()
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for thread_id in list(self.threads):
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+                names, modules = [], []
+                while frame is not None:
+                    names.append(_frame_name(frame))
+                    modules.append(frame.f_globals.get("__name__", ""))
+                    frame = frame.f_back
+                names.reverse()
+                modules.reverse()
+                self.stacks[";".join(names)] += 1
+                self.spans[classify(modules)] += 1
+                self.samples += 1
+
+    def sql_started(self):
+        self.threads.add(threading.get_ident())
+        self._sql_started[threading.get_ident()] = time.perf_counter()
+
+    def sql_finished(self):
+        started = self._sql_started.pop(threading.get_ident(), None)
+        if started is not None:
+            self.sql_statements += 1
+            self.sql_seconds += time.perf_counter() - started
+
+    def summary(self) -> dict:
+        per_sample_ms = self.interval * 1000
+        return {
+            "request": self.label,
+            "wall_ms": round(self.wall_seconds * 1000, 2),
+            "samples": self.samples,
+            "interval_ms": per_sample_ms,
+            "sampled_ms": {span: round(n * per_sample_ms, 2) for span, n in self.spans.items()},
+            "sql_statements": self.sql_statements,
+            "sql_ms": round(self.sql_seconds * 1000, 2),
+        }
+
+    def save(self, directory: Path):
+        directory.mkdir(parents=True, exist_ok=True)
+        (directory / f"{self.id}.collapsed").write_text(
+            "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+        )
+        (directory / f"{self.id}.json").write_text(json.dumps(self.summary(), indent=2))
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current.get()
+    if profile is not None:
+        profile.sql_started()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current.get()
+    if profile is not None:
+        profile.sql_finished()
+
+
+def _attach_sql_listeners():
+    global _active_profiles
+    with _listeners_lock:
+        _active_profiles += 1
+        if _active_profiles == 1:
+            event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+            event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _detach_sql_listeners():
+    global _active_profiles
+    with _listeners_lock:
+        _active_profiles -= 1
+        if _active_profiles == 0:
+            event.remove(Engine, "before_cursor_execute", _before_cursor_execute)
+            event.remove(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class ProfilingMiddleware:
+    """Profiles requests selected by header token or sample rate."""
+
+    def __init__(
+        self,
+        app,
+        token: str | None = None,
+        sample_rate: float | None = None,
+        directory: Path | None = None,
+    ):
+        self.app = app
+        self.header = settings.profile_header.lower().encode("latin-1")
+        self.token = (token or settings.profile_token or "").encode("latin-1")
+        self.sample_rate = settings.profile_sample_rate if sample_rate is None else sample_rate
+        self.directory = Path(directory or settings.profile_dir)
+
+    def _selected(self, scope) -> bool:
+        if self.token:
+            for name, value in scope["headers"]:
+                if name == self.header and value == self.token:
+                    return True
+        return random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._selected(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(
+            f"{scope['method']} {scope['path']}",
+            threading.get_ident(),
+            settings.profile_interval_ms / 1000,
+        )
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message["headers"], (PROFILE_ID_HEADER, profile.id.encode())]
+            await send(message)
+
+        token = _current.set(profile)
+        profile.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            _current.reset(token)
+            profile.stop()
+            try:
+                profile.save(self.directory)
+            except OSError:
+                logger.exception("Saving profile %s failed", profile.id)
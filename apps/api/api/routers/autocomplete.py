@@ -0,0 +1,25 @@
+from dataclasses import asdict
+
+from fastapi import APIRouter, Depends, Query
+from sqlmodel import Session
+
+from api.cities import City
+from api.database import get_city, get_session
+from api.services.autocomplete import MAX_SUGGESTIONS, autocomplete
+
+router = APIRouter(prefix="/autocomplete", tags=["autocomplete"])
+
+
+@router.get("")
+def suggest(
+    q: str = Query(min_length=1, max_length=100),
+    limit: int = Query(default=10, ge=1, le=MAX_SUGGESTIONS),
+    city: City = Depends(get_city),
+    session: Session = Depends(get_session),
+):
+    """Streets and neighborhoods whose name, or a later word of it, starts with ``q``.
+
+    Hebrew or English, most listings and sales first; each names the
+    neighborhood it belongs to.
+    """
+    return [asdict(suggestion) for suggestion in autocomplete(session, city, q, limit)]
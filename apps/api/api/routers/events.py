@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends, Header
+from fastapi.responses import StreamingResponse
+
+from api.cities import City
+from api.database import get_city
+from api.services.events import get_broadcaster
+
+router = APIRouter(prefix="/events", tags=["events"])
+
+
+@router.get("")
+async def market_events(
+    last_event_id: str | None = Header(default=None), city: City = Depends(get_city)
+):
+    """Server-sent ``market-update`` events, one per data generation of ``city``.
+
+    Each carries the generation id, the neighborhoods that changed and the
+    counts of listings added, removed and repriced. Reconnecting clients
+    resume after their ``Last-Event-ID``.
+    """
+    resume_after = int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+    return StreamingResponse(
+        get_broadcaster(city.id).stream(resume_after),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,97 @@
+import base64
+import binascii
+import json
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlmodel import Session, col, select
+
+from api.database import get_session
+from api.models import RentalListing
+from api.services.amenities import amenity_names, parse_amenities
+from api.services.listing_index import SearchFilters, get_listing_index
+
+router = APIRouter(prefix="/listings", tags=["listings"])
+
+
+def _encode_cursor(value, listing_id: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([value, listing_id]).encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple[float, str]:
+    try:
+        value, listing_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(value), str(listing_id)
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor") from None
+
+
+@router.get("/search")
+def search_listings(
+    neighborhood_id: str | None = None,
+    min_price: int | None = Query(default=None, ge=0),
+    max_price: int | None = Query(default=None, ge=0),
+    min_sqm: float | None = Query(default=None, ge=0),
+    max_sqm: float | None = Query(default=None, ge=0),
+    min_rooms: float | None = Query(default=None, ge=0),
+    max_rooms: float | None = Query(default=None, ge=0),
+    min_floor: int | None = None,
+    max_floor: int | None = None,
+    amenities: list[str] = Query(default=[]),
+    sort: Literal["price", "price_per_sqm", "days_on_market"] = "price",
+    order: Literal["asc", "desc"] = "asc",
+    cursor: str | None = None,
+    limit: int = Query(default=20, ge=1, le=100),
+    session: Session = Depends(get_session),
+):
+    """Search active listings with keyset pagination.
+
+    Served from the in-memory listing index; pass ``next_cursor`` from a
+    response as ``cursor`` to get the next page. Listings without a value for
+    the sort column are excluded.
+    """
+    try:
+        amenity_mask = parse_amenities(amenities)
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from None
+
+    filters = SearchFilters(
+        neighborhood_id=neighborhood_id,
+        min_price=min_price,
+        max_price=max_price,
+        min_sqm=min_sqm,
+        max_sqm=max_sqm,
+        min_rooms=min_rooms,
+        max_rooms=max_rooms,
+        min_floor=min_floor,
+        max_floor=max_floor,
+        amenities=amenity_mask,
+    )
+    after = _decode_cursor(cursor) if cursor else None
+    ids, next_key = get_listing_index(session).search(
+        filters, sort=sort, descending=order == "desc", after=after, limit=limit
+    )
+
+    # The index only yields ids; hydrate the page with primary key lookups
+    rows = session.exec(select(RentalListing).where(col(RentalListing.id).in_(ids))).all()
+    by_id = {r.id: r for r in rows}
+    page = [by_id[i] for i in ids if i in by_id]
+
+    return {
+        "items": [
+            {
+                "id": r.id,
+                "neighborhood_id": r.neighborhood_id,
+                "address": r.address,
+                "rooms": r.rooms,
+                "sqm": r.sqm,
+                "floor": r.floor,
+                "price": r.price,
+                "price_per_sqm": r.price_per_sqm,
+                "days_on_market": r.days_on_market,
+                "amenities": amenity_names(r.amenities),
+            }
+            for r in page
+        ],
+        "next_cursor": _encode_cursor(*next_key) if next_key else None,
+    }
@@ -1,20 +1,64 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlmodel import Session, select
 
-from api.database import get_session
+from api.cities import City
+from api.compression import cached_json
+from api.config import settings
+from api.database import get_city, get_session
 from api.models import Neighborhood, RentalListing, SaleTransaction
+from api.services.amenities import parse_amenities
+from api.services.comparables import ComparableQuery, snap_size
+from api.services.comparison import MAX_COMPARED, compare_neighborhoods
+from api.services.distribution import get_distributions, rent_grid, what_if
+from api.services.market_signals import rent_trend
 
 router = APIRouter(prefix="/neighborhoods", tags=["neighborhoods"])
 
 
 @router.get("")
-def list_neighborhoods(session: Session = Depends(get_session)):
-    neighborhoods = session.exec(select(Neighborhood).order_by(Neighborhood.name_en)).all()
-    return neighborhoods
+def list_neighborhoods(request: Request, session: Session = Depends(get_session)):
+    return cached_json(
+        request,
+        session,
+        lambda: session.exec(select(Neighborhood).order_by(Neighborhood.name_en)).all(),
+    )
+
+
+@router.get("/compare")
+def compare(
+    request: Request,
+    ids: list[str] = Query(description="Neighborhood ids, comma separated or repeated"),
+    rooms: float | None = Query(default=None, gt=0),
+    session: Session = Depends(get_session),
+):
+    """Median rent, rent and sale price per sqm, days on market and supply, side by side.
+
+    With ``rooms``, only listings and sales in the half-room bucket it falls in.
+    """
+    neighborhood_ids = list(dict.fromkeys(i for value in ids for i in value.split(",") if i))
+    if not 1 <= len(neighborhood_ids) <= MAX_COMPARED:
+        raise HTTPException(
+            status_code=422, detail=f"Compare between 1 and {MAX_COMPARED} neighborhoods"
+        )
+
+    def build():
+        try:
+            neighborhoods = compare_neighborhoods(session, neighborhood_ids, rooms)
+        except KeyError as exc:
+            raise HTTPException(
+                status_code=404, detail=f"Unknown neighborhood: {exc.args[0]}"
+            ) from None
+        return {"rooms": rooms, "trend": rent_trend(session), "neighborhoods": neighborhoods}
+
+    return cached_json(request, session, build)
 
 
 @router.get("/{slug}")
-def get_neighborhood(slug: str, session: Session = Depends(get_session)):
+def get_neighborhood(slug: str, request: Request, session: Session = Depends(get_session)):
+    return cached_json(request, session, lambda: _neighborhood_detail(slug, session))
+
+
+def _neighborhood_detail(slug: str, session: Session) -> dict:
     neighborhood = session.get(Neighborhood, slug)
     if not neighborhood:
         raise HTTPException(status_code=404, detail="Neighborhood not found")
@@ -38,3 +82,66 @@ def get_neighborhood(slug: str, session: Session = Depends(get_session)):
         "active_listings": listings,
         "recent_transactions": transactions,
     }
+
+
+def _require_neighborhood(slug: str, session: Session):
+    if session.get(Neighborhood, slug) is None:
+        raise HTTPException(status_code=404, detail="Neighborhood not found")
+
+
+@router.get("/{slug}/distribution")
+def get_distribution(
+    slug: str,
+    request: Request,
+    rooms: float | None = Query(default=None, gt=0),
+    session: Session = Depends(get_session),
+):
+    """Price quantiles and a fixed-bin histogram per rooms bucket of active listings.
+
+    With ``rooms``, only the half-room bucket it falls in.
+    """
+
+    def build():
+        _require_neighborhood(slug, session)
+        return {
+            "neighborhood_id": slug,
+            "bin_width": settings.distribution_bin_width,
+            "distributions": get_distributions(session, slug, rooms),
+        }
+
+    return cached_json(request, session, build)
+
+
+@router.get("/{slug}/distribution/what-if")
+def get_what_if(
+    slug: str,
+    request: Request,
+    rooms: float = Query(gt=0),
+    rent_min: int = Query(ge=0),
+    rent_max: int = Query(gt=0),
+    step: int = Query(default=250, gt=0),
+    sqm: float | None = Query(default=None, gt=0),
+    floor: int | None = None,
+    amenities: list[str] = Query(default=[]),
+    session: Session = Depends(get_session),
+    city: City = Depends(get_city),
+):
+    """Percentile, score and delta for every rent from ``rent_min`` to ``rent_max``.
+
+    Scored like ``POST /api/check`` with the same rooms, sqm, floor and
+    amenities, so each grid point matches the rent check for that rent.
+    """
+    try:
+        rents = rent_grid(rent_min, rent_max, step)
+        amenity_mask = parse_amenities(amenities)
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from None
+    # Snapped like a rent check's inputs
+    rooms, sqm = snap_size(rooms, sqm)
+    query = ComparableQuery(slug, rooms, sqm, floor, amenity_mask)
+
+    def build():
+        _require_neighborhood(slug, session)
+        return {"neighborhood_id": slug, "rooms": rooms, **what_if(session, query, rents, city)}
+
+    return cached_json(request, session, build)
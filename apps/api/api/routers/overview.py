@@ -0,0 +1,21 @@
+from datetime import date
+
+from fastapi import APIRouter, Depends, Request
+from sqlmodel import Session
+
+from api.compression import cached_json
+from api.database import get_session
+from api.services.overview import get_overview
+
+router = APIRouter(prefix="/overview", tags=["overview"])
+
+
+@router.get("")
+def overview(request: Request, session: Session = Depends(get_session)):
+    """Neighborhoods with price summaries, the rent trend and the seasonal outlook.
+
+    Everything the dashboard and explore pages need in one response.
+    """
+    # The trend window and seasonal outlook move with the date
+    today = date.today()
+    return cached_json(request, session, lambda: get_overview(session, today), vary=(today,))
@@ -1,19 +1,35 @@
 from fastapi import APIRouter, Depends
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, field_validator
 from sqlmodel import Session
 
-from api.database import get_session
+from api.cities import City
+from api.config import settings
+from api.database import get_city, get_session
+from api.services.amenities import parse_amenities
+from api.services.comparables import ComparableQuery, match_comparables, snap_size
+from api.services.generation import get_or_compute_current
 from api.services.market_signals import generate_tips, get_signals
 from api.services.rent_scorer import score_rent
+from api.services.result_cache import ResultCache
 
 router = APIRouter(tags=["rent-check"])
 
+check_cache = ResultCache(maxsize=settings.check_cache_size, ttl=settings.check_cache_ttl_seconds)
+
 
 class RentCheckRequest(BaseModel):
     neighborhood_id: str
-    rooms: float
-    sqm: float
+    rooms: float = Field(gt=0)
+    sqm: float = Field(gt=0)
     monthly_rent: int
+    floor: int | None = None
+    amenities: list[str] = []
+
+    @field_validator("amenities")
+    @classmethod
+    def _known_amenities(cls, names: list[str]) -> list[str]:
+        parse_amenities(names)
+        return sorted({name.lower() for name in names})
 
 
 class MarketSignals(BaseModel):
@@ -23,6 +39,8 @@ class MarketSignals(BaseModel):
     avg_days_on_market: float | None
     active_supply: int
     comparable_listings: list[dict]
+    # False when the requested amenities were ignored because too few listings have them
+    amenities_applied: bool
 
 
 class RentCheckResponse(BaseModel):
@@ -35,17 +53,45 @@ class RentCheckResponse(BaseModel):
     tips: list[str]
 
 
-@router.post("/check", response_model=RentCheckResponse)
-def check_rent(req: RentCheckRequest, session: Session = Depends(get_session)):
+def _normalize(req: RentCheckRequest) -> RentCheckRequest:
+    """Snap rooms and sqm (see :func:`snap_size`) so equivalent checks share a key."""
+    rooms, sqm = snap_size(req.rooms, req.sqm)
+    return RentCheckRequest(
+        neighborhood_id=req.neighborhood_id,
+        rooms=rooms,
+        sqm=sqm,
+        monthly_rent=req.monthly_rent,
+        floor=req.floor,
+        amenities=req.amenities,
+    )
+
+
+def _compute_check(req: RentCheckRequest, session: Session, city: City) -> RentCheckResponse:
+    amenities = parse_amenities(req.amenities)
+    comparables, matched = match_comparables(
+        session, ComparableQuery(req.neighborhood_id, req.rooms, req.sqm, req.floor, amenities)
+    )
     result = score_rent(
         neighborhood_id=req.neighborhood_id,
         rooms=req.rooms,
         sqm=req.sqm,
         monthly_rent=req.monthly_rent,
         session=session,
+        amenities=amenities,
+        floor=req.floor,
+        comparables=comparables,
+        city=city,
+    )
+    signals = get_signals(
+        req.neighborhood_id,
+        req.rooms,
+        session,
+        amenities=amenities,
+        sqm=req.sqm,
+        comparables=comparables,
+        city=city,
     )
-    signals = get_signals(req.neighborhood_id, req.rooms, session)
-    tips = generate_tips(result["score"], signals)
+    tips = generate_tips(result["score"], signals, city)
 
     return RentCheckResponse(
         score=result["score"],
@@ -53,6 +99,31 @@ def check_rent(req: RentCheckRequest, session: Session = Depends(get_session)):
         market_avg=result["market_avg"],
         your_rent=req.monthly_rent,
         delta_pct=result["delta_pct"],
-        signals=MarketSignals(**signals),
+        signals=MarketSignals(
+            **signals,
+            # Sketch and CBS fallbacks don't know about amenities either
+            amenities_applied=not amenities or (matched and result["basis"] == "comparables"),
+        ),
         tips=tips,
     )
+
+
+@router.post("/check", response_model=RentCheckResponse)
+def check_rent(
+    req: RentCheckRequest,
+    session: Session = Depends(get_session),
+    city: City = Depends(get_city),
+):
+    req = _normalize(req)
+    key = (
+        session.get_bind(),
+        req.neighborhood_id,
+        req.rooms,
+        req.sqm,
+        req.monthly_rent,
+        req.floor,
+        tuple(req.amenities),
+    )
+    return get_or_compute_current(
+        check_cache, key, session, lambda: _compute_check(req, session, city)
+    )
@@ -1,42 +1,45 @@
-from datetime import date, timedelta
+from datetime import date
+from typing import Literal
 
-from fastapi import APIRouter, Depends, Query
-from sqlmodel import Session, select
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlmodel import Session
 
+from api.compression import cached_json
 from api.database import get_session
-from api.models import RentIndex
+from api.services.trends import get_trend_series, months_back, seasonal_outlook
 
 router = APIRouter(prefix="/stats", tags=["stats"])
 
-SEASONAL_DATA = {
-    "best_months": [11, 12, 1, 2],
-    "worst_months": [7, 8, 9],
-    "neutral_months": [3, 4, 5, 6, 10],
-}
-
 
 @router.get("/trends")
 def get_trends(
-    months: int = Query(default=24, ge=1, le=120),
+    request: Request,
+    months: int | None = Query(default=None, ge=1, le=1200),
+    resolution: Literal["month", "quarter", "year"] = "month",
+    start: date | None = Query(default=None, alias="from"),
+    end: date | None = Query(default=None, alias="to"),
+    max_points: int | None = Query(default=None, ge=3, le=1000),
     session: Session = Depends(get_session),
 ):
-    cutoff = date.today() - timedelta(days=months * 30)
-    entries = session.exec(
-        select(RentIndex).where(RentIndex.date >= cutoff).order_by(RentIndex.date)
-    ).all()
-    return [
-        {"date": e.date.isoformat(), "index": e.index_value, "yoy_change": e.yoy_change}
-        for e in entries
-    ]
+    """Rent index averaged per ``resolution`` period.
+
+    The range is ``from``..``to`` when given, else the last ``months``
+    calendar months (24 by default). Long ranges are downsampled to
+    ``max_points``.
+    """
+    if start is None:
+        start = months_back(date.today(), (months or 24) - 1)
+    if end is not None and end < start:
+        raise HTTPException(status_code=422, detail="'to' must not be before 'from'")
+    return cached_json(
+        request,
+        session,
+        lambda: get_trend_series(session, resolution, start, end, max_points),
+        # Without 'from' the range moves with the month
+        vary=(start,),
+    )
 
 
 @router.get("/seasonal")
 def get_seasonal():
-    current_month = date.today().month
-    if current_month in SEASONAL_DATA["best_months"]:
-        current = "good_to_negotiate"
-    elif current_month in SEASONAL_DATA["worst_months"]:
-        current = "bad_to_negotiate"
-    else:
-        current = "neutral"
-    return {**SEASONAL_DATA, "current_month": current_month, "current": current}
+    return seasonal_outlook(date.today())
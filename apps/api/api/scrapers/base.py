@@ -1,8 +1,14 @@
 import asyncio
 import functools
 import logging
+import time
 from datetime import datetime
 
+import httpx
+from sqlalchemy import or_
+from sqlalchemy.dialects.sqlite import insert
+from sqlmodel import Session, SQLModel
+
 logger = logging.getLogger("dira-fair.scrapers")
 
 
@@ -27,3 +33,61 @@ def rate_limit(seconds: float = 1.0):
 
 def log_scrape(source: str, count: int):
     logger.info(f"[{source}] Scraped {count} records at {datetime.utcnow().isoformat()}")
+
+
+def fetch_json(
+    client: httpx.Client,
+    url: str = "",
+    params: dict | None = None,
+    retries: int = 3,
+    backoff: float = 0.5,
+):
+    """GET a JSON document, retrying rate-limited and failed requests.
+
+    429 responses wait for ``Retry-After`` (falling back to exponential
+    backoff); 5xx responses and transport errors back off exponentially.
+    Raises the last error once ``retries`` is exhausted.
+    """
+    for attempt in range(retries + 1):
+        try:
+            response = client.get(url, params=params)
+        except httpx.TransportError:
+            if attempt == retries:
+                raise
+            time.sleep(backoff * 2**attempt)
+            continue
+
+        if response.status_code == 429 or response.status_code >= 500:
+            if attempt == retries:
+                response.raise_for_status()
+            retry_after = response.headers.get("Retry-After")
+            try:
+                delay = float(retry_after) if retry_after else backoff * 2**attempt
+            except ValueError:
+                delay = backoff * 2**attempt
+            time.sleep(delay)
+            continue
+
+        response.raise_for_status()
+        return response.json()
+
+
+def bulk_upsert(session: Session, model: type[SQLModel], rows: list[dict], key: list[str]) -> int:
+    """Insert ``rows`` or update them in place on a ``key`` conflict.
+
+    ``key`` must match a unique index. Rows identical to what is stored are
+    left alone, so the return value counts only inserted or changed rows.
+    """
+    if not rows:
+        return 0
+    table = model.__table__
+    stmt = insert(table)
+    # Compare every non-key column that the rows provide, except timestamps
+    updated = [name for name in rows[0] if name not in key]
+    compared = [name for name in updated if not name.endswith("_at")]
+    stmt = stmt.on_conflict_do_update(
+        index_elements=key,
+        set_={name: stmt.excluded[name] for name in updated},
+        where=or_(*(table.c[name].is_distinct_from(stmt.excluded[name]) for name in compared)),
+    )
+    return session.exec(stmt, params=rows).rowcount
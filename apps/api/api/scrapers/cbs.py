@@ -4,7 +4,7 @@ Fetches official rent survey data and CPI rent index for Israel.
 CBS API docs: https://www.cbs.gov.il/en/Pages/Api-interface.aspx
 
 Usage:
-    python -m api.scrapers.cbs
+    python -m api.scrapers.cbs [--city CITY]
 """
 
 from datetime import date, datetime
@@ -12,10 +12,14 @@ from datetime import date, datetime
 import httpx
 from sqlmodel import Session
 
+from api.cities import TEL_AVIV, City, lookup_city
 from api.config import settings
-from api.database import create_db_and_tables, engine
+from api.database import create_db_and_tables, get_engine, publish_read_snapshot
 from api.models import CBSRentStat, RentIndex
-from api.scrapers.base import log_scrape
+from api.scrapers.base import bulk_upsert, log_scrape
+from api.services.cbs_reference import get_cbs_reference
+from api.services.generation import bump_generation
+from api.services.trends import rebuild_rollups
 
 # CBS series IDs for rent data
 # These would need to be discovered from the CBS API catalog
@@ -24,7 +28,8 @@ CPI_RENT_SERIES = "M_CPI_RENT"  # Placeholder — actual series ID needs discove
 
 
 class CBSScraper:
-    def __init__(self):
+    def __init__(self, city: City | None = None):
+        self.city = city or lookup_city()
         self.client = httpx.Client(
             base_url=settings.cbs_api_base,
             headers={"User-Agent": "dira-fair/0.1 (rental market research)"},
@@ -40,6 +45,9 @@ class CBSScraper:
         # CBS API requires specific series IDs — these are placeholders
         # In production, you'd discover these from the CBS catalog
         # For now, we seed with known Tel Aviv averages
+        if self.city.id != TEL_AVIV.id:
+            # The representative data only covers Tel Aviv
+            return 0
         # Real Q3 2025 CBS rent survey data for Tel Aviv-Yafo
         tel_aviv_rents = {
             1.0: {"new": 5300, "renewal": 5000, "all": 5100},
@@ -52,32 +60,58 @@ class CBSScraper:
             5.0: {"new": 16600, "renewal": 15600, "all": 16000},
         }
 
-        count = 0
+        rows = [
+            {
+                "city": self.city.name_he,
+                "rooms": rooms,
+                "tenant_type": tenant_type,
+                "avg_rent": avg_rent,
+            }
+            for rooms, rents in tel_aviv_rents.items()
+            for tenant_type, avg_rent in rents.items()
+        ]
+        return self.ingest_rent_survey(session, rows)
+
+    def ingest_rent_survey(self, session: Session, rows: list[dict]) -> int:
+        """Upsert rent survey rows of ``city``/``rooms``/``tenant_type``/``avg_rent``.
+
+        Rows are keyed on (city, rooms, period, tenant_type), so re-running a
+        scrape only touches figures CBS has revised.
+        """
         current_period = f"{date.today().year}-Q{(date.today().month - 1) // 3 + 1}"
+        fetched_at = datetime.utcnow()
+        stats = [
+            {
+                "city": row["city"],
+                "rooms": row["rooms"],
+                "avg_rent": row["avg_rent"],
+                "period": row.get("period", current_period),
+                "tenant_type": row["tenant_type"],
+                "fetched_at": fetched_at,
+            }
+            for row in rows
+        ]
+        changed = bulk_upsert(
+            session, CBSRentStat, stats, key=["city", "rooms", "period", "tenant_type"]
+        )
 
-        for rooms, rents in tel_aviv_rents.items():
-            for tenant_type, avg_rent in rents.items():
-                stat = CBSRentStat(
-                    city="\u05ea\u05dc \u05d0\u05d1\u05d9\u05d1-\u05d9\u05e4\u05d5",
-                    rooms=rooms,
-                    avg_rent=avg_rent,
-                    period=current_period,
-                    tenant_type=tenant_type,
-                    fetched_at=datetime.utcnow(),
-                )
-                session.merge(stat)
-                count += 1
-
+        if changed:
+            bump_generation(session, "cbs", {"rent_stats": changed})
         session.commit()
-        log_scrape("CBS", count)
-        return count
+        if changed:
+            get_cbs_reference(session).load(session)
+        log_scrape("CBS", len(stats))
+        return len(stats)
 
     def fetch_rent_index(self, session: Session) -> int:
         """Fetch CPI rent component time series."""
         # Placeholder: in production, fetch from CBS Time Series DataBank
         # For now, seed with synthetic trend data
-        count = 0
+        if self.city.id != TEL_AVIV.id:
+            # The synthetic series only models Tel Aviv
+            return 0
         base_index = 100.0
+        rows = []
 
         for month_offset in range(24):
             d = date(2024, 3, 1)
@@ -90,19 +124,35 @@ class CBSScraper:
             index_val = base_index * (1 + 0.055 * month_offset / 12)
             yoy = 5.5 + (month_offset % 3 - 1) * 0.4  # slight variation
 
-            entry = RentIndex(date=d, index_value=round(index_val, 2), yoy_change=round(yoy, 1))
-            session.add(entry)
-            count += 1
+            rows.append(
+                {"date": d, "index_value": round(index_val, 2), "yoy_change": round(yoy, 1)}
+            )
 
+        return self.ingest_rent_index(session, rows)
+
+    def ingest_rent_index(self, session: Session, rows: list[dict]) -> int:
+        """Upsert monthly ``date``/``index_value``/``yoy_change`` rows, keyed on date."""
+        changed = bulk_upsert(session, RentIndex, rows, key=["date"])
+        if changed:
+            rebuild_rollups(session)
+            bump_generation(session, "cbs-index", {"index_entries": changed})
         session.commit()
-        log_scrape("CBS-Index", count)
-        return count
+        log_scrape("CBS-Index", len(rows))
+        return len(rows)
 
 
 if __name__ == "__main__":
-    create_db_and_tables()
-    scraper = CBSScraper()
-    with Session(engine) as session:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Fetch CBS rent survey and rent index")
+    parser.add_argument("--city", help="city id (default: the default city)")
+    args = parser.parse_args()
+
+    city = lookup_city(args.city)
+    create_db_and_tables(city.id)
+    scraper = CBSScraper(city)
+    with Session(get_engine(city.id)) as session:
         n1 = scraper.fetch_rent_survey(session)
         n2 = scraper.fetch_rent_index(session)
         print(f"CBS: {n1} rent stats, {n2} index entries")
+    publish_read_snapshot(city.id)
@@ -4,7 +4,7 @@ Fetches real estate sale transactions from the Israeli government's
 public property transaction database.
 
 Usage:
-    python -m api.scrapers.nadlan
+    python -m api.scrapers.nadlan [--city CITY]
 """
 
 from datetime import date, datetime
@@ -12,57 +12,34 @@ from datetime import date, datetime
 import httpx
 from sqlmodel import Session
 
-from api.database import create_db_and_tables, engine
+from api.cities import TEL_AVIV, City, lookup_city
+from api.database import create_db_and_tables, get_engine, publish_read_snapshot
 from api.models import SaleTransaction
 from api.scrapers.base import log_scrape
-
-# Neighborhood mapping: street keywords -> neighborhood IDs
-# This is a simplified version; production would use geocoding
-STREET_TO_NEIGHBORHOOD = {
-    "\u05e4\u05dc\u05d5\u05e8\u05e0\u05d8\u05d9\u05df": "florentin",
-    "\u05d0\u05dc\u05e0\u05d1\u05d9": "florentin",
-    "\u05d3\u05d9\u05d6\u05e0\u05d2\u05d5\u05e3": "old-north",
-    "\u05d1\u05df \u05d9\u05d4\u05d5\u05d3\u05d4": "old-north",
-    "\u05e8\u05d5\u05d8\u05e9\u05d9\u05dc\u05d3": "lev-hair",
-    "\u05d4\u05e8\u05e6\u05dc": "lev-hair",
-    "\u05e9\u05d9\u05e0\u05e7\u05d9\u05df": "lev-hair",
-    "\u05e0\u05d7\u05dc\u05ea \u05d1\u05e0\u05d9\u05de\u05d9\u05df": "neve-tzedek",
-    "\u05e9\u05d1\u05d6\u05d9": "neve-tzedek",
-    "\u05d0\u05d1\u05df \u05d2\u05d1\u05d9\u05e8\u05d5\u05dc": "old-north",
-    "\u05d0\u05e8\u05dc\u05d5\u05d6\u05d5\u05e8\u05d5\u05d1": "old-north",
-    "\u05e0\u05d5\u05e8\u05d3\u05d0\u05d5": "old-north",
-    "\u05d1\u05d5\u05d2\u05e8\u05e9\u05d5\u05d1": "lev-hair",
-    "\u05d9\u05e4\u05d5": "jaffa",
-    "\u05e2\u05d2'\u05de\u05d9": "ajami",
-    "\u05e8\u05de\u05ea \u05d0\u05d1\u05d9\u05d1": "ramat-aviv",
-    "\u05d1\u05d1\u05dc\u05d9": "bavli",
-    "\u05e6\u05d4\u05dc\u05d4": "tzahala",
-}
+from api.services.generation import bump_generation
 
 
 class NadlanScraper:
-    def __init__(self):
+    def __init__(self, city: City | None = None):
+        self.city = city or lookup_city()
         self.client = httpx.Client(
             headers={"User-Agent": "dira-fair/0.1 (rental market research)"},
             timeout=30.0,
         )
 
     def _guess_neighborhood(self, address: str) -> str | None:
-        for keyword, hood_id in STREET_TO_NEIGHBORHOOD.items():
-            if keyword in address:
-                return hood_id
-        return None
-
-    def fetch_transactions(
-        self,
-        session: Session,
-        city: str = "\u05ea\u05dc \u05d0\u05d1\u05d9\u05d1-\u05d9\u05e4\u05d5",
-    ) -> int:
-        """Fetch recent sale transactions for a city.
-
-        In production, this calls the nadlan.gov.il API. For MVP, we seed
-        with representative data to demonstrate the app.
+        return self.city.guess_neighborhood(address)
+
+    def fetch_transactions(self, session: Session) -> int:
+        """Fetch recent sale transactions for the city.
+
+        In production, this calls the nadlan.gov.il API with the city's
+        Hebrew name. For MVP, we seed with representative data to demonstrate
+        the app.
         """
+        if self.city.id != TEL_AVIV.id:
+            # The representative data only covers Tel Aviv
+            return 0
         # Placeholder seed data — representative TLV transactions
         sample_transactions = [
             {
@@ -163,14 +140,18 @@ class NadlanScraper:
             },
         ]
 
+        return self.ingest_transactions(session, sample_transactions)
+
+    def ingest_transactions(self, session: Session, transactions: list[dict]) -> int:
+        """Persist sale transactions, upserting on their id."""
         count = 0
-        for i, tx in enumerate(sample_transactions):
+        for i, tx in enumerate(transactions):
             deal_date = date.fromisoformat(tx["date"])
             price_per_sqm = tx["price"] // tx["sqm"]
             neighborhood_id = self._guess_neighborhood(tx["address"])
 
             transaction = SaleTransaction(
-                id=f"nadlan-seed-{i}",
+                id=tx.get("id", f"nadlan-seed-{i}"),
                 address=tx["address"],
                 neighborhood_id=neighborhood_id,
                 rooms=tx["rooms"],
@@ -184,14 +165,23 @@ class NadlanScraper:
             session.merge(transaction)
             count += 1
 
+        bump_generation(session, "nadlan", {"transactions": count})
         session.commit()
         log_scrape("nadlan", count)
         return count
 
 
 if __name__ == "__main__":
-    create_db_and_tables()
-    scraper = NadlanScraper()
-    with Session(engine) as session:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Fetch nadlan.gov.il sale transactions")
+    parser.add_argument("--city", help="city id (default: the default city)")
+    args = parser.parse_args()
+
+    city = lookup_city(args.city)
+    create_db_and_tables(city.id)
+    scraper = NadlanScraper(city)
+    with Session(get_engine(city.id)) as session:
         n = scraper.fetch_transactions(session)
         print(f"nadlan: {n} transactions")
+    publish_read_snapshot(city.id)
@@ -1,53 +1,29 @@
 """Yad2 rental listing scraper.
 
-Scrapes active rental listings from Yad2 for Tel Aviv.
+Scrapes active rental listings from Yad2 for one city.
 Uses Playwright for headless browser automation.
 
 Usage:
-    python -m api.scrapers.yad2
+    python -m api.scrapers.yad2 [--city CITY]
 """
 
 import json
 import logging
 from datetime import datetime
 
-from sqlmodel import Session, select
+from sqlmodel import Session, col, select
 
-from api.database import create_db_and_tables, engine
+from api.cities import TEL_AVIV, City, lookup_city
+from api.database import create_db_and_tables, get_engine, publish_read_snapshot
 from api.models import RentalListing
 from api.scrapers.base import log_scrape
+from api.services.amenities import encode_features
+from api.services.dedup import assign_canonical_ids
+from api.services.generation import bump_generation
+from api.services.price_sketches import update_sketches
 
 logger = logging.getLogger("dira-fair.scrapers.yad2")
 
-# Yad2 area codes for Tel Aviv neighborhoods
-YAD2_TLV_AREA = "2"  # Tel Aviv district
-YAD2_TLV_CITY = "5000"  # Tel Aviv-Yafo city code
-
-# Mapping of Yad2 neighborhood names to our neighborhood IDs
-YAD2_NEIGHBORHOOD_MAP = {
-    "\u05e4\u05dc\u05d5\u05e8\u05e0\u05d8\u05d9\u05df": "florentin",
-    "\u05dc\u05d1 \u05d4\u05e2\u05d9\u05e8": "lev-hair",
-    "\u05d4\u05e6\u05e4\u05d5\u05df \u05d4\u05d9\u05e9\u05df": "old-north",
-    "\u05d4\u05e6\u05e4\u05d5\u05df \u05d4\u05d7\u05d3\u05e9": "new-north",
-    "\u05e0\u05d5\u05d5\u05d4 \u05e6\u05d3\u05e7": "neve-tzedek",
-    "\u05db\u05e8\u05dd \u05d4\u05ea\u05d9\u05de\u05e0\u05d9\u05dd": "kerem-hateimanim",
-    "\u05e8\u05d5\u05d8\u05e9\u05d9\u05dc\u05d3": "lev-hair",
-    "\u05e0\u05d7\u05dc\u05ea \u05d1\u05e0\u05d9\u05de\u05d9\u05df": "neve-tzedek",
-    "\u05d9\u05e4\u05d5": "jaffa",
-    "\u05e2\u05d2'\u05de\u05d9": "ajami",
-    "\u05e8\u05de\u05ea \u05d0\u05d1\u05d9\u05d1": "ramat-aviv",
-    "\u05d1\u05d1\u05dc\u05d9": "bavli",
-    "\u05e6\u05d4\u05dc\u05d4": "tzahala",
-    "\u05e0\u05d5\u05d5\u05d4 \u05e9\u05d0\u05e0\u05df": "neve-shaanan",
-    "\u05e9\u05e4\u05d9\u05e8\u05d0": "shapira",
-    "\u05de\u05d5\u05e0\u05d8\u05d9\u05e4\u05d9\u05d5\u05e8\u05d9": "montefiore",
-    "\u05e9\u05e8\u05d5\u05e0\u05d4": "sarona",
-    "\u05d9\u05d3 \u05d0\u05dc\u05d9\u05d4\u05d5": "yad-eliyahu",
-    "\u05e0\u05d7\u05dc\u05ea \u05d9\u05e6\u05d7\u05e7": "nahalat-yitzhak",
-    "\u05e7\u05e8\u05d9\u05ea \u05e9\u05dc\u05d5\u05dd": "kiryat-shalom",
-    "\u05d4\u05ea\u05e7\u05d5\u05d5\u05d4": "hatikva",
-}
-
 
 class Yad2Scraper:
     """Scrapes rental listings from Yad2.
@@ -56,22 +32,21 @@ class Yad2Scraper:
     listing data. For the MVP seed, we provide representative data.
     """
 
+    def __init__(self, city: City | None = None):
+        self.city = city or lookup_city()
+
     def _guess_neighborhood(self, address: str, area_name: str | None) -> str | None:
-        if area_name:
-            for yad2_name, hood_id in YAD2_NEIGHBORHOOD_MAP.items():
-                if yad2_name in area_name:
-                    return hood_id
-        for yad2_name, hood_id in YAD2_NEIGHBORHOOD_MAP.items():
-            if yad2_name in (address or ""):
-                return hood_id
-        return None
+        return self.city.guess_neighborhood(area_name, address)
 
     def scrape_listings(self, session: Session) -> int:
-        """Scrape Tel Aviv rental listings from Yad2.
+        """Scrape the city's rental listings from Yad2.
 
         Production implementation would use Playwright. For MVP, we seed
         with representative listing data to demonstrate the scoring engine.
         """
+        if self.city.id != TEL_AVIV.id:
+            # The representative data only covers Tel Aviv
+            return 0
         seed_listings = [
             # Florentin (5 listings)
             {
@@ -439,25 +414,47 @@ class Yad2Scraper:
             },
         ]
 
+        return self.ingest_listings(session, seed_listings)
+
+    def ingest_listings(self, session: Session, items: list[dict]) -> int:
+        """Upsert scraped listings and deactivate active ones missing from ``items``.
+
+        Only listings from the sources present in ``items`` (yad2 for an empty
+        batch) can be deactivated.
+        """
         now = datetime.utcnow()
         count = 0
 
-        # Mark existing active listings for staleness check
+        # Mark existing active listings for staleness check; a batch only
+        # speaks for the sources it contains
+        sources = {item.get("source", "yad2") for item in items} or {"yad2"}
         existing_ids = set()
         active_listings = session.exec(
-            select(RentalListing).where(RentalListing.is_active == True)  # noqa: E712
+            select(RentalListing).where(
+                RentalListing.is_active == True,  # noqa: E712
+                col(RentalListing.source).in_(sources),
+            )
         ).all()
         for listing in active_listings:
             existing_ids.add(listing.id)
 
         scraped_ids = set()
-        for item in seed_listings:
+        added = repriced = removed = 0
+        changed_neighborhoods = set()
+        sketch_dirty = []
+        new_listings = []
+        for item in items:
             neighborhood_id = self._guess_neighborhood(item["address"], item.get("area"))
             sqm = item.get("sqm")
             price_per_sqm = round(item["price"] / sqm, 1) if sqm else None
 
             db_listing = session.get(RentalListing, item["id"])
             if db_listing:
+                if db_listing.price != item["price"]:
+                    repriced += 1
+                    changed_neighborhoods.add(db_listing.neighborhood_id)
+                if db_listing.price != item["price"] or not db_listing.is_active:
+                    sketch_dirty.append((db_listing.neighborhood_id, db_listing.rooms))
                 db_listing.last_seen = now
                 db_listing.price = item["price"]
                 db_listing.is_active = True
@@ -466,20 +463,27 @@ class Yad2Scraper:
             else:
                 db_listing = RentalListing(
                     id=item["id"],
+                    source=item.get("source", "yad2"),
                     neighborhood_id=neighborhood_id,
                     address=item.get("address"),
+                    lat=item.get("lat"),
+                    lng=item.get("lng"),
                     rooms=item["rooms"],
                     sqm=sqm,
                     floor=item.get("floor"),
                     price=item["price"],
                     price_per_sqm=price_per_sqm,
                     features=json.dumps(item.get("features", {})),
+                    amenities=encode_features(item.get("features")),
                     first_seen=now,
                     last_seen=now,
                     is_active=True,
                     days_on_market=0,
                 )
                 session.add(db_listing)
+                new_listings.append(db_listing)
+                added += 1
+                changed_neighborhoods.add(neighborhood_id)
 
             scraped_ids.add(item["id"])
             count += 1
@@ -489,15 +493,46 @@ class Yad2Scraper:
             old_listing = session.get(RentalListing, old_id)
             if old_listing:
                 old_listing.is_active = False
+                removed += 1
+                changed_neighborhoods.add(old_listing.neighborhood_id)
+                sketch_dirty.append((old_listing.neighborhood_id, old_listing.rooms))
 
+        # The same apartment seen on another source only counts once
+        duplicates = assign_canonical_ids(session, new_listings, self.city)
+        sketch_added = [
+            (listing.neighborhood_id, listing.rooms, listing.price)
+            for listing in new_listings
+            if listing.id not in duplicates
+        ]
+        update_sketches(session, sketch_added, [d for d in sketch_dirty if d[0]])
+
+        bump_generation(
+            session,
+            "yad2",
+            {
+                "added": added,
+                "removed": removed,
+                "repriced": repriced,
+                "duplicates": len(duplicates),
+                "neighborhoods": sorted(n for n in changed_neighborhoods if n),
+            },
+        )
         session.commit()
         log_scrape("Yad2", count)
         return count
 
 
 if __name__ == "__main__":
-    create_db_and_tables()
-    scraper = Yad2Scraper()
-    with Session(engine) as session:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Scrape Yad2 rental listings")
+    parser.add_argument("--city", help="city id (default: the default city)")
+    args = parser.parse_args()
+
+    city = lookup_city(args.city)
+    create_db_and_tables(city.id)
+    scraper = Yad2Scraper(city)
+    with Session(get_engine(city.id)) as session:
         n = scraper.scrape_listings(session)
         print(f"Yad2: {n} listings")
+    publish_read_snapshot(city.id)
@@ -1,55 +1,78 @@
 """Seed the database with neighborhood data and initial scrapes.
 
+Every enabled city is seeded into its own database unless ``--city`` picks one.
+
 Usage:
     cd apps/api
-    python -m api.seed
+    python -m api.seed [--city CITY]
 """
 
+import argparse
 import json
+from datetime import datetime
 from pathlib import Path
 
 from sqlmodel import Session
 
-from api.database import create_db_and_tables, engine
+from api.cities import City, enabled_cities, lookup_city
+from api.database import create_db_and_tables, get_engine, publish_read_snapshot
 from api.models import Neighborhood
+from api.scrapers.base import bulk_upsert
 from api.scrapers.cbs import CBSScraper
 from api.scrapers.nadlan import NadlanScraper
 from api.scrapers.yad2 import Yad2Scraper
+from api.services.generation import bump_generation
 
 DATA_DIR = Path(__file__).parent.parent / "data"
 
 
-def seed_neighborhoods(session: Session) -> int:
-    data = json.loads((DATA_DIR / "neighborhoods.json").read_text())
-    count = 0
-    for item in data:
-        neighborhood = Neighborhood(**item)
-        session.merge(neighborhood)
-        count += 1
+def seed_neighborhoods(session: Session, city: City | None = None) -> int:
+    city = city or lookup_city()
+    data = json.loads((DATA_DIR / city.neighborhoods_file).read_text())
+    updated_at = datetime.utcnow()
+    changed = bulk_upsert(
+        session, Neighborhood, [{**item, "updated_at": updated_at} for item in data], key=["id"]
+    )
+    ids = sorted(item["id"] for item in data)
+    # A reseed of unchanged data must not invalidate generation-keyed caches
+    if changed:
+        bump_generation(session, "neighborhoods", {"neighborhoods": ids})
     session.commit()
-    return count
+    return len(ids)
 
 
-def main():
-    create_db_and_tables()
+def seed_city(city: City):
+    create_db_and_tables(city.id)
 
-    with Session(engine) as session:
-        n = seed_neighborhoods(session)
-        print(f"Seeded {n} neighborhoods")
+    with Session(get_engine(city.id)) as session:
+        n = seed_neighborhoods(session, city)
+        print(f"{city.name_en}: seeded {n} neighborhoods")
 
-        cbs = CBSScraper()
+        cbs = CBSScraper(city)
         n1 = cbs.fetch_rent_survey(session)
         n2 = cbs.fetch_rent_index(session)
         print(f"CBS: {n1} rent stats, {n2} index entries")
 
-        nadlan = NadlanScraper()
+        nadlan = NadlanScraper(city)
         n3 = nadlan.fetch_transactions(session)
         print(f"Nadlan: {n3} transactions")
 
-        yad2 = Yad2Scraper()
+        yad2 = Yad2Scraper(city)
         n4 = yad2.scrape_listings(session)
         print(f"Yad2: {n4} listings")
 
+    snapshot = publish_read_snapshot(city.id)
+    print(f"Published read snapshot for generation {snapshot['generation']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed the database")
+    parser.add_argument("--city", help="seed only this city id")
+    args = parser.parse_args()
+
+    for city in [lookup_city(args.city)] if args.city else enabled_cities():
+        seed_city(city)
+
     print("Done! Database seeded successfully.")
 
 
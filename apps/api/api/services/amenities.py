@@ -0,0 +1,72 @@
+"""Listing amenity bitmask.
+
+Amenities are stored on ``RentalListing.amenities`` as an integer of
+:class:`Amenity` bits, and copied into the comparables index, so required
+amenities are checked with a bitwise test per candidate instead of parsing
+the ``features`` JSON row by row.
+"""
+
+import json
+from enum import IntFlag
+
+
+class Amenity(IntFlag):
+    MAMAD = 1 << 0
+    ELEVATOR = 1 << 1
+    PARKING = 1 << 2
+    BALCONY = 1 << 3
+    AC = 1 << 4
+    PET_FRIENDLY = 1 << 5
+    FURNISHED = 1 << 6
+    PARTLY_FURNISHED = 1 << 7
+    RENOVATED = 1 << 8
+
+
+AMENITY_NAMES = {amenity.name.lower(): amenity for amenity in Amenity}
+
+# Boolean feature keys as they appear in scraped listings and the web data
+_FEATURE_FLAGS = {
+    "mamad": Amenity.MAMAD,
+    "elevator": Amenity.ELEVATOR,
+    "parking": Amenity.PARKING,
+    "balcony": Amenity.BALCONY,
+    "ac": Amenity.AC,
+    "pet_friendly": Amenity.PET_FRIENDLY,
+}
+
+
+def encode_features(features: dict | str | None) -> int:
+    """Bitmask for a scraped ``features`` dict (or its JSON string)."""
+    if isinstance(features, str):
+        features = json.loads(features)
+    if not features:
+        return 0
+    mask = Amenity(0)
+    for key, flag in _FEATURE_FLAGS.items():
+        if features.get(key):
+            mask |= flag
+    furniture = features.get("furniture")
+    if furniture == "full":
+        mask |= Amenity.FURNISHED
+    elif furniture == "partial":
+        mask |= Amenity.PARTLY_FURNISHED
+    if features.get("condition") in ("new", "renovated"):
+        mask |= Amenity.RENOVATED
+    return int(mask)
+
+
+def parse_amenities(names: list[str]) -> int:
+    """Bitmask for amenity names like ``["mamad", "elevator"]``."""
+    mask = 0
+    for name in names:
+        try:
+            mask |= AMENITY_NAMES[name.lower()]
+        except KeyError:
+            raise ValueError(
+                f"Unknown amenity {name!r}; expected one of {sorted(AMENITY_NAMES)}"
+            ) from None
+    return mask
+
+
+def amenity_names(mask: int) -> list[str]:
+    return [name for name, flag in AMENITY_NAMES.items() if mask & flag]
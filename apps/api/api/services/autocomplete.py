@@ -0,0 +1,156 @@
+"""Street and neighborhood autocomplete.
+
+Names come from the neighborhood table, the city's scraper mapping tables
+and the street part of every listing and sale address, each tied to its
+neighborhood. Addresses and mapping tables spell streets in Hebrew; a street
+is also offered under its English name when the city lists one in
+``street_names_en``, which so far only Tel Aviv does. A name already offered
+for a neighborhood, such as a mapping table's street that is also an area
+name, is only listed once, as the neighborhood. Entries are ranked once at
+build time by how many listings and sales they cover, so their position in
+the entry list is their rank. Every word suffix of an entry's normalized
+name is a key in one sorted array ("ben yehuda" and "yehuda"), and a query
+is two bisects for the range of keys it prefixes plus picking the lowest
+entry positions in that range. Prefixes of up to ``SHORT_PREFIX``
+characters match most of the array, so their best ``MAX_SUGGESTIONS``
+positions are stored at build time and answered with one dict lookup.
+
+One index per city, rebuilt in the background when the city's data
+generation moves.
+"""
+
+import heapq
+import re
+import threading
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from functools import partial
+
+from sqlmodel import Session, func, select
+
+from api.cities import City
+from api.models import Neighborhood, RentalListing, SaleTransaction
+from api.services.dedup import normalize_text
+from api.services.generation import GenerationalIndex
+
+# The house number and anything after it
+_HOUSE_NUMBER = re.compile(r"\s*\d.*$")
+# Sorts after every character a normalized key can hold
+_KEY_END = "\U0010ffff"
+# Longest prefix answered from the precomputed table, and the most results a
+# search may ask for
+SHORT_PREFIX = 3
+MAX_SUGGESTIONS = 50
+
+_indexes: dict[str, GenerationalIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def street_name(address: str | None) -> str:
+    """The street part of an address such as "Dizengoff 88, apt 3"."""
+    return _HOUSE_NUMBER.sub("", address or "").strip(" ,-")
+
+
+@dataclass(frozen=True, slots=True)
+class Suggestion:
+    label: str
+    kind: str  # "neighborhood" or "street"
+    neighborhood_id: str
+    neighborhood: str
+    count: int
+
+
+class AutocompleteIndex:
+    def __init__(self, suggestions: list[Suggestion]):
+        # Rank order: most covered first, neighborhoods before streets on ties
+        self.suggestions = sorted(
+            suggestions, key=lambda s: (-s.count, s.kind != "neighborhood", s.label)
+        )
+        keyed = []
+        for position, suggestion in enumerate(self.suggestions):
+            words = normalize_text(suggestion.label).split()
+            keyed.extend((" ".join(words[i:]), position) for i in range(len(words)))
+        # Positions come in rank order, so each short prefix's list is its best
+        # entries; a repeat of the last position is the same entry's other word
+        self._short: dict[str, list[int]] = defaultdict(list)
+        for key, position in keyed:
+            for length in range(1, min(len(key), SHORT_PREFIX) + 1):
+                best = self._short[key[:length]]
+                if len(best) < MAX_SUGGESTIONS and (not best or best[-1] != position):
+                    best.append(position)
+        keyed.sort()
+        self._keys = [key for key, _ in keyed]
+        self._positions = [position for _, position in keyed]
+
+    def __len__(self) -> int:
+        return len(self.suggestions)
+
+    def search(self, query: str, limit: int = 10) -> list[Suggestion]:
+        prefix = normalize_text(query)
+        if not prefix:
+            return []
+        if len(prefix) <= SHORT_PREFIX and limit <= MAX_SUGGESTIONS:
+            best = self._short.get(prefix, [])[:limit]
+            return [self.suggestions[position] for position in best]
+        lo = bisect_left(self._keys, prefix)
+        hi = bisect_left(self._keys, prefix + _KEY_END, lo)
+        best = heapq.nsmallest(limit, set(self._positions[lo:hi]))
+        return [self.suggestions[position] for position in best]
+
+
+def build_autocomplete_index(session: Session, city: City) -> AutocompleteIndex:
+    neighborhoods = {n.id: n for n in session.exec(select(Neighborhood))}
+    streets: dict[tuple[str, str], Counter] = defaultdict(Counter)  # spellings per street
+    coverage: Counter = Counter()  # listings and sales per neighborhood
+
+    for model in (RentalListing, SaleTransaction):
+        rows = session.exec(
+            select(model.address, model.neighborhood_id, func.count())
+            .where(model.neighborhood_id != None)  # noqa: E711
+            .group_by(model.address, model.neighborhood_id)
+        )
+        for address, neighborhood_id, count in rows:
+            coverage[neighborhood_id] += count
+            street = street_name(address)
+            if normalize_text(street):
+                streets[(normalize_text(street), neighborhood_id)][street] += count
+    for street, neighborhood_id in city.street_map.items():
+        streets[(normalize_text(street), neighborhood_id)][street] += 0
+
+    english = {normalize_text(he): en for he, en in city.street_names_en.items()}
+    # One entry per name and neighborhood; neighborhoods are added first and win
+    entries: dict[tuple[str, str], Suggestion] = {}
+
+    def add(label: str, kind: str, neighborhood_id: str, count: int):
+        neighborhood = neighborhoods.get(neighborhood_id)
+        key = (normalize_text(label), neighborhood_id)
+        if neighborhood is None or not key[0] or key in entries:
+            return
+        entries[key] = Suggestion(label, kind, neighborhood_id, neighborhood.name_en, count)
+
+    for neighborhood in neighborhoods.values():
+        for label in (neighborhood.name_en, neighborhood.name_he):
+            add(label, "neighborhood", neighborhood.id, coverage[neighborhood.id])
+    for alias, neighborhood_id in city.neighborhood_map.items():
+        add(alias, "neighborhood", neighborhood_id, coverage[neighborhood_id])
+    for (street, neighborhood_id), spellings in streets.items():
+        # Shown in its most common spelling
+        label, _ = spellings.most_common(1)[0]
+        add(label, "street", neighborhood_id, sum(spellings.values()))
+        if street in english:
+            add(english[street], "street", neighborhood_id, sum(spellings.values()))
+    return AutocompleteIndex(list(entries.values()))
+
+
+def autocomplete_index(city: City) -> GenerationalIndex:
+    with _indexes_lock:
+        if city.id not in _indexes:
+            _indexes[city.id] = GenerationalIndex(
+                f"autocomplete-{city.id}", partial(build_autocomplete_index, city=city)
+            )
+        return _indexes[city.id]
+
+
+def autocomplete(session: Session, city: City, query: str, limit: int = 10) -> list[Suggestion]:
+    return autocomplete_index(city).get(session).search(query, limit)
@@ -0,0 +1,105 @@
+"""In-memory CBS rent survey reference.
+
+Holds the latest CBS average rent per (city, rooms, tenant_type) so the
+scorer fallback and tenant-type comparisons are answered from memory. There
+is one table per engine, i.e. per city partition. Loaded at startup, reloaded
+after each CBS scrape commit, and lazily refreshed when another process bumps
+the data generation.
+"""
+
+import bisect
+import threading
+import weakref
+
+from sqlmodel import Session, select
+
+from api.models import CBSRentStat
+from api.services.generation import current_generation
+
+_references: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+_references_lock = threading.Lock()
+
+
+class CBSReference:
+    def __init__(self):
+        # (city, tenant_type) -> parallel sorted room counts and average rents.
+        # Replaced wholesale on load, never mutated, so readers need no lock.
+        self._table: dict[tuple[str, str], tuple[tuple[float, ...], tuple[int, ...]]] = {}
+        self._engine_ref = None
+        self._generation: int | None = None
+        self._lock = threading.Lock()
+
+    def load(self, session: Session) -> int:
+        """Replace the table with the latest stat per (city, rooms, tenant_type)."""
+        generation = current_generation(session)
+        stats = session.exec(
+            select(CBSRentStat).order_by(CBSRentStat.period, CBSRentStat.fetched_at)
+        ).all()
+        latest: dict[tuple[str, str, float], int] = {}
+        for stat in stats:
+            latest[(stat.city, stat.tenant_type, stat.rooms)] = stat.avg_rent
+
+        rooms: dict[tuple[str, str], list[float]] = {}
+        rents: dict[tuple[str, str], list[int]] = {}
+        for (city, tenant_type, room_count), avg_rent in sorted(latest.items()):
+            rooms.setdefault((city, tenant_type), []).append(room_count)
+            rents.setdefault((city, tenant_type), []).append(avg_rent)
+
+        table = {key: (tuple(rooms[key]), tuple(rents[key])) for key in rooms}
+        with self._lock:
+            self._table = table
+            self._engine_ref = weakref.ref(session.get_bind())
+            self._generation = generation
+        return len(latest)
+
+    def ensure_fresh(self, session: Session) -> "CBSReference":
+        engine = session.get_bind()
+        loaded_from = self._engine_ref() if self._engine_ref else None
+        if loaded_from is not engine or self._generation != current_generation(session):
+            self.load(session)
+        return self
+
+    def avg_rent(self, city: str, rooms: float, tenant_type: str = "all") -> int | None:
+        """Average rent for ``rooms``, interpolated between published room counts.
+
+        Room counts outside the published range extend the nearest segment
+        linearly (clamped at the edge value when only one count is known).
+        """
+        entry = self._table.get((city, tenant_type))
+        if not entry:
+            return None
+        published, rents = entry
+        i = bisect.bisect_left(published, rooms)
+        if i < len(published) and published[i] == rooms:
+            return rents[i]
+        if len(published) == 1:
+            return rents[0]
+
+        lo = min(max(i - 1, 0), len(published) - 2)
+        x0, x1 = published[lo], published[lo + 1]
+        y0, y1 = rents[lo], rents[lo + 1]
+        estimate = y0 + (y1 - y0) * (rooms - x0) / (x1 - x0)
+        return max(1, int(round(estimate)))
+
+    def compare_tenant_types(self, city: str, rooms: float) -> dict | None:
+        """New vs renewing tenant rents for ``rooms`` and the renewal discount (%)."""
+        new = self.avg_rent(city, rooms, "new")
+        renewal = self.avg_rent(city, rooms, "renewal")
+        if not new or not renewal:
+            return None
+        return {
+            "new": new,
+            "renewal": renewal,
+            "all": self.avg_rent(city, rooms, "all"),
+            "renewal_discount_pct": round((new - renewal) / new * 100, 1),
+        }
+
+
+def get_cbs_reference(session: Session) -> CBSReference:
+    """The reference for the session's engine, reloaded if the data changed."""
+    engine = session.get_bind()
+    with _references_lock:
+        reference = _references.get(engine)
+        if reference is None:
+            reference = _references[engine] = CBSReference()
+    return reference.ensure_fresh(session)
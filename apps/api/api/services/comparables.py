@@ -0,0 +1,326 @@
+"""k-nearest comparable listings.
+
+Active listings are points in a normalized (x, y, rooms, sqm, floor) space
+held in a KD-tree, so a rent check compares against the closest apartments
+by location and size, across neighborhood borders, rather than everything
+in one neighborhood with a similar room count. Listings without coordinates
+sit at their neighborhood's centroid. The tree is rebuilt in the background
+after each scrape.
+"""
+
+import heapq
+import math
+from array import array
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+from pathlib import Path
+
+from sqlmodel import Session, select
+
+from api.config import settings
+from api.models import Neighborhood, RentalListing
+from api.services.dedup import first_per_group, listing_group
+from api.services.generation import GenerationalIndex, current_generation
+from api.services.listing_columns import ListingColumns, columns_for, write_columns
+
+# One unit of distance is a kilometer, a room, 20 sqm or 5 floors
+KM_PER_DEGREE = 111.32
+SQM_SCALE = 20.0
+FLOOR_SCALE = 5.0
+# Stand-ins for listings that don't report size or floor
+SQM_PER_ROOM = 25.0
+DEFAULT_FLOOR = 2
+# Tel Aviv; only used to scale longitude to km, which varies under 1% across
+# the supported cities
+ORIGIN_LAT, ORIGIN_LNG = 32.08, 34.78
+LNG_KM = KM_PER_DEGREE * math.cos(math.radians(ORIGIN_LAT))
+
+LEAF_SIZE = 8
+
+
+class KDTree:
+    """Static KD-tree with median splits, stored implicitly in flat arrays.
+
+    The node for slots ``[lo, hi)`` is the point at ``(lo + hi) // 2``;
+    ranges of at most ``LEAF_SIZE`` points are scanned directly. Coordinates
+    are kept one array per dimension, in slot order, so a tree can also be
+    served straight from a memory-mapped file (see :meth:`from_arrays`).
+    """
+
+    def __init__(self, points: Sequence[tuple[float, ...]]):
+        order = list(range(len(points)))
+        self.split = array("b", [-1]) * len(points)
+        stack = [(0, len(points))]
+        while stack:
+            lo, hi = stack.pop()
+            if hi - lo <= LEAF_SIZE:
+                continue
+            segment = order[lo:hi]
+            # Split on the dimension with the widest spread, judged on a sample
+            sample = [points[i] for i in segment[:: max(1, len(segment) // 64)]]
+            dim = max(
+                range(len(sample[0])),
+                key=lambda d: max(p[d] for p in sample) - min(p[d] for p in sample),
+            )
+            segment.sort(key=lambda i, d=dim: points[i][d])
+            order[lo:hi] = segment
+            mid = (lo + hi) // 2
+            self.split[mid] = dim
+            stack.append((lo, mid))
+            stack.append((mid + 1, hi))
+        self.positions = array("I", order)
+        dims = len(points[0]) if points else 0
+        self.columns = [array("d", [points[i][d] for i in order]) for d in range(dims)]
+
+    @classmethod
+    def from_arrays(
+        cls, columns: Sequence[Sequence[float]], split: Sequence[int], positions: Sequence[int]
+    ) -> "KDTree":
+        """A tree over arrays saved from another tree's ``columns``, ``split`` and ``positions``."""
+        tree = cls.__new__(cls)
+        tree.columns, tree.split, tree.positions = list(columns), split, positions
+        return tree
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def nearest(
+        self,
+        query: tuple[float, ...],
+        k: int,
+        max_distance: float = math.inf,
+        weights: tuple[float, ...] | None = None,
+        accept: Callable[[int], bool] | None = None,
+    ) -> list[tuple[float, int]]:
+        """Up to ``k`` (distance, position) pairs, nearest first.
+
+        ``weights`` of 0 drop a dimension from the distance; ``accept``
+        filters points by their original position.
+        """
+        weights = weights or (1.0,) * len(query)
+        dims = [d for d, w in enumerate(weights) if w]
+        bound = max_distance * max_distance
+        best: list[tuple[float, int]] = []  # max-heap of (-squared distance, position)
+        columns, positions = self.columns, self.positions
+
+        stack = [(0, len(positions), 0.0)]
+        while stack:
+            lo, hi, floor = stack.pop()
+            if floor > bound:
+                continue
+            if hi - lo <= LEAF_SIZE:
+                slots = range(lo, hi)
+            else:
+                mid = (lo + hi) // 2
+                dim = self.split[mid]
+                diff = query[dim] - columns[dim][mid] if weights[dim] else 0.0
+                if diff < 0:
+                    stack.append((mid + 1, hi, max(floor, diff * diff)))
+                    stack.append((lo, mid, floor))
+                else:
+                    stack.append((lo, mid, max(floor, diff * diff)))
+                    stack.append((mid + 1, hi, floor))
+                slots = (mid,)
+
+            for slot in slots:
+                d2 = sum(weights[d] * (query[d] - columns[d][slot]) ** 2 for d in dims)
+                if d2 > bound or (accept is not None and not accept(positions[slot])):
+                    continue
+                heapq.heappush(best, (-d2, positions[slot]))
+                if len(best) > k:
+                    heapq.heappop(best)
+                if len(best) == k:
+                    bound = -best[0][0]
+
+        return sorted((math.sqrt(-d2), position) for d2, position in best)
+
+
+@dataclass(frozen=True)
+class ComparableQuery:
+    neighborhood_id: str
+    rooms: float
+    sqm: float | None = None
+    floor: int | None = None
+    amenities: int = 0
+
+
+def snap_size(rooms: float, sqm: float | None) -> tuple[float, float | None]:
+    """Snap rooms to 0.5 and sqm to ``check_cache_sqm_bucket`` so equivalent checks share a key.
+
+    Small inputs snap up to one bucket rather than down to zero.
+    """
+    bucket = settings.check_cache_sqm_bucket
+    rooms = max(round(rooms * 2) / 2, 0.5)
+    if sqm is not None:
+        sqm = max(round(sqm / bucket) * bucket, bucket)
+    return rooms, sqm
+
+
+@dataclass(frozen=True)
+class Comparable:
+    listing_id: str
+    price: int
+    distance: float
+
+
+def _project(lat: float, lng: float) -> tuple[float, float]:
+    return (lng - ORIGIN_LNG) * LNG_KM, (lat - ORIGIN_LAT) * KM_PER_DEGREE
+
+
+class ComparablesIndex:
+    def __init__(self, listings: list[tuple], centroids: dict[str, tuple[float, float]]):
+        """``listings`` rows are (id, neighborhood_id, lat, lng, rooms, sqm, floor, price,
+        amenities); ``centroids`` maps neighborhood ids to (lat, lng)."""
+        self.centroids = centroids
+        self.ids: list[str] = []
+        self.prices = array("q")
+        self.amenities = array("q")
+        points = []
+        for listing_id, neighborhood_id, lat, lng, rooms, sqm, floor, price, amenities in listings:
+            if lat is None or lng is None:
+                if neighborhood_id not in centroids:
+                    continue
+                lat, lng = centroids[neighborhood_id]
+            x, y = _project(lat, lng)
+            sqm = sqm if sqm is not None else rooms * SQM_PER_ROOM
+            floor = floor if floor is not None else DEFAULT_FLOOR
+            points.append((x, y, rooms, sqm / SQM_SCALE, floor / FLOOR_SCALE))
+            self.ids.append(listing_id)
+            self.prices.append(price)
+            self.amenities.append(amenities)
+        self.tree = KDTree(points)
+
+    @classmethod
+    def from_columns(
+        cls, columns: ListingColumns, centroids: dict[str, tuple[float, float]]
+    ) -> "ComparablesIndex":
+        """An index served from a published columns file, without copying it."""
+        index = cls.__new__(cls)
+        index.centroids = centroids
+        index.ids, index.prices, index.amenities = columns.ids, columns.price, columns.amenities
+        index.tree = KDTree.from_arrays(columns.kd_columns, columns.kd_split, columns.kd_positions)
+        return index
+
+    def __len__(self) -> int:
+        return len(self.tree)
+
+    def find(
+        self, query: ComparableQuery, k: int | None = None, max_distance: float | None = None
+    ) -> list[Comparable]:
+        """Nearest listings having every ``query.amenities`` bit, within ``max_distance``.
+
+        Size and floor only count when the query gives them.
+        """
+        centroid = self.centroids.get(query.neighborhood_id)
+        if centroid is None or not len(self.tree):
+            return []
+        x, y = _project(*centroid)
+        point = (
+            x,
+            y,
+            query.rooms,
+            (query.sqm or 0) / SQM_SCALE,
+            (query.floor or 0) / FLOOR_SCALE,
+        )
+        weights = (1.0, 1.0, 1.0, float(query.sqm is not None), float(query.floor is not None))
+        accept = None
+        if query.amenities:
+            required, amenities = query.amenities, self.amenities
+
+            def accept(position: int) -> bool:
+                return amenities[position] & required == required
+
+        found = self.tree.nearest(
+            point,
+            k or settings.knn_comparables,
+            settings.knn_max_distance if max_distance is None else max_distance,
+            weights,
+            accept,
+        )
+        return [Comparable(self.ids[p], self.prices[p], distance) for distance, p in found]
+
+    def find_many(self, queries: Sequence[ComparableQuery], **kwargs) -> list[list[Comparable]]:
+        """Answer a batch against one snapshot of the tree, sharing repeated queries."""
+        answers: dict[ComparableQuery, list[Comparable]] = {}
+        for query in queries:
+            if query not in answers:
+                answers[query] = self.find(query, **kwargs)
+        return [answers[query] for query in queries]
+
+
+def _centroids(session: Session) -> dict[str, tuple[float, float]]:
+    return {n.id: (n.lat, n.lng) for n in session.exec(select(Neighborhood)).all()}
+
+
+def _active_listings(session: Session) -> list[tuple]:
+    rows = session.exec(
+        select(
+            RentalListing.id,
+            RentalListing.neighborhood_id,
+            RentalListing.lat,
+            RentalListing.lng,
+            RentalListing.rooms,
+            RentalListing.sqm,
+            RentalListing.floor,
+            RentalListing.price,
+            RentalListing.amenities,
+            listing_group(),
+        )
+        .where(RentalListing.is_active == True)  # noqa: E712
+        .order_by(RentalListing.first_seen, RentalListing.id)
+    )
+    return list(first_per_group(rows))
+
+
+def build_comparables_index(session: Session) -> ComparablesIndex:
+    columns = columns_for(session)
+    if columns is not None:
+        return ComparablesIndex.from_columns(columns, _centroids(session))
+    return ComparablesIndex(_active_listings(session), _centroids(session))
+
+
+def export_listing_columns(session: Session, path: Path) -> int:
+    """Write the active listings and their comparables tree to a columns file.
+
+    Rows are sorted by (neighborhood, rooms, price). Listings the index
+    can't place (no coordinates and an unknown neighborhood) are left out,
+    so the tree's positions are the file's row numbers. Returns the row count.
+    """
+    centroids = _centroids(session)
+    rows = [
+        row
+        for row in _active_listings(session)
+        if (row[2] is not None and row[3] is not None) or row[1] in centroids
+    ]
+    # Listings outside any known neighborhood sort last
+    rows.sort(key=lambda row: (row[1] not in centroids, row[1] or "", row[4], row[7], row[0]))
+    index = ComparablesIndex(rows, centroids)
+    write_columns(path, rows, sorted(centroids), index.tree, current_generation(session))
+    return len(rows)
+
+
+comparables_indexes = GenerationalIndex("comparables-index", build_comparables_index)
+
+
+def get_comparables_index(session: Session) -> ComparablesIndex:
+    return comparables_indexes.get(session)
+
+
+def match_comparables(session: Session, query: ComparableQuery) -> tuple[list[Comparable], bool]:
+    """k nearest comparables for a rent check, and whether they have the required amenities.
+
+    Required amenities are dropped when fewer than ``min_comparables``
+    listings have them all, so a rare combination still gets a market; the
+    flag is then False.
+    """
+    index = get_comparables_index(session)
+    comparables = index.find(query)
+    if query.amenities and len(comparables) < settings.min_comparables:
+        unfiltered = ComparableQuery(query.neighborhood_id, query.rooms, query.sqm, query.floor)
+        return index.find(unfiltered), False
+    return comparables, True
+
+
+def find_comparables(session: Session, query: ComparableQuery) -> list[Comparable]:
+    """k nearest comparables for a rent check; see :func:`match_comparables`."""
+    return match_comparables(session, query)[0]
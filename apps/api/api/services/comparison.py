@@ -0,0 +1,185 @@
+"""Side-by-side neighborhood metrics for the comparison view.
+
+Built for every neighborhood once per data generation from one pass over
+the active listings, one per apartment like the price sketches, a grouped
+query over recent sales and the stored price sketches. Sums and counts are
+kept per half-room bucket and combined across buckets at build time, so a
+comparison is a few dictionary lookups whatever the number of listings.
+
+The sales windows end on the day the stats were built, i.e. at the last data
+generation rather than today; with daily scrapes they lag by at most a day.
+
+The rent index is city-wide, so the rent trend is one value for the whole
+comparison; per neighborhood, the sale price per sqm of the last year is
+compared with the year before.
+"""
+
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+
+from sqlalchemy import case
+from sqlmodel import Session, func, select
+
+from api.models import Neighborhood, PriceSketch, RentalListing, SaleTransaction
+from api.services.dedup import first_per_group, listing_group
+from api.services.generation import GenerationalIndex
+from api.services.price_sketches import rooms_bucket
+from api.services.quantile_sketch import TDigest
+
+SALE_WINDOW_DAYS = 365
+MAX_COMPARED = 12
+
+
+@dataclass
+class _Totals:
+    supply: int = 0
+    dom_sum: float = 0.0
+    dom_count: int = 0
+    rent_sqm_sum: float = 0.0
+    rent_sqm_count: int = 0
+    sale_sqm_sum: float = 0.0
+    sale_count: int = 0
+    prior_sale_sqm_sum: float = 0.0
+    prior_sale_count: int = 0
+    digest: TDigest = field(default_factory=TDigest)
+
+    def add(self, other: "_Totals"):
+        self.supply += other.supply
+        self.dom_sum += other.dom_sum
+        self.dom_count += other.dom_count
+        self.rent_sqm_sum += other.rent_sqm_sum
+        self.rent_sqm_count += other.rent_sqm_count
+        self.sale_sqm_sum += other.sale_sqm_sum
+        self.sale_count += other.sale_count
+        self.prior_sale_sqm_sum += other.prior_sale_sqm_sum
+        self.prior_sale_count += other.prior_sale_count
+        self.digest.merge(other.digest)
+
+    def metrics(self) -> dict:
+        sale_sqm = self.sale_sqm_sum / self.sale_count if self.sale_count else None
+        prior_sqm = (
+            self.prior_sale_sqm_sum / self.prior_sale_count if self.prior_sale_count else None
+        )
+        return {
+            "median_rent": round(self.digest.quantile(0.5)) if self.digest.count else None,
+            "avg_rent_per_sqm": (
+                round(self.rent_sqm_sum / self.rent_sqm_count, 1) if self.rent_sqm_count else None
+            ),
+            "avg_sale_price_per_sqm": None if sale_sqm is None else round(sale_sqm),
+            "sale_price_per_sqm_change_pct": (
+                round((sale_sqm / prior_sqm - 1) * 100, 1) if sale_sqm and prior_sqm else None
+            ),
+            "sales_last_year": self.sale_count,
+            "avg_days_on_market": (
+                round(self.dom_sum / self.dom_count, 1) if self.dom_count else None
+            ),
+            "active_supply": self.supply,
+        }
+
+
+def build_comparison_stats(session: Session, today: date | None = None) -> dict[str, dict]:
+    """Per neighborhood: its names and metrics per rooms bucket, None meaning every bucket.
+
+    Sales count from the year up to ``today``, which defaults to the build date.
+    """
+    today = today or date.today()
+    totals: dict[tuple[str, float], _Totals] = defaultdict(_Totals)
+
+    listings = session.exec(
+        select(
+            RentalListing.neighborhood_id,
+            RentalListing.rooms,
+            RentalListing.days_on_market,
+            RentalListing.price_per_sqm,
+            listing_group(),
+        )
+        .where(
+            RentalListing.is_active == True,  # noqa: E712
+            RentalListing.neighborhood_id != None,  # noqa: E711
+        )
+        .order_by(RentalListing.first_seen, RentalListing.id)
+    )
+    # The earliest listing of each apartment, so one posted on two sources counts once
+    for hood, rooms, days_on_market, price_per_sqm in first_per_group(listings):
+        entry = totals[(hood, rooms_bucket(rooms))]
+        entry.supply += 1
+        if days_on_market is not None:
+            entry.dom_sum += days_on_market
+            entry.dom_count += 1
+        if price_per_sqm is not None:
+            entry.rent_sqm_sum += price_per_sqm
+            entry.rent_sqm_count += 1
+
+    recent_start = today - timedelta(days=SALE_WINDOW_DAYS)
+    recent = SaleTransaction.deal_date >= recent_start
+    sales = session.exec(
+        select(
+            SaleTransaction.neighborhood_id,
+            SaleTransaction.rooms,
+            func.sum(case((recent, SaleTransaction.price_per_sqm), else_=0)),
+            func.sum(case((recent, 1), else_=0)),
+            func.sum(case((recent, 0), else_=SaleTransaction.price_per_sqm)),
+            func.sum(case((recent, 0), else_=1)),
+        )
+        .where(
+            SaleTransaction.neighborhood_id != None,  # noqa: E711
+            SaleTransaction.deal_date >= recent_start - timedelta(days=SALE_WINDOW_DAYS),
+        )
+        .group_by(SaleTransaction.neighborhood_id, SaleTransaction.rooms)
+    )
+    for hood, rooms, sqm_sum, count, prior_sqm_sum, prior_count in sales:
+        entry = totals[(hood, rooms_bucket(rooms))]
+        entry.sale_sqm_sum += sqm_sum
+        entry.sale_count += count
+        entry.prior_sale_sqm_sum += prior_sqm_sum
+        entry.prior_sale_count += prior_count
+
+    for sketch in session.exec(select(PriceSketch)):
+        totals[(sketch.neighborhood_id, sketch.rooms_bucket)].digest = TDigest.from_bytes(
+            sketch.digest
+        )
+
+    by_neighborhood: dict[str, dict[float, _Totals]] = defaultdict(dict)
+    for (hood, bucket), entry in totals.items():
+        by_neighborhood[hood][bucket] = entry
+
+    stats = {}
+    for neighborhood in session.exec(select(Neighborhood)):
+        buckets = by_neighborhood.get(neighborhood.id, {})
+        combined = _Totals()
+        for entry in buckets.values():
+            combined.add(entry)
+        stats[neighborhood.id] = {
+            "name_en": neighborhood.name_en,
+            "name_he": neighborhood.name_he,
+            "metrics": {
+                None: combined.metrics(),
+                **{bucket: entry.metrics() for bucket, entry in buckets.items()},
+            },
+        }
+    return stats
+
+
+comparison_stats = GenerationalIndex("comparison-stats", build_comparison_stats)
+
+
+def compare_neighborhoods(
+    session: Session, neighborhood_ids: list[str], rooms: float | None = None
+) -> list[dict]:
+    """Metrics for each neighborhood, in the order given; unknown ids raise KeyError."""
+    stats = comparison_stats.get(session)
+    bucket = None if rooms is None else rooms_bucket(rooms)
+    compared = []
+    for neighborhood_id in neighborhood_ids:
+        entry = stats[neighborhood_id]
+        metrics = entry["metrics"].get(bucket) or _Totals().metrics()
+        compared.append(
+            {
+                "id": neighborhood_id,
+                "name_en": entry["name_en"],
+                "name_he": entry["name_he"],
+                **metrics,
+            }
+        )
+    return compared
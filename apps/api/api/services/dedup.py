@@ -0,0 +1,268 @@
+"""Cross-source listing deduplication.
+
+The same apartment is often listed on several sites with slightly different
+address text. New listings get a MinHash signature over character shingles
+of their normalized address; its LSH bands are stored in
+``listing_signature_band`` so a scrape only hashes its new rows and finds
+candidate duplicates with a handful of bucket lookups instead of comparing
+every pair. Candidates must also match exactly on rooms, sqm and floor, and
+a group holds at most one listing per source. Every listing in a group
+shares ``canonical_id``, the id of the first one seen.
+
+Usage:
+    python -m api.services.dedup    # re-hash and regroup every listing, in every city
+"""
+
+import re
+import struct
+import unicodedata
+import zlib
+from collections import defaultdict
+from collections.abc import Iterable, Iterator
+from functools import cache
+
+from sqlalchemy import ColumnElement, delete
+from sqlmodel import Session, col, func, select
+
+from api.cities import City, lookup_city
+from api.models import ListingSignatureBand, RentalListing
+
+NUM_PERMUTATIONS = 32
+BANDS = 8  # 4 rows per band: pairs above ~0.6 Jaccard almost always share a band
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+SHINGLE_SIZE = 3
+SIMILARITY_THRESHOLD = 0.6
+
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_PERMUTATIONS = [
+    (1 + 2 * zlib.crc32(f"a{i}".encode()), zlib.crc32(f"b{i}".encode()))
+    for i in range(NUM_PERMUTATIONS)
+]
+_LOOKUP_CHUNK = 500
+
+# Street-type words that sites add or drop freely; city names come from
+# each city's ``address_names``
+_STREET_WORDS = {
+    "\u05e8\u05d7\u05d5\u05d1",  # rehov
+    "\u05e8\u05d7",  # rh' (after punctuation is stripped)
+    "\u05e9\u05d3\u05e8\u05d5\u05ea",  # sderot
+    "\u05e9\u05d3",  # sd'
+    "street",
+    "st",
+}
+_FINAL_LETTERS = str.maketrans("\u05da\u05dd\u05df\u05e3\u05e5", "\u05db\u05de\u05e0\u05e4\u05e6")
+_PUNCTUATION = re.compile(r"[^\w\s]|_")
+
+
+def listing_group() -> ColumnElement:
+    """SQL expression for a listing's duplicate group."""
+    return func.coalesce(RentalListing.canonical_id, RentalListing.id)
+
+
+def first_per_group(rows: Iterable[tuple]) -> Iterator[tuple]:
+    """Drop duplicates from rows whose last column is :func:`listing_group`.
+
+    Order the query by ``first_seen`` to keep the earliest listing of each
+    apartment. Yields the rows without the group column.
+    """
+    seen = set()
+    for *values, group in rows:
+        if group not in seen:
+            seen.add(group)
+            yield tuple(values)
+
+
+def normalize_text(text: str | None) -> str:
+    """Lowercase, unpunctuated text with Hebrew final letters folded to regular ones."""
+    text = unicodedata.normalize("NFKC", text or "").lower().translate(_FINAL_LETTERS)
+    return " ".join(_PUNCTUATION.sub(" ", text).split())
+
+
+@cache
+def _city_names(city: City) -> tuple[str, ...]:
+    names = {normalize_text(name) for name in city.address_names}
+    return tuple(sorted(names, key=len, reverse=True))  # "tel aviv yafo" before "tel aviv"
+
+
+def normalize_address(address: str | None, city: City | None = None) -> str:
+    """Lowercase, unpunctuated address without street-type words or ``city``'s name."""
+    text = f" {normalize_text(address)} "
+    for name in _city_names(city or lookup_city()):
+        text = text.replace(f" {name} ", " ")
+    return " ".join(word for word in text.split() if word not in _STREET_WORDS)
+
+
+def shingles(address: str | None, city: City | None = None) -> set[str]:
+    text = f" {normalize_address(address, city)} "
+    if len(text) <= SHINGLE_SIZE:
+        return {text}
+    return {text[i : i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def minhash(features: Iterable[str]) -> tuple[int, ...]:
+    hashes = [zlib.crc32(feature.encode()) for feature in features]
+    return tuple(min((a * h + b) % _PRIME & _MAX_HASH for h in hashes) for a, b in _PERMUTATIONS)
+
+
+def band_buckets(signature: tuple[int, ...]) -> list[tuple[int, int]]:
+    """(band, bucket) pairs; listings sharing any pair are candidates."""
+    return [
+        (
+            band,
+            zlib.crc32(
+                struct.pack(
+                    f"<{ROWS_PER_BAND}I",
+                    *signature[band * ROWS_PER_BAND : (band + 1) * ROWS_PER_BAND],
+                )
+            ),
+        )
+        for band in range(BANDS)
+    ]
+
+
+def jaccard(a: set[str], b: set[str]) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+def _same_apartment(a: RentalListing, b: RentalListing, a_shingles: set, b_shingles: set) -> bool:
+    # Exact matches only: a missing value is not a wildcard, or groups would
+    # chain different apartments together through it
+    if (a.rooms, a.sqm, a.floor) != (b.rooms, b.sqm, b.floor):
+        return False
+    return jaccard(a_shingles, b_shingles) >= SIMILARITY_THRESHOLD
+
+
+def _group_sources(session: Session, groups: set[str]) -> dict[str, set[str]]:
+    """Sources already present in each of ``groups``."""
+    found: dict[str, set[str]] = defaultdict(set)
+    group_values = sorted(groups)
+    for i in range(0, len(group_values), _LOOKUP_CHUNK):
+        rows = session.exec(
+            select(listing_group(), RentalListing.source).where(
+                listing_group().in_(group_values[i : i + _LOOKUP_CHUNK])
+            )
+        ).all()
+        for group, source in rows:
+            found[group].add(source)
+    return found
+
+
+def _stored_candidates(session: Session, buckets: set[tuple[int, int]]) -> dict:
+    """Listing ids already indexed under each of ``buckets``."""
+    found: dict[tuple[int, int], list[str]] = defaultdict(list)
+    by_band: dict[int, list[int]] = defaultdict(list)
+    for band, bucket in sorted(buckets):
+        by_band[band].append(bucket)
+    # One lookup per band, so each is a range search on the (band, bucket, ...) key
+    for band, bucket_values in by_band.items():
+        for i in range(0, len(bucket_values), _LOOKUP_CHUNK):
+            rows = session.exec(
+                select(ListingSignatureBand.bucket, ListingSignatureBand.listing_id).where(
+                    ListingSignatureBand.band == band,
+                    col(ListingSignatureBand.bucket).in_(bucket_values[i : i + _LOOKUP_CHUNK]),
+                )
+            ).all()
+            for bucket, listing_id in rows:
+                found[(band, bucket)].append(listing_id)
+    return found
+
+
+def assign_canonical_ids(
+    session: Session, listings: list[RentalListing], city: City | None = None
+) -> set[str]:
+    """Group new ``listings`` of ``city`` with known ones and index their signatures.
+
+    Sets ``canonical_id`` on every listing in ``listings`` and adds its LSH
+    bands to the session; does not commit. Listings are matched in order,
+    so earlier ones in the batch become canonical for later duplicates.
+    Returns the ids of listings that duplicate an already active listing.
+    """
+    signatures = {}
+    batch_shingles = {}
+    for listing in listings:
+        batch_shingles[listing.id] = shingles(listing.address, city)
+        signatures[listing.id] = band_buckets(minhash(batch_shingles[listing.id]))
+
+    wanted = {key for buckets in signatures.values() for key in buckets}
+    stored = _stored_candidates(session, wanted)
+    stored_ids = {listing_id for ids in stored.values() for listing_id in ids}
+    known = {
+        listing.id: listing
+        for listing in session.exec(
+            select(RentalListing).where(col(RentalListing.id).in_(stored_ids))
+        ).all()
+    }
+    known_shingles = {listing_id: shingles(known[listing_id].address, city) for listing_id in known}
+    active_groups = {
+        known[listing_id].canonical_id or listing_id
+        for listing_id in known
+        if known[listing_id].is_active
+    }
+    group_sources = _group_sources(
+        session, {listing.canonical_id or listing_id for listing_id, listing in known.items()}
+    )
+
+    in_batch: dict[tuple[int, int], list[str]] = defaultdict(list)
+    batch = {listing.id: listing for listing in listings}
+    duplicates = set()
+    for listing in listings:
+        candidates = []
+        for key in signatures[listing.id]:
+            candidates.extend(stored.get(key, ()))
+            candidates.extend(in_batch[key])
+        matches = []
+        for candidate_id in dict.fromkeys(candidates):
+            if candidate_id == listing.id:
+                continue
+            other = known.get(candidate_id) or batch[candidate_id]
+            other_shingles = known_shingles.get(candidate_id) or batch_shingles[candidate_id]
+            if listing.source in group_sources[other.canonical_id or other.id]:
+                continue  # one site never lists the same apartment twice
+            if _same_apartment(listing, other, batch_shingles[listing.id], other_shingles):
+                matches.append(other)
+
+        if matches:
+            first = min(matches, key=lambda m: (m.first_seen, m.id))
+            listing.canonical_id = first.canonical_id or first.id
+        else:
+            listing.canonical_id = listing.id
+        group_sources[listing.canonical_id].add(listing.source)
+        if listing.canonical_id in active_groups:
+            duplicates.add(listing.id)
+        if listing.is_active:
+            active_groups.add(listing.canonical_id)
+
+        for band, bucket in signatures[listing.id]:
+            in_batch[(band, bucket)].append(listing.id)
+            session.add(ListingSignatureBand(band=band, bucket=bucket, listing_id=listing.id))
+    return duplicates
+
+
+def rebuild_signatures(session: Session, city: City | None = None) -> int:
+    """Re-hash every listing and regroup from scratch. Does not commit."""
+    session.exec(delete(ListingSignatureBand))
+    listings = session.exec(
+        select(RentalListing).order_by(RentalListing.first_seen, RentalListing.id)
+    ).all()
+    for listing in listings:
+        listing.canonical_id = None
+        session.add(listing)
+    session.flush()
+    assign_canonical_ids(session, listings, city)
+    return len({listing.canonical_id for listing in listings})
+
+
+if __name__ == "__main__":
+    from api.cities import enabled_cities
+    from api.database import create_db_and_tables, get_engine, publish_read_snapshot
+    from api.services.generation import bump_generation
+
+    for city in enabled_cities():
+        create_db_and_tables(city.id)
+        with Session(get_engine(city.id)) as session:
+            groups = rebuild_signatures(session, city)
+            bump_generation(session, "dedup", {"groups": groups})
+            session.commit()
+            print(f"{city.name_en}: grouped listings into {groups} apartments")
+        publish_read_snapshot(city.id)
@@ -0,0 +1,128 @@
+"""Price distributions per neighborhood and room count.
+
+Derived from the stored price sketches (see :mod:`api.services.price_sketches`),
+which scrapers keep current bucket by bucket: each (neighborhood, rooms
+bucket) gets its quantiles and a histogram of asking prices, built for every
+neighborhood at once per data generation. Bins are ``distribution_bin_width``
+shekels wide and aligned to multiples of it, so charts of different
+neighborhoods and room counts share bin edges. A centroid's weight goes to
+the bin holding its mean, which is exact while centroids are single listings
+(buckets of up to a few dozen listings) and close beyond.
+
+:func:`what_if` scores a whole grid of rents against the market a rent check
+would use, in one pass over it, for the savings calculator.
+"""
+
+from collections import defaultdict
+
+from sqlmodel import Session, select
+
+from api.cities import City
+from api.config import settings
+from api.models import PriceSketch
+from api.services.comparables import ComparableQuery, match_comparables
+from api.services.generation import GenerationalIndex
+from api.services.price_sketches import rooms_bucket
+from api.services.quantile_sketch import TDigest
+from api.services.rent_scorer import find_market, score_label
+
+MAX_GRID_POINTS = 400
+
+
+def histogram(digest: TDigest, width: int) -> dict:
+    """Counts per ``width``-wide bin from the lowest to the highest non-empty one."""
+    weights: dict[int, float] = defaultdict(float)
+    for mean, weight in digest.centroids():
+        weights[int(mean // width)] += weight
+    first, last = min(weights), max(weights)
+    return {
+        "start": first * width,
+        "bin_width": width,
+        "counts": [round(weights.get(b, 0.0)) for b in range(first, last + 1)],
+    }
+
+
+def summarize(bucket: float, digest: TDigest, width: int) -> dict:
+    return {
+        "rooms": bucket,
+        "count": digest.count,
+        "min": round(digest.min),
+        "p25": round(digest.quantile(0.25)),
+        "median": round(digest.quantile(0.5)),
+        "p75": round(digest.quantile(0.75)),
+        "max": round(digest.max),
+        "mean": round(digest.mean),
+        "histogram": histogram(digest, width),
+    }
+
+
+def build_price_distributions(session: Session) -> dict[str, list[dict]]:
+    """Every neighborhood's distributions, ordered by rooms bucket."""
+    width = settings.distribution_bin_width
+    distributions: dict[str, list[dict]] = defaultdict(list)
+    sketches = session.exec(
+        select(PriceSketch).order_by(PriceSketch.neighborhood_id, PriceSketch.rooms_bucket)
+    )
+    for sketch in sketches:
+        digest = TDigest.from_bytes(sketch.digest)
+        if digest.count:
+            distributions[sketch.neighborhood_id].append(
+                summarize(sketch.rooms_bucket, digest, width)
+            )
+    return dict(distributions)
+
+
+price_distributions = GenerationalIndex("price-distributions", build_price_distributions)
+
+
+def get_distributions(
+    session: Session, neighborhood_id: str, rooms: float | None = None
+) -> list[dict]:
+    """A neighborhood's distributions, or only the bucket ``rooms`` falls in."""
+    distributions = price_distributions.get(session).get(neighborhood_id, [])
+    if rooms is None:
+        return distributions
+    bucket = rooms_bucket(rooms)
+    return [d for d in distributions if d["rooms"] == bucket]
+
+
+def rent_grid(rent_min: int, rent_max: int, step: int) -> list[int]:
+    if rent_max < rent_min:
+        raise ValueError("rent_max must not be below rent_min")
+    if (rent_max - rent_min) // step + 1 > MAX_GRID_POINTS:
+        raise ValueError(f"A grid has at most {MAX_GRID_POINTS} points")
+    return list(range(rent_min, rent_max + 1, step))
+
+
+def what_if(
+    session: Session,
+    query: ComparableQuery,
+    rents: list[int],
+    city: City | None = None,
+) -> dict:
+    """Score every rent in ``rents`` as a rent check for ``query`` would.
+
+    The grid is scored against the same market as
+    :func:`~api.services.rent_scorer.score_rent`: the nearest comparables,
+    else the widening sketch, else the CBS average. ``amenities_applied`` is
+    False when ``query.amenities`` had to be ignored, as in a rent check.
+    """
+    comparables, matched = match_comparables(session, query)
+    market = find_market(session, query.neighborhood_id, query.rooms, comparables, city)
+    grid = []
+    for rent, percentile in zip(rents, market.percentiles(rents)):
+        grid.append(
+            {
+                "rent": rent,
+                "percentile": percentile,
+                "score": score_label(percentile),
+                "delta_pct": round((rent - market.avg) / market.avg * 100, 1),
+            }
+        )
+    return {
+        "basis": market.basis,
+        "count": market.count,
+        "amenities_applied": not query.amenities or (matched and market.basis == "comparables"),
+        "market_avg": market.avg,
+        "grid": grid,
+    }
@@ -0,0 +1,146 @@
+"""Market-update notifications for ``/api/events``.
+
+One poller per city watches that city's ``data_generation`` and turns every
+new generation into a server-sent event, encoded once. Connections don't get
+their own queue: they all wait on a single shared future that is resolved
+when an event is published, then read the few newest frames from a short
+shared history, so an event costs O(1) per idle connection. The history
+also lets a reconnecting client resume from its ``Last-Event-ID``.
+"""
+
+import asyncio
+import json
+import logging
+from collections import deque
+from collections.abc import AsyncIterator, Callable
+
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, func, select
+
+from api.config import settings
+from api.models import DataGeneration
+
+logger = logging.getLogger("dira-fair.events")
+
+EVENT_NAME = "market-update"
+# Tells EventSource how long to wait before reconnecting, in milliseconds
+RETRY_FRAME = b"retry: 5000\n\n"
+KEEPALIVE_FRAME = b": keepalive\n\n"
+
+
+def market_update(generation: DataGeneration) -> dict:
+    details = json.loads(generation.details) if generation.details else {}
+    return {
+        "generation": generation.id,
+        "source": generation.source,
+        "created_at": generation.created_at.isoformat(),
+        "neighborhoods": details.get("neighborhoods", []),
+        "added": details.get("added", 0),
+        "removed": details.get("removed", 0),
+        "repriced": details.get("repriced", 0),
+    }
+
+
+def encode_event(event_id: int, payload: dict) -> bytes:
+    data = json.dumps(payload, separators=(",", ":"))
+    return f"id: {event_id}\nevent: {EVENT_NAME}\ndata: {data}\n\n".encode()
+
+
+class Broadcaster:
+    def __init__(self, history: int | None = None):
+        self._history: deque[tuple[int, bytes]] = deque(maxlen=history or settings.events_history)
+        self._next: asyncio.Future | None = None
+        # Newest generation seen; None until the poller has read the table once
+        self.last_generation: int | None = None
+        self.subscribers = 0
+        self.published = 0
+
+    def publish(self, generation: int, payload: dict):
+        """Send an event to every subscriber. Call from the event loop thread."""
+        self._history.append((generation, encode_event(generation, payload)))
+        self.last_generation = generation
+        self.published += 1
+        waiting, self._next = self._next, None
+        if waiting is not None and not waiting.done():
+            waiting.set_result(None)
+
+    def _since(self, event_id: int) -> list[tuple[int, bytes]]:
+        newer = []
+        for entry in reversed(self._history):
+            if entry[0] <= event_id:
+                break
+            newer.append(entry)
+        newer.reverse()
+        return newer
+
+    def _next_event(self) -> asyncio.Future:
+        if self._next is None:
+            self._next = asyncio.get_running_loop().create_future()
+        return self._next
+
+    async def stream(self, last_event_id: int | None = None) -> AsyncIterator[bytes]:
+        """SSE frames for one connection, starting after ``last_event_id``."""
+        self.subscribers += 1
+        try:
+            cursor = (self.last_generation or 0) if last_event_id is None else last_event_id
+            yield RETRY_FRAME
+            while True:
+                newer = self._since(cursor)
+                if newer:
+                    for event_id, frame in newer:
+                        yield frame
+                        cursor = event_id
+                    continue
+                # Taken right after the history check, so no event can slip in between
+                next_event = self._next_event()
+                try:
+                    # Shielded: a subscriber timing out must not cancel the shared future
+                    await asyncio.wait_for(
+                        asyncio.shield(next_event), settings.events_keepalive_seconds
+                    )
+                except TimeoutError:
+                    yield KEEPALIVE_FRAME
+        finally:
+            self.subscribers -= 1
+
+    def fetch_new(self, session: Session) -> list[DataGeneration]:
+        """Generations committed since the last call.
+
+        The first call only records the current generation, so history from
+        before startup isn't replayed.
+        """
+        if self.last_generation is None:
+            self.last_generation = session.exec(select(func.max(DataGeneration.id))).one() or 0
+            return []
+        return session.exec(
+            select(DataGeneration)
+            .where(DataGeneration.id > self.last_generation)
+            .order_by(DataGeneration.id)
+        ).all()
+
+    async def run(self, engine_for: Callable[[], Engine]):
+        """Poll for new generations until cancelled.
+
+        ``engine_for`` is called on every poll, so the poller follows the
+        read snapshot the API currently serves.
+        """
+
+        def fetch():
+            with Session(engine_for()) as session:
+                return [(g.id, market_update(g)) for g in self.fetch_new(session)]
+
+        while True:
+            try:
+                for generation, payload in await asyncio.to_thread(fetch):
+                    self.publish(generation, payload)
+            except Exception:
+                logger.exception("Polling for market updates failed")
+            await asyncio.sleep(settings.events_poll_seconds)
+
+
+_broadcasters: dict[str, Broadcaster] = {}
+
+
+def get_broadcaster(city_id: str) -> Broadcaster:
+    """The broadcaster for a city; generation ids are only ordered within a city."""
+    return _broadcasters.setdefault(city_id, Broadcaster())
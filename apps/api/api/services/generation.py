@@ -0,0 +1,170 @@
+"""Data generation tracking.
+
+Every scraper commit appends a row to ``data_generation``; the latest id is
+the generation that derived caches are keyed on, so a new scrape invalidates
+them without any explicit purge. Lookups are throttled per engine so hot
+paths pay for at most one query every ``generation_poll_seconds``.
+
+A :class:`GenerationalIndex` may serve a value built for an older
+generation while it rebuilds, so results derived from one must not be
+cached under the current generation; :func:`get_or_compute_current` only
+stores them when every index consulted was up to date.
+"""
+
+import json
+import logging
+import threading
+import time
+import weakref
+from collections.abc import Callable, Hashable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+
+from sqlalchemy import event
+from sqlmodel import Session, func, select
+
+from api.config import settings
+from api.models import DataGeneration
+from api.services.result_cache import ResultCache
+
+logger = logging.getLogger("dira-fair.generation")
+
+_lock = threading.Lock()
+# engine -> (generation, monotonic time it was read)
+_observed: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+# Generations of the index values served in the current context, see served_generations()
+_served: ContextVar[list[int] | None] = ContextVar("dira_served_generations", default=None)
+
+
+def _remember(engine, generation: int):
+    with _lock:
+        _observed[engine] = (generation, time.monotonic())
+
+
+def bump_generation(session: Session, source: str, details: dict | None = None) -> DataGeneration:
+    """Record a new data generation in the caller's transaction.
+
+    Call right before ``session.commit()`` so the bump is atomic with the
+    data it describes. Once committed, this process sees the new generation
+    immediately; other processes pick it up on their next poll.
+    """
+    entry = DataGeneration(source=source, details=json.dumps(details) if details else None)
+    session.add(entry)
+    session.flush()
+    generation = entry.id
+    engine = session.get_bind()
+
+    @event.listens_for(session, "after_commit", once=True)
+    def _publish(_session):
+        _remember(engine, generation)
+
+    return entry
+
+
+def note_generation(engine, generation: int):
+    """Record a generation learned out of band, e.g. from a newly published snapshot."""
+    _remember(engine, generation)
+
+
+def current_generation(session: Session) -> int:
+    """Latest committed generation, or 0 before the first scrape."""
+    engine = session.get_bind()
+    with _lock:
+        observed = _observed.get(engine)
+    if observed and time.monotonic() - observed[1] < settings.generation_poll_seconds:
+        return observed[0]
+
+    generation = session.exec(select(func.max(DataGeneration.id))).one() or 0
+    _remember(engine, generation)
+    return generation
+
+
+class GenerationalIndex:
+    """An in-memory structure per engine, rebuilt when the generation moves.
+
+    The first lookup builds synchronously. After that a stale structure is
+    served while a background thread rebuilds it, so readers never wait on a
+    rebuild triggered by a scrape.
+    """
+
+    def __init__(self, name: str, build: Callable[[Session], Any]):
+        self.name = name
+        self._build = build
+        self._built: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self._rebuilding: weakref.WeakSet = weakref.WeakSet()
+        self._lock = threading.Lock()
+
+    def get(self, session: Session) -> Any:
+        return self.get_with_generation(session)[1]
+
+    def get_with_generation(self, session: Session) -> tuple[int, Any]:
+        """The value and the generation it was built for, older than current while rebuilding."""
+        engine = session.get_bind()
+        generation = current_generation(session)
+        with self._lock:
+            current = self._built.get(engine)
+        if current is None:
+            current = (generation, self._build(session))
+            with self._lock:
+                self._built[engine] = current
+        elif current[0] != generation:
+            self._rebuild_in_background(engine, generation)
+
+        served = _served.get()
+        if served is not None:
+            served.append(current[0])
+        return current
+
+    def _rebuild_in_background(self, engine, generation: int):
+        with self._lock:
+            if engine in self._rebuilding:
+                return
+            self._rebuilding.add(engine)
+
+        def rebuild():
+            try:
+                with Session(engine) as session:
+                    value = self._build(session)
+                with self._lock:
+                    self._built[engine] = (generation, value)
+                logger.info("Rebuilt %s for generation %d", self.name, generation)
+            except Exception:
+                logger.exception("Rebuilding %s failed", self.name)
+            finally:
+                with self._lock:
+                    self._rebuilding.discard(engine)
+
+        threading.Thread(target=rebuild, name=f"{self.name}-rebuild", daemon=True).start()
+
+
+@contextmanager
+def served_generations() -> Iterator[list[int]]:
+    """Collect the generations of every index value served inside the block."""
+    served: list[int] = []
+    token = _served.set(served)
+    try:
+        yield served
+    finally:
+        _served.reset(token)
+
+
+def get_or_compute_current(
+    cache: ResultCache, key: tuple[Hashable, ...], session: Session, compute: Callable[[], Any]
+) -> Any:
+    """``cache`` lookup for ``key`` plus the current generation.
+
+    The result is stored only if no index it read from was stale; otherwise
+    it is served once and recomputed on the next request.
+    """
+    generation = current_generation(session)
+    fresh = True
+
+    def tracked():
+        nonlocal fresh
+        with served_generations() as served:
+            value = compute()
+        fresh = all(built_for >= generation for built_for in served)
+        return value
+
+    return cache.get_or_compute((*key, generation), tracked, cacheable=lambda _: fresh)
@@ -0,0 +1,156 @@
+"""Memory-mapped columnar file of active listings.
+
+Published next to each read snapshot (see :mod:`api.services.read_snapshot`)
+and opened read-only with ``mmap`` by every API worker, so the listings
+behind comparables lookups live once in the shared page cache instead of
+once per worker. Columns are fixed-width arrays read in place through
+``memoryview`` casts; rows are sorted by (neighborhood, rooms, price). The
+file also carries the comparables KD-tree, built once at publish time.
+
+Layout: an 8-byte magic, the header length (uint32) and a JSON header with
+the generation, row count, neighborhood ids (their index is the row's
+neighborhood code) and every column's typecode, offset and length. Columns
+start on 8-byte boundaries and use the publishing machine's byte order,
+which the header records.
+"""
+
+import json
+import math
+import mmap
+import struct
+import sys
+import weakref
+from array import array
+from collections.abc import Sequence
+from pathlib import Path
+
+from sqlmodel import Session
+
+from api.services.generation import current_generation
+
+MAGIC = b"DIRALC01"
+NO_NEIGHBORHOOD = 0xFFFF
+MISSING_FLOOR = -(2**15)
+_HEADER_LENGTH = struct.Struct("<I")
+_ALIGN = 8
+
+# Attached columns per engine, see attach()
+_attached: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+def write_columns(
+    path: Path, rows: Sequence[tuple], neighborhood_ids: list[str], tree, generation: int
+):
+    """Write ``rows`` and the :class:`~api.services.comparables.KDTree` built over them.
+
+    ``rows`` are (id, neighborhood_id, lat, lng, rooms, sqm, floor, price,
+    amenities) tuples, already sorted by (neighborhood, rooms, price).
+    """
+    codes = {neighborhood_id: code for code, neighborhood_id in enumerate(neighborhood_ids)}
+    neighborhood = array("H", [codes.get(row[1], NO_NEIGHBORHOOD) for row in rows])
+    ids = [row[0].encode() for row in rows]
+    id_offsets = array("I", [0])
+    for listing_id in ids:
+        id_offsets.append(id_offsets[-1] + len(listing_id))
+
+    columns = {
+        "neighborhood": neighborhood,
+        "rooms": array("f", [row[4] for row in rows]),
+        "sqm": array("f", [math.nan if row[5] is None else row[5] for row in rows]),
+        "floor": array("h", [MISSING_FLOOR if row[6] is None else row[6] for row in rows]),
+        "price": array("i", [row[7] for row in rows]),
+        "amenities": array("I", [row[8] for row in rows]),
+        "id_offsets": id_offsets,
+        "id_data": array("B", b"".join(ids)),
+        "kd_split": tree.split,
+        "kd_positions": tree.positions,
+        **{f"kd_{d}": column for d, column in enumerate(tree.columns)},
+    }
+
+    layout, offset = {}, 0
+    for name, values in columns.items():
+        layout[name] = [values.typecode, offset, len(values)]
+        offset += _aligned(len(values) * values.itemsize)
+    header = json.dumps(
+        {
+            "generation": generation,
+            "rows": len(rows),
+            "byteorder": sys.byteorder,
+            "neighborhoods": neighborhood_ids,
+            "kd_dims": len(tree.columns),
+            "columns": layout,
+        }
+    ).encode()
+    base = _aligned(len(MAGIC) + _HEADER_LENGTH.size + len(header))
+
+    with open(path, "wb") as f:
+        f.write(MAGIC + _HEADER_LENGTH.pack(len(header)) + header)
+        for name, values in columns.items():
+            f.seek(base + layout[name][1])
+            f.write(values.tobytes())
+        f.truncate(base + offset)
+
+
+def _aligned(size: int) -> int:
+    return -(-size // _ALIGN) * _ALIGN
+
+
+class _Strings(Sequence):
+    """Read-only sequence of strings stored as offsets into one byte column."""
+
+    def __init__(self, offsets: memoryview, data: memoryview):
+        self._offsets, self._data = offsets, data
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, row: int) -> str:
+        return bytes(self._data[self._offsets[row] : self._offsets[row + 1]]).decode()
+
+
+class ListingColumns:
+    def __init__(self, path: Path):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a listing columns file")
+        (length,) = _HEADER_LENGTH.unpack_from(self._mmap, len(MAGIC))
+        start = len(MAGIC) + _HEADER_LENGTH.size
+        header = json.loads(self._mmap[start : start + length])
+        if header["byteorder"] != sys.byteorder:
+            raise ValueError(f"{path} was written on a {header['byteorder']}-endian machine")
+
+        self.generation: int = header["generation"]
+        self.neighborhoods: list[str] = header["neighborhoods"]
+        self._rows: int = header["rows"]
+
+        view, base = memoryview(self._mmap), _aligned(start + length)
+        columns = {}
+        for name, (typecode, offset, count) in header["columns"].items():
+            size = array(typecode).itemsize
+            columns[name] = view[base + offset : base + offset + count * size].cast(typecode)
+        self.neighborhood = columns["neighborhood"]
+        self.rooms = columns["rooms"]
+        self.sqm = columns["sqm"]
+        self.floor = columns["floor"]
+        self.price = columns["price"]
+        self.amenities = columns["amenities"]
+        self.ids = _Strings(columns["id_offsets"], columns["id_data"])
+        self.kd_split = columns["kd_split"]
+        self.kd_positions = columns["kd_positions"]
+        self.kd_columns = [columns[f"kd_{d}"] for d in range(header["kd_dims"])]
+
+    def __len__(self) -> int:
+        return self._rows
+
+
+def attach(engine, columns: ListingColumns):
+    """Serve ``columns`` to lookups on ``engine`` while its generation matches."""
+    _attached[engine] = columns
+
+
+def columns_for(session: Session) -> ListingColumns | None:
+    columns = _attached.get(session.get_bind())
+    if columns is None or columns.generation != current_generation(session):
+        return None
+    return columns
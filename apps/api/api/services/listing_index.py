@@ -0,0 +1,283 @@
+"""In-memory columnar index of active listings for multi-criteria search.
+
+Every active listing gets a row position; each filterable column is held as
+a flat array plus bitmaps (Python ints, one bit per row): cumulative
+"value <= bucket edge" bitmaps over quantile buckets for numeric columns,
+one bitmap per value for neighborhoods and one per amenity bit. A query ANDs
+the bitmaps into a candidate set, then visits the sort column's buckets in
+order: a bucket with few candidates is extracted and sorted, a dense one is
+walked in the precomputed sort order until the page is full. Either way only
+a bucket or two of rows is touched, so any filter combination stays in the
+low milliseconds at a million listings.
+
+Bucket bitmaps are supersets at range edges; candidates are checked
+against the exact column values before they are returned.
+"""
+
+import bisect
+import math
+import re
+from array import array
+from collections import defaultdict
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+from sqlmodel import Session, select
+
+from api.models import RentalListing
+from api.services.dedup import first_per_group, listing_group
+from api.services.generation import GenerationalIndex
+
+SORT_KEYS = ("price", "price_per_sqm", "days_on_market")
+RANGE_COLUMNS = ("price", "sqm", "rooms", "floor", "price_per_sqm", "days_on_market")
+RANGE_BUCKETS = 64
+
+_NONZERO_BYTE = re.compile(rb"[^\x00]")
+_BYTE_BITS = [tuple(bit for bit in range(8) if byte >> bit & 1) for byte in range(256)]
+
+
+@dataclass
+class SearchFilters:
+    neighborhood_id: str | None = None
+    min_price: float | None = None
+    max_price: float | None = None
+    min_sqm: float | None = None
+    max_sqm: float | None = None
+    min_rooms: float | None = None
+    max_rooms: float | None = None
+    min_floor: float | None = None
+    max_floor: float | None = None
+    amenities: int = 0
+
+    def ranges(self) -> list[tuple[str, float | None, float | None]]:
+        return [
+            (column, getattr(self, f"min_{column}"), getattr(self, f"max_{column}"))
+            for column in ("price", "sqm", "rooms", "floor")
+            if getattr(self, f"min_{column}") is not None
+            or getattr(self, f"max_{column}") is not None
+        ]
+
+
+class _BitmapBuilder:
+    def __init__(self, size: int):
+        self.bits = bytearray((size + 7) // 8)
+
+    def set(self, position: int):
+        self.bits[position >> 3] |= 1 << (position & 7)
+
+    def to_int(self) -> int:
+        return int.from_bytes(self.bits, "little")
+
+
+def _bitmap(positions: Iterable[int], size: int) -> int:
+    bits = _BitmapBuilder(size)
+    for position in positions:
+        bits.set(position)
+    return bits.to_int()
+
+
+def _set_bits(mask: int):
+    data = mask.to_bytes((mask.bit_length() + 7) // 8, "little")
+    for match in _NONZERO_BYTE.finditer(data):
+        base = match.start() * 8
+        for bit in _BYTE_BITS[data[match.start()]]:
+            yield base + bit
+
+
+class _RangeColumn:
+    """One numeric column: its sort order plus cumulative bucket bitmaps.
+
+    ``order`` holds the positions with a value, sorted by (value, id).
+    Bucket ``b`` covers values in (edges[b - 1], edges[b]], i.e. the slice
+    ``order[bounds[b]:bounds[b + 1]]``; ``cumulative[b]`` has a bit for
+    every row in buckets 0..b.
+    """
+
+    def __init__(self, values: array, by_id: list[int]):
+        self.order = array(
+            "I", sorted((p for p in by_id if values[p] == values[p]), key=values.__getitem__)
+        )
+        count = len(self.order)
+        step = max(1, count // RANGE_BUCKETS)
+        self.edges = sorted({values[self.order[i]] for i in range(step - 1, count, step)})
+        if count and self.edges[-1] != values[self.order[-1]]:
+            self.edges.append(values[self.order[-1]])
+
+        self.bounds = [0]
+        self.cumulative = []
+        bits = _BitmapBuilder(len(values))
+        i = 0
+        for edge in self.edges:
+            while i < count and values[self.order[i]] <= edge:
+                bits.set(self.order[i])
+                i += 1
+            self.bounds.append(i)
+            self.cumulative.append(bits.to_int())
+        self.present = self.cumulative[-1] if self.cumulative else 0
+
+    def bucket(self, b: int) -> int:
+        return self.cumulative[b] ^ self.cumulative[b - 1] if b else self.cumulative[0]
+
+    def mask(self, low: float | None, high: float | None) -> int:
+        mask = self.present
+        if low is not None:
+            b = bisect.bisect_left(self.edges, low)
+            if b > 0:
+                mask &= ~self.cumulative[b - 1]
+        if high is not None:
+            b = bisect.bisect_left(self.edges, high)
+            if b < len(self.edges):
+                mask &= self.cumulative[b]
+        return mask
+
+
+class ListingIndex:
+    # A sort bucket with at most this many candidates is extracted and sorted;
+    # a denser one is walked in sort order, testing candidate bits, until the
+    # page is full.
+    SPARSE_CANDIDATES = 4096
+
+    def __init__(self, listings: list[tuple]):
+        """``listings`` rows are (id, neighborhood_id, amenities, *RANGE_COLUMNS)."""
+        size = len(listings)
+        self.size = size
+        self.ids = [row[0] for row in listings]
+        self.columns = {
+            name: array("d", (math.nan if row[3 + i] is None else row[3 + i] for row in listings))
+            for i, name in enumerate(RANGE_COLUMNS)
+        }
+        # Stable sorts of the id order break value ties by id
+        by_id = sorted(range(size), key=self.ids.__getitem__)
+        self.ranges = {name: _RangeColumn(self.columns[name], by_id) for name in RANGE_COLUMNS}
+
+        by_neighborhood: dict[str, list[int]] = defaultdict(list)
+        by_amenities: dict[int, list[int]] = defaultdict(list)
+        for position, (_, neighborhood_id, amenities, *_rest) in enumerate(listings):
+            if neighborhood_id is not None:
+                by_neighborhood[neighborhood_id].append(position)
+            if amenities:
+                by_amenities[amenities].append(position)
+        self.neighborhoods = {k: _bitmap(v, size) for k, v in by_neighborhood.items()}
+        # Few distinct masks occur, so fan each mask's bitmap out to its bits
+        self.amenity_bits: dict[int, int] = defaultdict(int)
+        for amenities, positions in by_amenities.items():
+            bitmap = _bitmap(positions, size)
+            for bit in _set_bits(amenities):
+                self.amenity_bits[1 << bit] |= bitmap
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _candidates(self, filters: SearchFilters, sort: str) -> int:
+        mask = self.ranges[sort].present
+        if filters.neighborhood_id is not None:
+            mask &= self.neighborhoods.get(filters.neighborhood_id, 0)
+        for column, low, high in filters.ranges():
+            mask &= self.ranges[column].mask(low, high)
+        bit = 1
+        while mask and bit <= filters.amenities:
+            if filters.amenities & bit:
+                mask &= self.amenity_bits.get(bit, 0)
+            bit <<= 1
+        return mask
+
+    def _matches(self, filters: SearchFilters):
+        checks = [(self.columns[column], low, high) for column, low, high in filters.ranges()]
+
+        def matches(position: int) -> bool:
+            for values, low, high in checks:
+                value = values[position]
+                if (low is not None and not value >= low) or (
+                    high is not None and not value <= high
+                ):
+                    return False
+            return True
+
+        return matches
+
+    def search(
+        self,
+        filters: SearchFilters,
+        sort: str = "price",
+        descending: bool = False,
+        after: tuple | None = None,
+        limit: int = 20,
+    ) -> tuple[list[str], tuple | None]:
+        """Ids of the next ``limit`` matches after the ``after`` (value, id) key.
+
+        Returns the ids and the key to pass as ``after`` for the following
+        page, or None when this is the last page.
+        """
+        values = self.columns[sort]
+        column = self.ranges[sort]
+        order = column.order
+        mask = self._candidates(filters, sort)
+        matches = self._matches(filters)
+
+        def key(position: int) -> tuple:
+            return (values[position], self.ids[position])
+
+        # Slice of the sort order that lies past the cursor
+        lo, hi = 0, len(order)
+        if after is not None:
+            if descending:
+                hi = bisect.bisect_left(order, after, key=key)
+            else:
+                lo = bisect.bisect_right(order, after, key=key)
+
+        # Visit sort buckets in order so only the first few are ever touched
+        page: list[int] = []
+        buckets = range(len(column.edges))
+        for b in reversed(buckets) if descending else buckets:
+            start, end = max(column.bounds[b], lo), min(column.bounds[b + 1], hi)
+            if start >= end:
+                continue
+            candidates = mask & column.bucket(b)
+            if not candidates:
+                continue
+            if candidates.bit_count() <= self.SPARSE_CANDIDATES:
+                found = [p for p in _set_bits(candidates) if matches(p)]
+                if after is not None:
+                    found = [p for p in found if (key(p) < after if descending else key(p) > after)]
+                page.extend(sorted(found, key=key, reverse=descending))
+            else:
+                data = candidates.to_bytes((candidates.bit_length() + 7) // 8, "little")
+                nbytes = len(data)
+                steps = range(end - 1, start - 1, -1) if descending else range(start, end)
+                for i in steps:
+                    p = order[i]
+                    byte = p >> 3
+                    if byte < nbytes and data[byte] >> (p & 7) & 1 and matches(p):
+                        page.append(p)
+                        if len(page) > limit:
+                            break
+            if len(page) > limit:
+                break
+
+        more = len(page) > limit
+        page = page[:limit]
+        next_key = key(page[-1]) if more else None
+        return [self.ids[p] for p in page], next_key
+
+
+def build_listing_index(session: Session) -> ListingIndex:
+    rows = session.exec(
+        select(
+            RentalListing.id,
+            RentalListing.neighborhood_id,
+            RentalListing.amenities,
+            *(getattr(RentalListing, name) for name in RANGE_COLUMNS),
+            listing_group(),
+        )
+        .where(RentalListing.is_active == True)  # noqa: E712
+        .order_by(RentalListing.first_seen, RentalListing.id)
+    )
+    return ListingIndex(list(first_per_group(rows)))
+
+
+listing_indexes = GenerationalIndex("listing-index", build_listing_index)
+
+
+def get_listing_index(session: Session) -> ListingIndex:
+    """Index for the session's database; a stale one is served while it rebuilds."""
+    return listing_indexes.get(session)
@@ -6,9 +6,17 @@ supply levels, and generates negotiation tips.
 
 from datetime import date
 
-from sqlmodel import Session, func, select
+from sqlmodel import Session, col, func, select
 
+from api.cities import City, lookup_city
 from api.models import RentalListing, RentIndex
+from api.services.amenities import amenity_names
+from api.services.cbs_reference import get_cbs_reference
+from api.services.comparables import Comparable, ComparableQuery, find_comparables
+from api.services.dedup import listing_group
+
+DEFAULT_RENEWAL_DISCOUNT = 2.8  # CBS average
+COMPARABLE_LISTINGS_SHOWN = 5
 
 SEASONAL_FAVORABILITY = {
     1: "good_to_negotiate",
@@ -26,11 +34,40 @@ SEASONAL_FAVORABILITY = {
 }
 
 
-def get_signals(neighborhood_id: str, rooms: float, session: Session) -> dict:
-    """Compute market signals for a neighborhood."""
-    # Active supply count
+def rent_trend(session: Session) -> str:
+    """City-wide direction of the rent index over the last three readings."""
+    recent_indices = session.exec(select(RentIndex).order_by(RentIndex.date.desc()).limit(6)).all()
+
+    if len(recent_indices) < 2:
+        return "unknown"
+    latest = recent_indices[0].index_value
+    three_months_ago = recent_indices[min(2, len(recent_indices) - 1)].index_value
+    if latest > three_months_ago * 1.005:
+        return "rising"
+    if latest < three_months_ago * 0.995:
+        return "falling"
+    return "stable"
+
+
+def get_signals(
+    neighborhood_id: str,
+    rooms: float,
+    session: Session,
+    amenities: int = 0,
+    sqm: float | None = None,
+    comparables: list[Comparable] | None = None,
+    city: City | None = None,
+) -> dict:
+    """Compute market signals for a neighborhood.
+
+    Comparable listings are the nearest ones to the apartment (see
+    :func:`~api.services.comparables.find_comparables`); pass ``comparables``
+    to reuse a lookup. ``city`` defaults to the default city.
+    """
+    city = city or lookup_city()
+    # Active supply count, one per apartment across sources
     active_count = session.exec(
-        select(func.count(RentalListing.id)).where(
+        select(func.count(func.distinct(listing_group()))).where(
             RentalListing.neighborhood_id == neighborhood_id,
             RentalListing.is_active == True,  # noqa: E712
         )
@@ -46,36 +83,28 @@ def get_signals(neighborhood_id: str, rooms: float, session: Session) -> dict:
     ).one()
     avg_dom = round(avg_dom_result, 1) if avg_dom_result else None
 
-    # Trend from rent index
-    recent_indices = session.exec(select(RentIndex).order_by(RentIndex.date.desc()).limit(6)).all()
+    trend = rent_trend(session)
 
-    if len(recent_indices) >= 2:
-        latest = recent_indices[0].index_value
-        three_months_ago = recent_indices[min(2, len(recent_indices) - 1)].index_value
-        if latest > three_months_ago * 1.005:
-            trend = "rising"
-        elif latest < three_months_ago * 0.995:
-            trend = "falling"
-        else:
-            trend = "stable"
-    else:
-        trend = "unknown"
+    # Renewal discount: CBS new vs renewing tenants for this room count
+    tenant_types = get_cbs_reference(session).compare_tenant_types(city.name_he, rooms)
+    renewal_discount = (
+        tenant_types["renewal_discount_pct"] if tenant_types else DEFAULT_RENEWAL_DISCOUNT
+    )
 
     # Seasonal
     season = SEASONAL_FAVORABILITY.get(date.today().month, "neutral")
 
-    # Comparable listings for the user to see
-    comps = session.exec(
-        select(RentalListing)
-        .where(
-            RentalListing.neighborhood_id == neighborhood_id,
-            RentalListing.is_active == True,  # noqa: E712
-            RentalListing.rooms >= rooms - 0.5,
-            RentalListing.rooms <= rooms + 0.5,
+    # Nearest comparable listings for the user to see
+    if comparables is None:
+        comparables = find_comparables(
+            session, ComparableQuery(neighborhood_id, rooms, sqm, amenities=amenities)
         )
-        .order_by(RentalListing.price)
-        .limit(5)
+    nearest_ids = [c.listing_id for c in comparables[:COMPARABLE_LISTINGS_SHOWN]]
+    listings = session.exec(
+        select(RentalListing).where(col(RentalListing.id).in_(nearest_ids))
     ).all()
+    by_id = {listing.id: listing for listing in listings}
+    comps = [by_id[i] for i in nearest_ids if i in by_id]
 
     comparable_listings = [
         {
@@ -84,6 +113,7 @@ def get_signals(neighborhood_id: str, rooms: float, session: Session) -> dict:
             "sqm": c.sqm,
             "price": c.price,
             "days_on_market": c.days_on_market,
+            "amenities": amenity_names(c.amenities),
         }
         for c in comps
     ]
@@ -91,15 +121,16 @@ def get_signals(neighborhood_id: str, rooms: float, session: Session) -> dict:
     return {
         "trend": trend,
         "season": season,
-        "renewal_discount": 2.8,  # CBS average
+        "renewal_discount": renewal_discount,
         "avg_days_on_market": avg_dom,
         "active_supply": active_count,
         "comparable_listings": comparable_listings,
     }
 
 
-def generate_tips(score: str, signals: dict) -> list[str]:
+def generate_tips(score: str, signals: dict, city: City | None = None) -> list[str]:
     """Generate negotiation tips based on score and market signals."""
+    city = city or lookup_city()
     tips = []
 
     if score == "above_market":
@@ -155,7 +186,7 @@ def generate_tips(score: str, signals: dict) -> list[str]:
     # Trend tips
     if signals["trend"] == "falling":
         tips.append(
-            "Rents in Tel Aviv are trending downward. "
+            f"Rents in {city.name_en} are trending downward. "
             "Point to this trend when negotiating \u2014 your landlord "
             "should consider the broader market."
         )
@@ -0,0 +1,67 @@
+"""Aggregate payload for the dashboard and explore pages.
+
+One response carries every neighborhood with a price summary, the rent
+trend and the seasonal outlook. Each part comes from its own cache: the
+neighborhood summaries are derived from the stored price sketches once per
+data generation and the trend from the trends cache, so assembling the
+overview costs a few lookups rather than a call per neighborhood.
+"""
+
+from collections import defaultdict
+from datetime import date
+
+from sqlmodel import Session, select
+
+from api.models import Neighborhood, PriceSketch
+from api.services.generation import GenerationalIndex
+from api.services.quantile_sketch import TDigest
+from api.services.trends import get_trend_series, months_back, seasonal_outlook
+
+OVERVIEW_TREND_MONTHS = 24
+
+
+def _price_summary(digests: dict[float, TDigest]) -> dict:
+    by_rooms = [
+        {
+            "rooms": bucket,
+            "count": digest.count,
+            "p25": round(digest.quantile(0.25)),
+            "median": round(digest.quantile(0.5)),
+            "p75": round(digest.quantile(0.75)),
+        }
+        for bucket, digest in sorted(digests.items())
+    ]
+    overall = TDigest.merged(digests.values())
+    return {
+        "active_listings": overall.count,
+        "median_rent": round(overall.quantile(0.5)) if overall.count else None,
+        "by_rooms": by_rooms,
+    }
+
+
+def build_neighborhood_summaries(session: Session) -> list[dict]:
+    """Every neighborhood with quantiles of its active listing prices."""
+    digests: dict[str, dict[float, TDigest]] = defaultdict(dict)
+    for sketch in session.exec(select(PriceSketch)).all():
+        digests[sketch.neighborhood_id][sketch.rooms_bucket] = TDigest.from_bytes(sketch.digest)
+    neighborhoods = session.exec(select(Neighborhood).order_by(Neighborhood.name_en)).all()
+    return [
+        {**n.model_dump(), "price_summary": _price_summary(digests.get(n.id, {}))}
+        for n in neighborhoods
+    ]
+
+
+neighborhood_summaries = GenerationalIndex("neighborhood-summaries", build_neighborhood_summaries)
+
+
+def get_overview(session: Session, today: date | None = None) -> dict:
+    today = today or date.today()
+    generation, neighborhoods = neighborhood_summaries.get_with_generation(session)
+    return {
+        "generation": generation,
+        "neighborhoods": neighborhoods,
+        "trends": get_trend_series(
+            session, "month", months_back(today, OVERVIEW_TREND_MONTHS - 1), None, None
+        ),
+        "seasonal": seasonal_outlook(today),
+    }
@@ -0,0 +1,197 @@
+"""Per-neighborhood price sketches.
+
+Keeps a t-digest of active listing prices per (neighborhood, rooms bucket)
+in ``price_sketch`` so scoring reads a handful of small blobs instead of
+every comparable row. Scrapers update the touched buckets incrementally;
+``python -m api.services.price_sketches`` rebuilds everything from scratch.
+"""
+
+import math
+from collections import defaultdict
+from collections.abc import Iterable
+from datetime import datetime
+
+from sqlmodel import Session, col, select
+
+from api.config import settings
+from api.models import Neighborhood, PriceSketch, RentalListing
+from api.services.dedup import first_per_group, listing_group
+from api.services.quantile_sketch import TDigest
+
+BUCKET_WIDTH = 0.5
+
+
+def rooms_bucket(rooms: float) -> float:
+    """Snap a room count to the nearest half room (ties round up)."""
+    return math.floor(rooms / BUCKET_WIDTH + 0.5) * BUCKET_WIDTH
+
+
+def _save(session: Session, neighborhood_id: str, bucket: float, digest: TDigest):
+    sketch = session.get(PriceSketch, (neighborhood_id, bucket))
+    if not digest.count:
+        if sketch:
+            session.delete(sketch)
+        return
+    if sketch is None:
+        sketch = PriceSketch(
+            neighborhood_id=neighborhood_id, rooms_bucket=bucket, count=0, digest=b""
+        )
+    sketch.count = len(digest)
+    sketch.digest = digest.to_bytes()
+    sketch.updated_at = datetime.utcnow()
+    session.add(sketch)
+
+
+def _active_prices(session: Session, neighborhood_id: str, bucket: float) -> list[int]:
+    half = BUCKET_WIDTH / 2
+    rows = session.exec(
+        select(RentalListing.price, listing_group())
+        .where(
+            RentalListing.neighborhood_id == neighborhood_id,
+            RentalListing.is_active == True,  # noqa: E712
+            RentalListing.rooms >= bucket - half,
+            RentalListing.rooms < bucket + half,
+        )
+        .order_by(RentalListing.first_seen, RentalListing.id)
+    )
+    return [price for (price,) in first_per_group(rows)]
+
+
+def rebuild_sketches(session: Session, neighborhood_ids: Iterable[str] | None = None) -> int:
+    """Recompute sketches from active listings, one per apartment. Does not commit."""
+    query = (
+        select(
+            RentalListing.neighborhood_id,
+            RentalListing.rooms,
+            RentalListing.price,
+            listing_group(),
+        )
+        .where(
+            RentalListing.is_active == True,  # noqa: E712
+            RentalListing.neighborhood_id != None,  # noqa: E711
+        )
+        .order_by(RentalListing.first_seen, RentalListing.id)
+    )
+    existing = select(PriceSketch)
+    if neighborhood_ids is not None:
+        ids = list(neighborhood_ids)
+        query = query.where(col(RentalListing.neighborhood_id).in_(ids))
+        existing = existing.where(col(PriceSketch.neighborhood_id).in_(ids))
+
+    digests: dict[tuple[str, float], TDigest] = defaultdict(TDigest)
+    for neighborhood_id, rooms, price in first_per_group(session.exec(query)):
+        digests[(neighborhood_id, rooms_bucket(rooms))].add(price)
+
+    for sketch in session.exec(existing).all():
+        if (sketch.neighborhood_id, sketch.rooms_bucket) not in digests:
+            session.delete(sketch)
+    for (neighborhood_id, bucket), digest in digests.items():
+        _save(session, neighborhood_id, bucket, digest)
+    return len(digests)
+
+
+def update_sketches(
+    session: Session,
+    added: Iterable[tuple[str, float, int]],
+    dirty: Iterable[tuple[str, float]],
+):
+    """Apply one ingestion batch to the stored sketches. Does not commit.
+
+    ``added`` holds (neighborhood_id, rooms, price) for newly seen listings and
+    is merged into the existing digests. t-digests can't forget values, so
+    buckets in ``dirty`` (repriced or deactivated listings) are rebuilt from
+    their active rows instead.
+    """
+    dirty = {(neighborhood_id, rooms_bucket(rooms)) for neighborhood_id, rooms in dirty}
+    for neighborhood_id, bucket in dirty:
+        digest = TDigest()
+        digest.extend(_active_prices(session, neighborhood_id, bucket))
+        _save(session, neighborhood_id, bucket, digest)
+
+    additions: dict[tuple[str, float], list[int]] = defaultdict(list)
+    for neighborhood_id, rooms, price in added:
+        key = (neighborhood_id, rooms_bucket(rooms))
+        if neighborhood_id and key not in dirty:
+            additions[key].append(price)
+    for (neighborhood_id, bucket), prices in additions.items():
+        sketch = session.get(PriceSketch, (neighborhood_id, bucket))
+        digest = TDigest.from_bytes(sketch.digest) if sketch else TDigest()
+        digest.extend(prices)
+        _save(session, neighborhood_id, bucket, digest)
+
+
+def nearby_neighborhoods(session: Session, neighborhood_id: str) -> list[str]:
+    """Closest neighborhoods by centroid, within the configured radius."""
+    origin = session.get(Neighborhood, neighborhood_id)
+    if origin is None:
+        return []
+    others = session.exec(select(Neighborhood).where(Neighborhood.id != neighborhood_id)).all()
+    scale = math.cos(math.radians(origin.lat))
+    by_distance = sorted(
+        (111.32 * math.hypot(n.lat - origin.lat, (n.lng - origin.lng) * scale), n.id)
+        for n in others
+    )
+    return [
+        hood_id
+        for distance, hood_id in by_distance[: settings.nearby_neighborhood_count]
+        if distance <= settings.nearby_neighborhood_radius_km
+    ]
+
+
+def _merge(sketches: dict, neighborhood_ids: Iterable[str], buckets: Iterable[float]) -> TDigest:
+    return TDigest.merged(
+        sketches[(hood, bucket)]
+        for hood in neighborhood_ids
+        for bucket in buckets
+        if (hood, bucket) in sketches
+    )
+
+
+def _load(session: Session, neighborhood_ids: list[str], buckets: list[float]) -> dict:
+    rows = session.exec(
+        select(PriceSketch).where(
+            col(PriceSketch.neighborhood_id).in_(neighborhood_ids),
+            col(PriceSketch.rooms_bucket).in_(buckets),
+        )
+    ).all()
+    return {(row.neighborhood_id, row.rooms_bucket): TDigest.from_bytes(row.digest) for row in rows}
+
+
+def comparable_sketch(session: Session, neighborhood_id: str, rooms: float) -> TDigest | None:
+    """Merged price sketch for comparables of ``rooms`` in ``neighborhood_id``.
+
+    Starts from the neighborhood's buckets within half a room, widens to a
+    full room, then pulls in nearby neighborhoods. Returns the first merge
+    with at least ``min_comparables`` listings, or None if even the widest
+    merge is too sparse.
+    """
+    bucket = rooms_bucket(rooms)
+    near = [bucket - BUCKET_WIDTH, bucket, bucket + BUCKET_WIDTH]
+    wide = [bucket - 2 * BUCKET_WIDTH, *near, bucket + 2 * BUCKET_WIDTH]
+
+    sketches = _load(session, [neighborhood_id], wide)
+    for buckets in (near, wide):
+        digest = _merge(sketches, [neighborhood_id], buckets)
+        if digest.count >= settings.min_comparables:
+            return digest
+
+    nearby = nearby_neighborhoods(session, neighborhood_id)
+    if nearby:
+        sketches.update(_load(session, nearby, near))
+        digest = _merge(sketches, [neighborhood_id, *nearby], near)
+        if digest.count >= settings.min_comparables:
+            return digest
+    return None
+
+
+if __name__ == "__main__":
+    from api.cities import enabled_cities
+    from api.database import create_db_and_tables, get_engine, publish_read_snapshot
+
+    for city in enabled_cities():
+        create_db_and_tables(city.id)
+        with Session(get_engine(city.id)) as session:
+            n = rebuild_sketches(session)
+            session.commit()
+            print(f"{city.name_en}: rebuilt {n} price sketches")
+        publish_read_snapshot(city.id)
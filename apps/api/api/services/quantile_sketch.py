@@ -0,0 +1,215 @@
+"""Mergeable t-digest quantile sketch.
+
+A merging t-digest (Dunning & Ertl) with the k1 scale function: centroids
+near the tails stay small, so extreme percentiles remain accurate while the
+whole sketch stays bounded at roughly ``compression`` centroids regardless of
+how many values it has seen. Digests merge losslessly enough to combine
+adjacent buckets at query time and serialize to a compact blob.
+"""
+
+import math
+import struct
+
+_HEADER = struct.Struct("<dqdddI")
+_CENTROID = struct.Struct("<dd")
+
+
+class TDigest:
+    def __init__(self, compression: float = 100.0):
+        self.compression = compression
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self._centroids: list[tuple[float, float]] = []
+        self._buffer: list[tuple[float, float]] = []
+
+    def __len__(self) -> int:
+        return int(self.count)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def add(self, value: float, weight: int = 1):
+        self._buffer.append((value, weight))
+        self.count += weight
+        self.total += value * weight
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if len(self._buffer) >= self.compression * 5:
+            self._compress()
+
+    def extend(self, values):
+        for value in values:
+            self.add(value)
+
+    def merge(self, other: "TDigest") -> "TDigest":
+        """Fold ``other`` into this digest in place and return self."""
+        other._compress()
+        self._buffer.extend(other._centroids)
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    @classmethod
+    def merged(cls, digests) -> "TDigest":
+        result = cls()
+        for digest in digests:
+            result.merge(digest)
+        return result
+
+    def centroids(self) -> list[tuple[float, float]]:
+        self._compress()
+        return list(self._centroids)
+
+    def _k(self, q: float) -> float:
+        return self.compression / (2 * math.pi) * math.asin(2 * q - 1)
+
+    def _k_inv(self, k: float) -> float:
+        return (math.sin(k * 2 * math.pi / self.compression) + 1) / 2
+
+    def _compress(self):
+        if not self._buffer:
+            return
+        points = sorted(self._centroids + self._buffer)
+        self._buffer = []
+        total = sum(w for _, w in points)
+
+        merged = []
+        mean, weight = points[0]
+        weight_so_far = 0.0
+        q_limit = self._k_inv(self._k(0.0) + 1)
+        for next_mean, next_weight in points[1:]:
+            if (weight_so_far + weight + next_weight) / total <= q_limit:
+                mean += (next_mean - mean) * next_weight / (weight + next_weight)
+                weight += next_weight
+            else:
+                merged.append((mean, weight))
+                weight_so_far += weight
+                q_limit = self._k_inv(self._k(weight_so_far / total) + 1)
+                mean, weight = next_mean, next_weight
+        merged.append((mean, weight))
+        self._centroids = merged
+
+    def quantile(self, q: float) -> float:
+        """Estimate the value at quantile ``q`` in [0, 1]."""
+        if not self.count:
+            raise ValueError("quantile of an empty digest")
+        self._compress()
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+
+        target = q * self.count
+        centroids = self._centroids
+        cumulative = 0.0
+        prev_mean, prev_center = self.min, 0.0
+        for mean, weight in centroids:
+            center = cumulative + weight / 2
+            if target < center:
+                if center == prev_center:
+                    return mean
+                frac = (target - prev_center) / (center - prev_center)
+                return prev_mean + frac * (mean - prev_mean)
+            cumulative += weight
+            prev_mean, prev_center = mean, center
+        if self.count == prev_center:
+            return self.max
+        frac = (target - prev_center) / (self.count - prev_center)
+        return prev_mean + frac * (self.max - prev_mean)
+
+    def cdf(self, value: float) -> float:
+        """Estimate the mid-rank fraction of values below ``value``.
+
+        Values equal to a centroid count half, matching
+        ``(below + 0.5 * equal) / n`` exactly while centroids are singletons.
+        """
+        if not self.count:
+            raise ValueError("cdf of an empty digest")
+        self._compress()
+        if value < self.min:
+            return 0.0
+        if value > self.max:
+            return 1.0
+
+        centroids = self._centroids
+        equal = sum(w for m, w in centroids if m == value)
+        if equal:
+            below = sum(w for m, w in centroids if m < value)
+            return (below + equal / 2) / self.count
+
+        cumulative = 0.0
+        prev_mean, prev_center = self.min, 0.0
+        for mean, weight in centroids:
+            center = cumulative + weight / 2
+            if value < mean:
+                frac = (value - prev_mean) / (mean - prev_mean)
+                return (prev_center + frac * (center - prev_center)) / self.count
+            cumulative += weight
+            prev_mean, prev_center = mean, center
+        frac = (value - prev_mean) / (self.max - prev_mean)
+        return (prev_center + frac * (self.count - prev_center)) / self.count
+
+    def cdf_many(self, values: list[float]) -> list[float]:
+        """:meth:`cdf` of every value, in one pass over the centroids.
+
+        Values are visited in sorted order, so a grid of m values costs
+        O(m log m + centroids) instead of m full scans.
+        """
+        if not self.count:
+            raise ValueError("cdf of an empty digest")
+        self._compress()
+        centroids = self._centroids
+        results = [0.0] * len(values)
+        i, cumulative = 0, 0.0  # centroids below the current value and their weight
+        prev_mean, prev_center = self.min, 0.0
+        for index in sorted(range(len(values)), key=values.__getitem__):
+            value = values[index]
+            if value < self.min:
+                continue
+            if value > self.max:
+                results[index] = 1.0
+                continue
+            while i < len(centroids) and centroids[i][0] < value:
+                mean, weight = centroids[i]
+                prev_mean, prev_center = mean, cumulative + weight / 2
+                cumulative += weight
+                i += 1
+
+            equal, j = 0.0, i
+            while j < len(centroids) and centroids[j][0] == value:
+                equal += centroids[j][1]
+                j += 1
+            if equal:
+                results[index] = (cumulative + equal / 2) / self.count
+            elif i < len(centroids):
+                mean, weight = centroids[i]
+                center = cumulative + weight / 2
+                frac = (value - prev_mean) / (mean - prev_mean)
+                results[index] = (prev_center + frac * (center - prev_center)) / self.count
+            else:
+                frac = (value - prev_mean) / (self.max - prev_mean)
+                results[index] = (prev_center + frac * (self.count - prev_center)) / self.count
+        return results
+
+    def to_bytes(self) -> bytes:
+        self._compress()
+        header = _HEADER.pack(
+            self.compression, int(self.count), self.total, self.min, self.max, len(self._centroids)
+        )
+        return header + b"".join(_CENTROID.pack(m, w) for m, w in self._centroids)
+
+    @classmethod
+    def from_bytes(cls, blob: bytes) -> "TDigest":
+        compression, count, total, lo, hi, n = _HEADER.unpack_from(blob)
+        digest = cls(compression)
+        digest.count, digest.total, digest.min, digest.max = count, total, lo, hi
+        digest._centroids = [
+            _CENTROID.unpack_from(blob, _HEADER.size + i * _CENTROID.size) for i in range(n)
+        ]
+        return digest
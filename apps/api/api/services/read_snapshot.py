@@ -0,0 +1,199 @@
+"""Blue/green read snapshots of a city's database.
+
+Scrapers write to the city's live database; the API reads a snapshot of it.
+:func:`publish` copies the live database with the SQLite backup API into a
+new file, reindexes, analyzes and vacuums the copy, writes the memory-mapped
+listing columns beside it (:mod:`api.services.listing_columns`), then points
+the city's ``CURRENT`` file at both with an atomic rename. API workers notice the new
+pointer within ``generation_poll_seconds`` and open new connections on the
+new file, while requests already running finish on the old one, which is
+kept until ``read_snapshot_keep`` newer snapshots exist. Snapshots are opened
+read-only and immutable, so readers never take a lock, never wait on a
+scrape and every request sees one consistent generation.
+
+Until a city's first publish the API reads its live database.
+
+Usage:
+    python -m api.services.read_snapshot [--city CITY]
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from sqlmodel import Session
+
+from api.config import settings
+from api.services.comparables import export_listing_columns
+from api.services.generation import note_generation
+from api.services.listing_columns import ListingColumns, attach
+
+POINTER = "CURRENT"
+_SNAPSHOT_FILE = re.compile(r"^g(\d+)\.(?:db|listings)$")
+
+
+def snapshot_dir(city_id: str) -> Path:
+    return Path(settings.read_snapshot_dir) / city_id
+
+
+def read_pointer(directory: Path) -> dict | None:
+    try:
+        return json.loads((directory / POINTER).read_text())
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _write_atomically(path: Path, data: bytes):
+    tmp = path.with_name(f".{path.name}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _latest_generation(conn: sqlite3.Connection) -> int:
+    return conn.execute("SELECT coalesce(max(id), 0) FROM data_generation").fetchone()[0]
+
+
+def publish(engine: Engine, directory: Path, keep: int | None = None) -> dict:
+    """Snapshot ``engine``'s database into ``directory`` and make it current.
+
+    Returns the pointer written, plus whether a new snapshot was built (the
+    current one is reused when no generation was committed since) and how
+    many old snapshots were pruned.
+    """
+    keep = keep or settings.read_snapshot_keep
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    source = sqlite3.connect(f"{Path(engine.url.database).resolve().as_uri()}?mode=ro", uri=True)
+    try:
+        current = read_pointer(directory)
+        if (
+            current
+            and current["generation"] == _latest_generation(source)
+            and (directory / current["file"]).exists()
+        ):
+            return {**current, "built": False, "pruned": 0}
+
+        tmp = directory / f".publishing-{os.getpid()}.db.tmp"
+        tmp.unlink(missing_ok=True)
+        copy = sqlite3.connect(tmp)
+        try:
+            # Consistent even while a scraper writes: the backup restarts on change
+            source.backup(copy)
+            generation = _latest_generation(copy)
+            copy.execute("PRAGMA journal_mode=DELETE")
+            copy.execute("REINDEX")
+            copy.execute("ANALYZE")
+            copy.commit()
+            copy.execute("VACUUM")
+        finally:
+            copy.close()
+    finally:
+        source.close()
+
+    tmp_columns = tmp.with_suffix(".listings.tmp")
+    copy_engine = create_engine(f"sqlite:///{tmp}")
+    try:
+        with Session(copy_engine) as session:
+            export_listing_columns(session, tmp_columns)
+    finally:
+        copy_engine.dispose()
+
+    filename, columns = f"g{generation}.db", f"g{generation}.listings"
+    os.replace(tmp_columns, directory / columns)
+    os.replace(tmp, directory / filename)
+    pointer = {
+        "generation": generation,
+        "file": filename,
+        "columns": columns,
+        "published_at": datetime.utcnow().isoformat(timespec="seconds"),
+    }
+    _write_atomically(directory / POINTER, json.dumps(pointer).encode())
+
+    # The newest ``keep`` generations, always including the current one, stay
+    files = [
+        (int(m.group(1)), path)
+        for path in directory.iterdir()
+        if (m := _SNAPSHOT_FILE.match(path.name))
+    ]
+    kept = set(sorted({g for g, _ in files})[-keep:]) | {generation}
+    pruned = 0
+    for file_generation, path in files:
+        if file_generation not in kept:
+            path.unlink()
+            pruned += 1
+    return {**pointer, "built": True, "pruned": pruned}
+
+
+class SnapshotReader:
+    """A read-only engine over a city's current snapshot.
+
+    The engine stays the same across swaps, so per-engine caches see a new
+    generation and rebuild in the background as after any scrape; only its
+    connections move to the new file.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.pointer: dict | None = None
+        self.columns: ListingColumns | None = None
+        self._checked_at: float | None = None
+        self._lock = threading.Lock()
+        self.engine = create_engine("sqlite://", creator=self._connect)
+
+    def _connect(self):
+        uri = (self.directory / self.pointer["file"]).resolve().as_uri()
+        return sqlite3.connect(f"{uri}?mode=ro&immutable=1", uri=True, check_same_thread=False)
+
+    def refresh(self) -> bool:
+        """Follow a newly published pointer; returns whether a snapshot is published."""
+        now = time.monotonic()
+        with self._lock:
+            if (
+                self._checked_at is not None
+                and now - self._checked_at < settings.generation_poll_seconds
+            ):
+                return self.pointer is not None
+            self._checked_at = now
+        pointer = read_pointer(self.directory)
+        with self._lock:
+            if pointer is not None and pointer != self.pointer:
+                swapped = self.pointer is not None
+                self.pointer = pointer
+                if pointer.get("columns"):
+                    self.columns = ListingColumns(self.directory / pointer["columns"])
+                    attach(self.engine, self.columns)
+                if swapped:
+                    # Pooled connections still point at the old file; checked-out
+                    # ones finish their request there
+                    self.engine.dispose(close=False)
+                note_generation(self.engine, pointer["generation"])
+        return self.pointer is not None
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from api.cities import lookup_city
+    from api.database import create_db_and_tables, publish_read_snapshot
+
+    parser = argparse.ArgumentParser(description="Publish a read snapshot of a city's database")
+    parser.add_argument("--city", help="city id (default: the default city)")
+    args = parser.parse_args()
+
+    city = lookup_city(args.city)
+    create_db_and_tables(city.id)
+    result = publish_read_snapshot(city.id)
+    print(
+        f"{city.name_en}: generation {result['generation']} is current ({result['file']},"
+        f" {'built' if result['built'] else 'unchanged'}, {result['pruned']} pruned)"
+    )
@@ -1,14 +1,80 @@
 """Rent scoring engine.
 
-Compares a user's rent to the market distribution in their neighborhood
-using active Yad2 listings as comparables.
+Compares a user's rent to the market distribution of its nearest active
+Yad2 listings, falling back to neighborhood price sketches and then CBS.
 """
 
-import statistics
+from dataclasses import dataclass
 
-from sqlmodel import Session, select
+from sqlmodel import Session
 
-from api.models import CBSRentStat, RentalListing
+from api.cities import City, lookup_city
+from api.config import settings
+from api.services.cbs_reference import get_cbs_reference
+from api.services.comparables import Comparable, ComparableQuery, find_comparables
+from api.services.price_sketches import comparable_sketch
+from api.services.quantile_sketch import TDigest
+
+
+def score_label(percentile: int) -> str:
+    if percentile < 40:
+        return "below_market"
+    if percentile <= 60:
+        return "at_market"
+    return "above_market"
+
+
+@dataclass(frozen=True)
+class Market:
+    """What a rent is scored against.
+
+    ``basis`` is ``comparables`` or ``sketch`` when ``sketch`` holds the
+    prices, else ``cbs`` or ``fallback`` with only an average rent.
+    """
+
+    basis: str
+    avg: int
+    sketch: TDigest | None = None
+
+    @property
+    def count(self) -> int:
+        return self.sketch.count if self.sketch is not None else 0
+
+    def percentiles(self, rents: list[int]) -> list[int]:
+        if self.sketch is not None:
+            return [int(fraction * 100) for fraction in self.sketch.cdf_many(rents)]
+        if self.basis == "cbs":
+            # Rough percentile estimate from CBS average
+            return [min(99, max(1, int(rent / self.avg * 50))) for rent in rents]
+        return [50] * len(rents)
+
+
+def find_market(
+    session: Session,
+    neighborhood_id: str,
+    rooms: float,
+    comparables: list[Comparable],
+    city: City | None = None,
+) -> Market:
+    """The market for a rent check given its :func:`find_comparables` result."""
+    if len(comparables) >= settings.min_comparables:
+        # Nearest listings by location, rooms, size and floor
+        sketch = TDigest()
+        sketch.extend(c.price for c in comparables)
+        return Market("comparables", int(sketch.mean), sketch)
+
+    # Too few near neighbors: same neighborhood and similar room count,
+    # widened to adjacent room counts and nearby neighborhoods when sparse
+    sketch = comparable_sketch(session, neighborhood_id, rooms)
+    if sketch is not None:
+        return Market("sketch", int(sketch.mean), sketch)
+
+    # Fallback to CBS city-level data, interpolated for unpublished room counts
+    city = city or lookup_city()
+    cbs_avg = get_cbs_reference(session).avg_rent(city.name_he, rooms)
+    if cbs_avg:
+        return Market("cbs", cbs_avg)
+    return Market("fallback", city.fallback_rent)
 
 
 def score_rent(
@@ -17,62 +83,32 @@ def score_rent(
     sqm: float,
     monthly_rent: int,
     session: Session,
+    amenities: int = 0,
+    floor: int | None = None,
+    comparables: list[Comparable] | None = None,
+    city: City | None = None,
 ) -> dict:
     """Score a user's rent against the market.
 
-    Returns dict with: score, percentile, market_avg, delta_pct
+    ``amenities`` is an :class:`~api.services.amenities.Amenity` mask that
+    comparables must all have; it is ignored when too few listings match.
+    Pass ``comparables`` from :func:`find_comparables` to reuse a lookup.
+    ``city`` picks the CBS fallback figures and defaults to the default city.
+
+    Returns dict with: score, percentile, market_avg, delta_pct, basis
     """
-    # Find comparable listings: same neighborhood, similar room count
-    comps = session.exec(
-        select(RentalListing).where(
-            RentalListing.neighborhood_id == neighborhood_id,
-            RentalListing.is_active == True,  # noqa: E712
-            RentalListing.rooms >= rooms - 0.5,
-            RentalListing.rooms <= rooms + 0.5,
+    if comparables is None:
+        comparables = find_comparables(
+            session, ComparableQuery(neighborhood_id, rooms, sqm, floor, amenities)
         )
-    ).all()
-
-    if len(comps) >= 5:
-        prices = sorted([c.price for c in comps])
-        market_avg = int(statistics.mean(prices))
-
-        # Calculate percentile
-        below_count = sum(1 for p in prices if p < monthly_rent)
-        equal_count = sum(1 for p in prices if p == monthly_rent)
-        percentile = int(((below_count + 0.5 * equal_count) / len(prices)) * 100)
-    else:
-        # Fallback to CBS city-level data
-        cbs_stat = session.exec(
-            select(CBSRentStat)
-            .where(
-                CBSRentStat.city == "\u05ea\u05dc \u05d0\u05d1\u05d9\u05d1-\u05d9\u05e4\u05d5",
-                CBSRentStat.rooms == round(rooms * 2) / 2,  # Round to nearest 0.5
-                CBSRentStat.tenant_type == "all",
-            )
-            .order_by(CBSRentStat.fetched_at.desc())
-        ).first()
-
-        if cbs_stat:
-            market_avg = cbs_stat.avg_rent
-            # Rough percentile estimate from CBS average
-            ratio = monthly_rent / market_avg
-            percentile = min(99, max(1, int(ratio * 50)))
-        else:
-            market_avg = 8000  # Hardcoded TLV fallback
-            percentile = 50
-
-    delta_pct = round(((monthly_rent - market_avg) / market_avg) * 100, 1)
-
-    if percentile < 40:
-        score = "below_market"
-    elif percentile <= 60:
-        score = "at_market"
-    else:
-        score = "above_market"
+    market = find_market(session, neighborhood_id, rooms, comparables, city)
+    (percentile,) = market.percentiles([monthly_rent])
+    delta_pct = round(((monthly_rent - market.avg) / market.avg) * 100, 1)
 
     return {
-        "score": score,
+        "score": score_label(percentile),
         "percentile": percentile,
-        "market_avg": market_avg,
+        "market_avg": market.avg,
         "delta_pct": delta_pct,
+        "basis": market.basis,
     }
@@ -0,0 +1,110 @@
+"""Listing retention.
+
+Scrapers only mark vanished listings inactive, so ``rental_listing`` would
+keep every listing ever seen. This job moves listings inactive for longer
+than ``archive_after_days`` into ``rental_listing_archive``, keeping just
+the final price and days on market, so the hot table tracks the live market.
+
+Usage:
+    python -m api.services.retention [--days N]
+"""
+
+import argparse
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete
+from sqlmodel import Session, col, select
+
+from api.config import settings
+from api.models import ListingSignatureBand, RentalListing, RentalListingArchive
+from api.services.generation import bump_generation
+
+logger = logging.getLogger("dira-fair.retention")
+
+BATCH_SIZE = 500
+
+
+def _summary(listing: RentalListing, now: datetime) -> RentalListingArchive:
+    # From first to last sighting; the stored value stops updating once inactive
+    days_on_market = listing.days_on_market
+    if listing.first_seen and listing.last_seen:
+        days_on_market = (listing.last_seen - listing.first_seen).days
+    return RentalListingArchive(
+        id=listing.id,
+        canonical_id=listing.canonical_id,
+        source=listing.source,
+        neighborhood_id=listing.neighborhood_id,
+        rooms=listing.rooms,
+        sqm=listing.sqm,
+        final_price=listing.price,
+        first_seen=listing.first_seen,
+        last_seen=listing.last_seen,
+        days_on_market=days_on_market,
+        archived_at=now,
+    )
+
+
+def archive_inactive_listings(
+    session: Session, older_than_days: int | None = None, now: datetime | None = None
+) -> int:
+    """Archive listings inactive since before the cutoff. Commits per batch.
+
+    Records a data generation when anything moved, so the next publish
+    ships a snapshot without the archived rows and generation-keyed caches
+    rebuild. Returns the number of listings archived.
+    """
+    now = now or datetime.utcnow()
+    days = settings.archive_after_days if older_than_days is None else older_than_days
+    cutoff = now - timedelta(days=days)
+
+    archived = 0
+    neighborhoods = set()
+    while True:
+        listings = session.exec(
+            select(RentalListing)
+            .where(
+                RentalListing.is_active == False,  # noqa: E712
+                RentalListing.last_seen < cutoff,
+            )
+            .limit(BATCH_SIZE)
+        ).all()
+        if not listings:
+            break
+        ids = [listing.id for listing in listings]
+        for listing in listings:
+            session.merge(_summary(listing, now))
+            neighborhoods.add(listing.neighborhood_id)
+        session.flush()
+        session.exec(
+            delete(ListingSignatureBand).where(col(ListingSignatureBand.listing_id).in_(ids))
+        )
+        session.exec(delete(RentalListing).where(col(RentalListing.id).in_(ids)))
+        session.commit()
+        archived += len(ids)
+
+    if archived:
+        bump_generation(
+            session,
+            "retention",
+            {"archived": archived, "neighborhoods": sorted(n for n in neighborhoods if n)},
+        )
+        session.commit()
+    logger.info("Archived %d listings inactive for over %d days", archived, days)
+    return archived
+
+
+if __name__ == "__main__":
+    from api.cities import enabled_cities
+    from api.database import create_db_and_tables, get_engine, publish_read_snapshot
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--days", type=int, default=None, help="inactive age to archive after")
+    args = parser.parse_args()
+
+    for city in enabled_cities():
+        create_db_and_tables(city.id)
+        with Session(get_engine(city.id)) as session:
+            n = archive_inactive_listings(session, args.days)
+            print(f"{city.name_en}: archived {n} listings")
+        publish_read_snapshot(city.id)
@@ -0,0 +1,188 @@
+"""Slow-query log.
+
+Every statement on the app engine is timed through SQLAlchemy cursor
+events. Statements slower than ``slow_query_ms`` are logged and aggregated
+by shape: SQL with literals and ``IN``/``VALUES`` lists collapsed, so the
+same query with different arguments counts once. The first slow run of a
+shape, and the first one after ``PLAN_REFRESH_SECONDS``, also records the
+statement's ``EXPLAIN QUERY PLAN`` (SQLite only); when the plan differs
+from the one captured before, both are kept so the regression is visible
+in the report.
+
+Timing covers execution up to the first row; SQLite only reports row
+counts for writes, so ``rows`` is empty for selects.
+"""
+
+import logging
+import re
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from api.config import settings
+
+logger = logging.getLogger("dira-fair.slow-queries")
+
+PLAN_REFRESH_SECONDS = 3600.0
+MAX_PARAM_SHAPES = 5
+EXPLAINABLE = ("select", "insert", "update", "delete", "with")
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+_IN_LIST = re.compile(r"\bIN \(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_REPEATED_LISTS = re.compile(r"\(\?, \.\.\.\)(?:\s*,\s*\(\?, \.\.\.\))+")
+
+
+def normalize_sql(statement: str) -> str:
+    sql = _WHITESPACE.sub(" ", statement).strip()
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _IN_LIST.sub("IN (?, ...)", sql)
+    sql = _PLACEHOLDER_LIST.sub("(?, ...)", sql)
+    return _REPEATED_LISTS.sub("(?, ...), ...", sql)
+
+
+def _type_name(value) -> str:
+    return "null" if value is None else type(value).__name__
+
+
+def param_shape(parameters, executemany: bool = False) -> str:
+    """Types of the bound parameters, with runs of one type collapsed."""
+    if executemany:
+        rows = list(parameters)
+        return f"{len(rows)} x {param_shape(rows[0]) if rows else '()'}"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{k}: {_type_name(v)}" for k, v in parameters.items()) + "}"
+    runs: list[list] = []
+    for value in parameters or ():
+        name = _type_name(value)
+        if runs and runs[-1][0] == name:
+            runs[-1][1] += 1
+        else:
+            runs.append([name, 1])
+    return "(" + ", ".join(name if n == 1 else f"{name} x{n}" for name, n in runs) + ")"
+
+
+def explain(cursor, statement: str, parameters, executemany: bool) -> list[str] | None:
+    """``EXPLAIN QUERY PLAN`` rows for a statement, run on the same DBAPI connection."""
+    if not statement.lstrip().lower().startswith(EXPLAINABLE):
+        return None
+    if executemany:
+        parameters = parameters[0] if parameters else ()
+    plan_cursor = cursor.connection.cursor()
+    try:
+        plan_cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        return [row[-1] for row in plan_cursor.fetchall()]
+    finally:
+        plan_cursor.close()
+
+
+class SlowQueryLog:
+    def __init__(self, threshold_ms: float | None = None, max_shapes: int | None = None):
+        self.threshold = (settings.slow_query_ms if threshold_ms is None else threshold_ms) / 1000
+        self.max_shapes = max_shapes or settings.slow_query_max_shapes
+        self._shapes: dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def install(self, engine: Engine):
+        event.listen(engine, "before_cursor_execute", self._before)
+        event.listen(engine, "after_cursor_execute", self._after)
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        # On the per-execution context, so a statement that raises (and never
+        # reaches after_cursor_execute) leaves nothing behind on the connection
+        if context is not None:
+            context._slow_query_started = time.perf_counter()
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_slow_query_started", None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        if elapsed >= self.threshold:
+            self.record(conn, cursor, statement, parameters, executemany, elapsed)
+
+    def record(self, conn, cursor, statement, parameters, executemany, elapsed: float):
+        shape = normalize_sql(statement)
+        params = param_shape(parameters, executemany)
+        rows = cursor.rowcount if cursor.rowcount >= 0 else None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._shapes.get(shape)
+            if entry is None:
+                if len(self._shapes) >= self.max_shapes:
+                    # Forget the shape that has cost the least so far
+                    del self._shapes[min(self._shapes, key=lambda s: self._shapes[s]["total_ms"])]
+                entry = self._shapes[shape] = {
+                    "sql": shape,
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "rows": None,
+                    "param_shapes": [],
+                    "plan": None,
+                    "previous_plan": None,
+                    "last_seen": None,
+                    "_planned_at": None,
+                }
+            entry["count"] += 1
+            entry["total_ms"] += elapsed * 1000
+            entry["max_ms"] = max(entry["max_ms"], elapsed * 1000)
+            if rows is not None:
+                entry["rows"] = (entry["rows"] or 0) + rows
+            if (
+                params not in entry["param_shapes"]
+                and len(entry["param_shapes"]) < MAX_PARAM_SHAPES
+            ):
+                entry["param_shapes"].append(params)
+            entry["last_seen"] = datetime.utcnow().isoformat(timespec="seconds")
+            needs_plan = (
+                entry["_planned_at"] is None or now - entry["_planned_at"] > PLAN_REFRESH_SECONDS
+            )
+            if needs_plan:
+                entry["_planned_at"] = now
+
+        plan = None
+        if needs_plan and conn.dialect.name == "sqlite":
+            try:
+                plan = explain(cursor, statement, parameters, executemany)
+            except Exception:
+                logger.exception("EXPLAIN QUERY PLAN failed for %s", shape)
+            if plan is not None:
+                with self._lock:
+                    if entry["plan"] is not None and entry["plan"] != plan:
+                        entry["previous_plan"] = entry["plan"]
+                    entry["plan"] = plan
+
+        logger.warning(
+            "Slow query (%.1f ms, rows=%s, params=%s): %s%s",
+            elapsed * 1000,
+            rows,
+            params,
+            shape,
+            "".join(f"\n    {line}" for line in plan or ()),
+        )
+
+    def report(self, limit: int = 20, sort: str = "total_ms") -> list[dict]:
+        """Top ``limit`` query shapes by ``sort`` (total_ms, max_ms or count)."""
+        with self._lock:
+            entries = [
+                {
+                    **{k: v for k, v in entry.items() if not k.startswith("_")},
+                    "total_ms": round(entry["total_ms"], 2),
+                    "max_ms": round(entry["max_ms"], 2),
+                    "mean_ms": round(entry["total_ms"] / entry["count"], 2),
+                    "param_shapes": list(entry["param_shapes"]),
+                }
+                for entry in self._shapes.values()
+            ]
+        entries.sort(key=lambda entry: entry[sort], reverse=True)
+        return entries[:limit]
+
+
+slow_query_log = SlowQueryLog()
@@ -0,0 +1,242 @@
+"""Static JSON snapshot of the market data for the web frontend.
+
+Writes compact, content-hashed shards plus a ``manifest.json`` naming the
+current file for each one, so a CDN can cache shards forever and only the
+manifest needs a short TTL. Global shards (neighborhood summaries, trends,
+stats) are cheap and recomputed on every export; per-neighborhood shards
+(active listings, price histograms per rooms bucket, recent sales) are only regenerated
+for neighborhoods that the data generations since the last export touched.
+Files referenced by neither the new nor the previous manifest are pruned.
+
+Each city is exported on its own, into its own directory.
+
+Usage:
+    python -m api.services.snapshot apps/web/public/data          # incremental
+    python -m api.services.snapshot apps/web/public/data --full   # every shard
+    python -m api.services.snapshot apps/web/public/data/haifa --city haifa
+"""
+
+import hashlib
+import json
+import os
+import re
+from datetime import date, datetime
+from pathlib import Path
+
+from fastapi.encoders import jsonable_encoder
+from sqlmodel import Session, func, select
+
+from api.config import settings
+from api.models import CBSRentStat, DataGeneration, RentalListing, SaleTransaction
+from api.services.amenities import amenity_names
+from api.services.dedup import first_per_group, listing_group
+from api.services.distribution import build_price_distributions
+from api.services.overview import OVERVIEW_TREND_MONTHS, build_neighborhood_summaries
+from api.services.trends import get_trend_series, months_back, seasonal_outlook
+
+MANIFEST = "manifest.json"
+HASH_LENGTH = 12
+# Only files named like shards are ever pruned
+_SHARD_FILE = re.compile(rf"\.[0-9a-f]{{{HASH_LENGTH}}}\.json$")
+RECENT_TRANSACTIONS = 20
+# Generations from these sources never touch per-neighborhood shards
+GLOBAL_SOURCES = {"cbs", "cbs-index"}
+
+_LISTING_FIELDS = (
+    "id",
+    "source",
+    "address",
+    "lat",
+    "lng",
+    "rooms",
+    "sqm",
+    "floor",
+    "price",
+    "price_per_sqm",
+    "days_on_market",
+)
+
+
+def _encode(payload) -> bytes:
+    return json.dumps(
+        jsonable_encoder(payload), ensure_ascii=False, separators=(",", ":"), sort_keys=True
+    ).encode("utf-8")
+
+
+def _write_shard(out_dir: Path, name: str, payload) -> tuple[str, bool]:
+    """Write ``payload`` under a content-hashed name; returns (file, whether it was new)."""
+    data = _encode(payload)
+    digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+    filename = f"{name}.{digest}.json"
+    path = out_dir / filename
+    if path.exists():
+        return filename, False
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+    return filename, True
+
+
+def _read_manifest(out_dir: Path) -> dict | None:
+    try:
+        return json.loads((out_dir / MANIFEST).read_text())
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def changed_neighborhoods(session: Session, since_generation: int) -> set[str] | None:
+    """Neighborhoods touched by generations after ``since_generation``.
+
+    None means every neighborhood may have changed, e.g. after a source that
+    doesn't record which ones it touched.
+    """
+    changed = set()
+    rows = session.exec(select(DataGeneration).where(DataGeneration.id > since_generation)).all()
+    for row in rows:
+        if row.source in GLOBAL_SOURCES:
+            continue
+        neighborhoods = json.loads(row.details or "{}").get("neighborhoods")
+        if not isinstance(neighborhoods, list):
+            return None
+        changed.update(neighborhoods)
+    return changed
+
+
+def _neighborhood_shard(session: Session, summary: dict, distributions: list[dict]) -> dict:
+    rows = session.exec(
+        select(
+            *(getattr(RentalListing, name) for name in _LISTING_FIELDS),
+            RentalListing.amenities,
+            listing_group(),
+        )
+        .where(
+            RentalListing.neighborhood_id == summary["id"],
+            RentalListing.is_active == True,  # noqa: E712
+        )
+        .order_by(RentalListing.first_seen, RentalListing.id)
+    )
+    listings = [
+        {**dict(zip(_LISTING_FIELDS, values)), "amenities": amenity_names(amenities)}
+        for *values, amenities in first_per_group(rows)
+    ]
+    listings.sort(key=lambda listing: listing["id"])
+    transactions = session.exec(
+        select(SaleTransaction)
+        .where(SaleTransaction.neighborhood_id == summary["id"])
+        .order_by(SaleTransaction.deal_date.desc(), SaleTransaction.id)
+        .limit(RECENT_TRANSACTIONS)
+    ).all()
+    return {
+        "neighborhood": {k: v for k, v in summary.items() if k != "updated_at"},
+        "listings": listings,
+        # The fixed bins GET /api/neighborhoods/{slug}/distribution serves
+        "bin_width": settings.distribution_bin_width,
+        "distributions": distributions,
+        "recent_transactions": [
+            t.model_dump(exclude={"neighborhood_id", "fetched_at"}) for t in transactions
+        ],
+    }
+
+
+def export_snapshot(
+    session: Session, out_dir: Path, full: bool = False, today: date | None = None
+) -> dict:
+    """Export shards to ``out_dir`` and rewrite its manifest.
+
+    Returns a summary with the generation and the shards written.
+    """
+    today = today or date.today()
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    previous = _read_manifest(out_dir)
+    generation = session.exec(select(func.max(DataGeneration.id))).one() or 0
+
+    summaries = build_neighborhood_summaries(session)
+    shards: dict[str, str] = {}
+    written = []
+
+    def write(name: str, payload):
+        shards[name], new = _write_shard(out_dir, name, payload)
+        if new:
+            written.append(name)
+
+    write(
+        "neighborhoods",
+        [{k: v for k, v in summary.items() if k != "updated_at"} for summary in summaries],
+    )
+    write(
+        "trends",
+        {
+            "month": get_trend_series(
+                session, "month", months_back(today, OVERVIEW_TREND_MONTHS - 1)
+            ),
+            "quarter": get_trend_series(session, "quarter"),
+        },
+    )
+    cbs_stats = session.exec(
+        select(CBSRentStat).order_by(
+            CBSRentStat.period, CBSRentStat.city, CBSRentStat.rooms, CBSRentStat.tenant_type
+        )
+    ).all()
+    write(
+        "stats",
+        {
+            "seasonal": seasonal_outlook(today),
+            "cbs_rent": [s.model_dump(exclude={"id", "fetched_at"}) for s in cbs_stats],
+        },
+    )
+
+    dirty = None
+    if previous is not None and not full:
+        dirty = changed_neighborhoods(session, previous.get("generation", 0))
+    old_shards = previous["shards"] if previous else {}
+    distributions = build_price_distributions(session)
+    for summary in summaries:
+        name = f"neighborhoods/{summary['id']}"
+        if dirty is not None and summary["id"] not in dirty and name in old_shards:
+            shards[name] = old_shards[name]
+        else:
+            write(name, _neighborhood_shard(session, summary, distributions.get(summary["id"], [])))
+
+    manifest = {
+        "generation": generation,
+        "exported_at": datetime.utcnow().isoformat(timespec="seconds"),
+        "shards": shards,
+    }
+    tmp = out_dir / f"{MANIFEST}.tmp"
+    tmp.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    os.replace(tmp, out_dir / MANIFEST)
+
+    # Keep the previous manifest's files for clients that fetched it just before
+    keep = set(shards.values()) | set(old_shards.values())
+    pruned = 0
+    for path in out_dir.rglob("*.json"):
+        relative = path.relative_to(out_dir).as_posix()
+        if _SHARD_FILE.search(relative) and relative not in keep:
+            path.unlink()
+            pruned += 1
+
+    return {"generation": generation, "written": written, "pruned": pruned}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from api.cities import lookup_city
+    from api.database import create_db_and_tables, get_engine
+
+    parser = argparse.ArgumentParser(description="Export static JSON shards for the frontend")
+    parser.add_argument("out_dir", type=Path)
+    parser.add_argument("--full", action="store_true", help="regenerate every shard")
+    parser.add_argument("--city", help="city id (default: the default city)")
+    args = parser.parse_args()
+
+    city = lookup_city(args.city)
+    create_db_and_tables(city.id)
+    with Session(get_engine(city.id)) as session:
+        result = export_snapshot(session, args.out_dir, full=args.full)
+    print(
+        f"Exported generation {result['generation']}: {len(result['written'])} shards written,"
+        f" {result['pruned']} pruned"
+    )
@@ -0,0 +1,153 @@
+"""Rent index trend series.
+
+Raw ``rent_index`` points are rolled up into month, quarter and year
+averages in ``rent_index_rollup`` whenever the index is ingested, so a
+trend request reads one small range of pre-aggregated rows. Long ranges are
+then thinned with Largest-Triangle-Three-Buckets, which keeps the visual
+shape of the curve within a fixed point budget.
+"""
+
+from collections import defaultdict
+from datetime import date
+
+from sqlalchemy import delete
+from sqlmodel import Session, select
+
+from api.config import settings
+from api.models import RentIndex, RentIndexRollup
+from api.services.generation import current_generation
+from api.services.result_cache import ResultCache
+
+RESOLUTIONS = ("month", "quarter", "year")
+
+SEASONAL_DATA = {
+    "best_months": [11, 12, 1, 2],
+    "worst_months": [7, 8, 9],
+    "neutral_months": [3, 4, 5, 6, 10],
+}
+
+trends_cache = ResultCache(
+    maxsize=settings.trends_cache_size, ttl=settings.trends_cache_ttl_seconds
+)
+
+
+def period_start(day: date, resolution: str) -> date:
+    if resolution == "month":
+        return day.replace(day=1)
+    if resolution == "quarter":
+        return date(day.year, 3 * ((day.month - 1) // 3) + 1, 1)
+    if resolution == "year":
+        return date(day.year, 1, 1)
+    raise ValueError(f"Unknown resolution {resolution!r}")
+
+
+def months_back(day: date, months: int) -> date:
+    """First day of the month ``months`` calendar months before ``day``'s month."""
+    index = day.year * 12 + day.month - 1 - months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def rebuild_rollups(session: Session) -> int:
+    """Recompute every rollup from ``rent_index``. Does not commit."""
+    sums: dict[tuple[str, date], list[float]] = defaultdict(lambda: [0.0, 0.0, 0])
+    for entry in session.exec(select(RentIndex)):
+        for resolution in RESOLUTIONS:
+            bucket = sums[(resolution, period_start(entry.date, resolution))]
+            bucket[0] += entry.index_value
+            bucket[1] += entry.yoy_change
+            bucket[2] += 1
+
+    session.exec(delete(RentIndexRollup))
+    for (resolution, start), (index_total, yoy_total, points) in sums.items():
+        session.add(
+            RentIndexRollup(
+                resolution=resolution,
+                period_start=start,
+                index_value=round(index_total / points, 2),
+                yoy_change=round(yoy_total / points, 2),
+                points=points,
+            )
+        )
+    return len(sums)
+
+
+def lttb(points: list[tuple[float, float]], threshold: int) -> list[int]:
+    """Indices of ``points`` kept by Largest-Triangle-Three-Buckets.
+
+    Always keeps the first and last point; returns every index when there
+    are no more than ``threshold`` points.
+    """
+    n = len(points)
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+
+    kept = [0]
+    every = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        # Average of the next bucket is the third triangle vertex
+        next_start = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        span = points[next_start:next_end]
+        avg_x = sum(p[0] for p in span) / len(span)
+        avg_y = sum(p[1] for p in span) / len(span)
+
+        start, end = int(i * every) + 1, int((i + 1) * every) + 1
+        ax, ay = points[a]
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            x, y = points[j]
+            area = abs((ax - avg_x) * (y - ay) - (ax - x) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        kept.append(best)
+        a = best
+    kept.append(n - 1)
+    return kept
+
+
+def _series(
+    session: Session, resolution: str, start: date | None, end: date | None, max_points: int
+) -> list[dict]:
+    query = select(RentIndexRollup).where(RentIndexRollup.resolution == resolution)
+    if start is not None:
+        query = query.where(RentIndexRollup.period_start >= period_start(start, resolution))
+    if end is not None:
+        query = query.where(RentIndexRollup.period_start <= end)
+    rows = session.exec(query.order_by(RentIndexRollup.period_start)).all()
+
+    keep = lttb([(row.period_start.toordinal(), row.index_value) for row in rows], max_points)
+    return [
+        {
+            "date": rows[i].period_start.isoformat(),
+            "index": rows[i].index_value,
+            "yoy_change": rows[i].yoy_change,
+        }
+        for i in keep
+    ]
+
+
+def get_trend_series(
+    session: Session,
+    resolution: str = "month",
+    start: date | None = None,
+    end: date | None = None,
+    max_points: int | None = None,
+) -> list[dict]:
+    """Rolled-up index points in [start, end], cached per data generation."""
+    max_points = max_points or settings.trend_max_points
+    key = (session.get_bind(), resolution, start, end, max_points, current_generation(session))
+    return trends_cache.get_or_compute(
+        key, lambda: _series(session, resolution, start, end, max_points)
+    )
+
+
+def seasonal_outlook(today: date) -> dict:
+    """How good a time of year ``today`` is to negotiate rent."""
+    if today.month in SEASONAL_DATA["best_months"]:
+        current = "good_to_negotiate"
+    elif today.month in SEASONAL_DATA["worst_months"]:
+        current = "bad_to_negotiate"
+    else:
+        current = "neutral"
+    return {**SEASONAL_DATA, "current_month": today.month, "current": current}
@@ -0,0 +1,89 @@
+"""Cache warm-up after startup.
+
+The API takes requests as soon as every city's schema is checked; the
+caches behind the hot endpoints are then filled in the background from each
+city's read engine, i.e. its published snapshot: the comparables index
+(mapped straight from the snapshot's listing columns), the search index,
+the CBS reference table, the price distributions, comparison metrics and
+autocomplete index, and the cached responses of the neighborhood list and
+the overview. Until that finishes a request may build a cache itself, so
+``/api/ready`` answers 503 while ``/api/health`` already answers 200,
+letting a load balancer hold traffic off a cold worker without killing it.
+"""
+
+import logging
+import time
+
+from sqlmodel import Session
+from starlette.requests import Request
+
+from api.cities import City
+from api.config import settings
+from api.database import get_read_engine
+from api.routers.neighborhoods import list_neighborhoods
+from api.routers.overview import overview
+from api.services.autocomplete import autocomplete_index
+from api.services.cbs_reference import get_cbs_reference
+from api.services.comparables import get_comparables_index
+from api.services.comparison import comparison_stats
+from api.services.distribution import price_distributions
+from api.services.listing_index import get_listing_index
+
+logger = logging.getLogger("dira-fair.warmup")
+
+
+def _request(path: str, city: City) -> Request:
+    """A bare GET for ``path``, so cached responses land under a real request's key."""
+    query = b"" if city.id == settings.default_city else f"city={city.id}".encode()
+    return Request(
+        {"type": "http", "method": "GET", "path": path, "query_string": query, "headers": []}
+    )
+
+
+def warm_city(city: City):
+    with Session(get_read_engine(city.id)) as session:
+        get_comparables_index(session)
+        get_listing_index(session)
+        get_cbs_reference(session)
+        price_distributions.get(session)
+        comparison_stats.get(session)
+        autocomplete_index(city).get(session)
+        list_neighborhoods(_request("/api/neighborhoods", city), session)
+        overview(_request("/api/overview", city), session)
+
+
+class Warmup:
+    def __init__(self):
+        self.started = time.monotonic()
+        self.seconds: float | None = None
+        self.cities: dict[str, float] = {}
+        self.failed: list[str] = []
+
+    @property
+    def warm(self) -> bool:
+        return self.seconds is not None
+
+    def run(self, cities: list[City]):
+        """Warm every city in turn; a city that fails is left to warm on demand."""
+        for city in cities:
+            started = time.perf_counter()
+            try:
+                warm_city(city)
+            except Exception:
+                logger.exception("Warming %s failed", city.id)
+                self.failed.append(city.id)
+            self.cities[city.id] = round((time.perf_counter() - started) * 1000, 1)
+        self.seconds = time.monotonic() - self.started
+        logger.info("Warm after %.2fs: %s", self.seconds, self.cities)
+
+    def status(self) -> dict:
+        return {
+            "status": "warm" if self.warm else "starting",
+            "uptime_seconds": round(time.monotonic() - self.started, 2),
+            "warm_seconds": None if self.seconds is None else round(self.seconds, 3),
+            "cities_ms": dict(self.cities),
+            "failed": list(self.failed),
+        }
+
+
+warmup = Warmup()
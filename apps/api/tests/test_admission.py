@@ -0,0 +1,134 @@
+import asyncio
+
+import httpx
+import pytest
+
+from api.admission import (
+    CHEAP,
+    EXPENSIVE,
+    AdmissionController,
+    AdmissionMiddleware,
+    RejectedError,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def controller(**kwargs):
+    options = dict(
+        max_concurrency=2,
+        queue_budget_ms=1000,
+        client_rps=10,
+        client_burst=3,
+        expensive_share=0.5,
+    )
+    options.update(kwargs)
+    return AdmissionController(**options)
+
+
+def test_token_bucket_limits_each_client():
+    clock = FakeClock()
+    admission = controller(clock=clock)
+    for _ in range(3):
+        admission.check_client("a")
+    with pytest.raises(RejectedError) as rejected:
+        admission.check_client("a")
+    assert rejected.value.status_code == 429
+    assert rejected.value.retry_after == pytest.approx(0.1)
+
+    admission.check_client("b")  # other clients have their own bucket
+    clock.now = 0.1
+    admission.check_client("a")
+    assert admission.stats()["rate_limited"] == 1
+
+
+def test_cheap_waiters_go_first():
+    async def scenario():
+        admission = controller()
+        await admission.acquire(CHEAP)
+        await admission.acquire(CHEAP)
+        order = []
+
+        async def wait(priority, name):
+            await admission.acquire(priority)
+            order.append(name)
+
+        waiters = [
+            asyncio.create_task(wait(EXPENSIVE, "check")),
+            asyncio.create_task(wait(CHEAP, "read")),
+        ]
+        await asyncio.sleep(0)
+        assert admission.stats()["cheap"]["queue_depth"] == 1
+        assert admission.stats()["expensive"]["queue_depth"] == 1
+
+        admission.release(CHEAP, 0.01)
+        await asyncio.sleep(0.01)
+        assert order == ["read"]
+        admission.release(CHEAP, 0.01)
+        await asyncio.gather(*waiters)
+        assert order == ["read", "check"]
+
+    asyncio.run(scenario())
+
+
+def test_expensive_requests_keep_to_their_share():
+    async def scenario():
+        admission = controller(queue_budget_ms=50)
+        await admission.acquire(EXPENSIVE)
+        with pytest.raises(RejectedError) as rejected:
+            await admission.acquire(EXPENSIVE)
+        assert rejected.value.status_code == 503
+        await admission.acquire(CHEAP)  # the other slot stays free for reads
+        assert admission.stats()["expensive"]["shed"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_sheds_when_expected_wait_exceeds_budget():
+    async def scenario():
+        admission = controller(queue_budget_ms=100)
+        admission.classes[CHEAP].service_time = 1.0  # two slots, 0.5s per queued read
+        await admission.acquire(CHEAP)
+        await admission.acquire(CHEAP)
+        with pytest.raises(RejectedError) as rejected:
+            await admission.acquire(CHEAP)
+        assert rejected.value.retry_after == pytest.approx(0.5)
+        stats = admission.stats()
+        assert stats["cheap"]["shed"] == 1
+        assert stats["cheap"]["queue_depth"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_middleware_sheds_with_retry_after():
+    release = asyncio.Event()
+
+    async def app(scope, receive, send):
+        if scope["path"] == "/api/slow":
+            await release.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    async def scenario():
+        admission = controller(max_concurrency=1, queue_budget_ms=20, client_burst=100)
+        transport = httpx.ASGITransport(app=AdmissionMiddleware(app, admission))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            slow = asyncio.create_task(client.get("/api/slow"))
+            await asyncio.sleep(0.01)
+            shed = await client.get("/api/listings/search")
+            assert shed.status_code == 503
+            assert int(shed.headers["retry-after"]) >= 1
+            assert (await client.get("/api/health")).status_code == 200  # exempt
+
+            release.set()
+            assert (await slow).status_code == 200
+            assert (await client.get("/api/listings/search")).status_code == 200
+        assert admission.stats()["active"] == 0
+
+    asyncio.run(scenario())
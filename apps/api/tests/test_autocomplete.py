@@ -0,0 +1,123 @@
+import asyncio
+from datetime import date
+
+import httpx
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine
+
+from api import database
+from api.cities import TEL_AVIV
+from api.config import settings
+from api.main import app
+from api.models import Neighborhood, RentalListing, SaleTransaction
+from api.services.autocomplete import (
+    AutocompleteIndex,
+    Suggestion,
+    build_autocomplete_index,
+    street_name,
+)
+
+BEN_YEHUDA = "\u05d1\u05df \u05d9\u05d4\u05d5\u05d3\u05d4"
+SHEINKIN = "\u05e9\u05d9\u05e0\u05e7\u05d9\u05df"  # ends in a final nun
+
+
+def _engine():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(Neighborhood(id="old-north", name_en="Old North", name_he="", lat=0, lng=0))
+        session.add(Neighborhood(id="lev-hair", name_en="Lev Hair", name_he="", lat=0, lng=0))
+        for i, address in enumerate([f"{BEN_YEHUDA} 10", f"{BEN_YEHUDA} 120, apt 4"]):
+            session.add(
+                RentalListing(
+                    id=f"l{i}", neighborhood_id="old-north", address=address, rooms=2, price=1
+                )
+            )
+        session.add(
+            SaleTransaction(
+                id="s0",
+                address=f"{SHEINKIN} 5",
+                neighborhood_id="lev-hair",
+                rooms=3,
+                sqm=70,
+                floor=1,
+                price=1,
+                price_per_sqm=1,
+                deal_date=date(2026, 1, 1),
+            )
+        )
+        session.commit()
+    return engine
+
+
+def test_street_name_drops_the_house_number():
+    assert street_name(f"{BEN_YEHUDA} 120, apt 4") == BEN_YEHUDA
+    assert street_name("Rothschild Blvd. 5") == "Rothschild Blvd."
+    assert street_name(None) == ""
+
+
+def test_prefixes_match_any_word_and_rank_by_coverage():
+    with Session(_engine()) as session:
+        index = build_autocomplete_index(session, TEL_AVIV)
+
+    (street,) = index.search("\u05d9\u05d4\u05d5")  # "yehu", the start of Ben Yehuda's second word
+    assert (street.label, street.kind, street.count) == (BEN_YEHUDA, "street", 2)
+    # Typing stops before the final letter; the mapping table's street has no data yet
+    assert [s.label for s in index.search(SHEINKIN[:-1])] == [SHEINKIN]
+    assert [(s.neighborhood_id, s.count) for s in index.search(SHEINKIN)] == [("lev-hair", 1)]
+    assert [s.label for s in index.search("o")] == ["Old North"]
+    assert index.search("  ") == []
+
+
+def test_short_prefixes_match_the_full_range_search():
+    words = ["ben", "bar", "beit", "bograshov", "ben ami", "bet lehem"]
+    suggestions = [
+        Suggestion(f"{word} {n}", "street", "lev-hair", "Lev Hair", count=n)
+        for n in range(30)
+        for word in words
+    ]
+    index = AutocompleteIndex(suggestions)
+    for prefix in ("b", "be", "ben", "bo", "l", "1", "2"):
+        for limit in (1, 10, 50):
+            in_range = {
+                position
+                for key, position in zip(index._keys, index._positions)
+                if key.startswith(prefix)
+            }
+            expected = [index.suggestions[p] for p in sorted(in_range)[:limit]]
+            assert index.search(prefix, limit) == expected, (prefix, limit)
+
+
+def test_streets_have_english_names_and_labels_are_not_repeated():
+    with Session(_engine()) as session:
+        index = build_autocomplete_index(session, TEL_AVIV)
+
+    (street,) = index.search("yeh")
+    assert (street.label, street.neighborhood_id, street.count) == ("Ben Yehuda", "old-north", 2)
+    # Rothschild is both an area and a street of Lev Hair in the mapping tables: listed once
+    rothschild = "\u05e8\u05d5\u05d8\u05e9\u05d9\u05dc\u05d3"
+    assert [(s.label, s.kind) for s in index.search(rothschild)] == [(rothschild, "neighborhood")]
+    assert [(s.label, s.kind) for s in index.search("roth")] == [("Rothschild", "street")]
+
+
+def test_autocomplete_endpoint(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "read_snapshot_dir", str(tmp_path))  # nothing published
+    monkeypatch.setitem(database._engines, settings.default_city, _engine())
+
+    async def fetch(query):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get(f"/api/autocomplete?{query}")
+
+    assert asyncio.run(fetch("q=lev")).json() == [
+        {
+            "label": "Lev Hair",
+            "kind": "neighborhood",
+            "neighborhood_id": "lev-hair",
+            "neighborhood": "Lev Hair",
+            "count": 1,
+        }
+    ]
+    assert asyncio.run(fetch("q=")).status_code == 422
@@ -0,0 +1,62 @@
+from datetime import date
+
+from sqlalchemy import text
+from sqlmodel import Session, SQLModel, create_engine, func, select
+
+from api.migrations import run_migrations
+from api.models import CBSRentStat, RentIndex
+from api.scrapers.cbs import CBSScraper
+
+CITY = "\u05ea\u05dc \u05d0\u05d1\u05d9\u05d1-\u05d9\u05e4\u05d5"
+
+
+def count(session, model):
+    return session.exec(select(func.count()).select_from(model)).one()
+
+
+def test_repeated_scrapes_upsert_on_natural_keys():
+    engine = create_engine("sqlite://", echo=False)
+    SQLModel.metadata.create_all(engine)
+    scraper = CBSScraper()
+    with Session(engine) as session:
+        for _ in range(2):
+            scraper.fetch_rent_survey(session)
+            scraper.fetch_rent_index(session)
+        assert count(session, CBSRentStat) == 24
+        assert count(session, RentIndex) == 24
+
+        revised = {"city": CITY, "rooms": 2.0, "tenant_type": "all", "avg_rent": 7100}
+        scraper.ingest_rent_survey(session, [revised])
+        stat = session.exec(
+            select(CBSRentStat).where(CBSRentStat.rooms == 2.0, CBSRentStat.tenant_type == "all")
+        ).one()
+        assert stat.avg_rent == 7100
+        assert count(session, CBSRentStat) == 24
+
+
+def test_migration_drops_duplicate_rows():
+    engine = create_engine("sqlite://", echo=False)
+    SQLModel.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX uq_rent_index_date"))
+        for value in (100.0, 101.0):
+            conn.execute(
+                text("INSERT INTO rent_index (date, index_value, yoy_change) VALUES (:d, :v, 5)"),
+                {"d": date(2025, 1, 1), "v": value},
+            )
+    run_migrations(engine)
+    with Session(engine) as session:
+        rows = session.exec(select(RentIndex)).all()
+        assert [row.index_value for row in rows] == [101.0]
+
+
+def test_migration_swaps_the_comps_index_for_the_active_one():
+    engine = create_engine("sqlite://", echo=False)
+    SQLModel.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX ix_rental_listing_active"))
+    run_migrations(engine)
+    with engine.connect() as conn:
+        indexes = {row[1] for row in conn.execute(text("PRAGMA index_list(rental_listing)"))}
+    assert "ix_rental_listing_active" in indexes
+    assert "ix_rental_listing_comps" not in indexes
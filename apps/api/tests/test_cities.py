@@ -0,0 +1,81 @@
+import asyncio
+
+import httpx
+import pytest
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from api import database
+from api.cities import CITIES, GIVATAYIM, HAIFA, TEL_AVIV, lookup_city
+from api.config import settings
+from api.main import app
+from api.models import Neighborhood, RentIndex
+from api.scrapers.cbs import CBSScraper
+from api.scrapers.yad2 import Yad2Scraper
+from api.seed import seed_neighborhoods
+from api.services.generation import current_generation
+
+
+def test_lookup_defaults_to_tel_aviv_and_rejects_unknown_cities():
+    assert lookup_city() is TEL_AVIV
+    assert lookup_city("haifa") is HAIFA
+    with pytest.raises(KeyError):
+        lookup_city("eilat")
+
+
+def test_neighborhood_maps_are_per_city():
+    street = "\u05e9\u05d9\u05e0\u05e7\u05d9\u05df 12"  # Sheinkin exists in both cities
+    assert TEL_AVIV.guess_neighborhood(street) == "lev-hair"
+    assert GIVATAYIM.guess_neighborhood(street) == "sheinkin"
+    assert Yad2Scraper(HAIFA)._guess_neighborhood("", "\u05d4\u05d3\u05e8") == "hadar"
+
+
+def test_every_mapped_neighborhood_is_seeded():
+    for city in CITIES.values():
+        engine = create_engine("sqlite://", echo=False)
+        SQLModel.metadata.create_all(engine)
+        with Session(engine) as session:
+            seed_neighborhoods(session, city)
+            seeded = set(session.exec(select(Neighborhood.id)).all())
+        mapped = set(city.neighborhood_map.values()) | set(city.street_map.values())
+        assert mapped <= seeded, city.id
+
+
+def test_reseeding_unchanged_neighborhoods_keeps_the_generation():
+    engine = create_engine("sqlite://", echo=False)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        seed_neighborhoods(session, HAIFA)
+        generation = current_generation(session)
+        seed_neighborhoods(session, HAIFA)
+        assert current_generation(session) == generation
+
+
+def test_rent_index_is_only_seeded_where_it_is_modeled():
+    engine = create_engine("sqlite://", echo=False)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        assert CBSScraper(HAIFA).fetch_rent_index(session) == 0
+        assert session.exec(select(RentIndex)).all() == []
+
+
+def test_requests_are_routed_to_the_city_partition(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "read_snapshot_dir", str(tmp_path))  # nothing published
+    for city, name in [("tel-aviv", "Florentin"), ("haifa", "Hadar")]:
+        engine = create_engine(
+            "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+        )
+        SQLModel.metadata.create_all(engine)
+        with Session(engine) as session:
+            session.add(Neighborhood(id=name.lower(), name_en=name, name_he="", lat=0, lng=0))
+            session.commit()
+        monkeypatch.setitem(database._engines, city, engine)
+
+    async def fetch(query):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get(f"/api/neighborhoods{query}")
+
+    assert [n["id"] for n in asyncio.run(fetch("")).json()] == ["florentin"]
+    assert [n["id"] for n in asyncio.run(fetch("?city=haifa")).json()] == ["hadar"]
+    assert asyncio.run(fetch("?city=eilat")).status_code == 404
@@ -0,0 +1,59 @@
+import math
+import random
+
+from api.services.comparables import ComparableQuery, ComparablesIndex, KDTree
+
+
+def brute_force(points, query, k, max_distance, weights, accept):
+    found = []
+    for position, point in enumerate(points):
+        d = math.sqrt(sum(w * (q - p) ** 2 for q, p, w in zip(query, point, weights)))
+        if d <= max_distance and accept(position):
+            found.append((d, position))
+    return sorted(found)[:k]
+
+
+def test_nearest_matches_brute_force():
+    rng = random.Random(3)
+    points = [tuple(rng.uniform(0, 10) for _ in range(5)) for _ in range(2000)]
+    tree = KDTree(points)
+    for _ in range(50):
+        query = tuple(rng.uniform(0, 10) for _ in range(5))
+        weights = (1.0, 1.0, 1.0, float(rng.random() < 0.5), float(rng.random() < 0.5))
+        max_distance = rng.choice([math.inf, 2.0, 4.0])
+        k = rng.choice([1, 5, 20])
+        parity = rng.randrange(3)
+
+        def accept(position, parity=parity):
+            return position % 3 != parity
+
+        expected = brute_force(points, query, k, max_distance, weights, accept)
+        got = tree.nearest(query, k, max_distance, weights, accept)
+        assert [d for d, _ in got] == [d for d, _ in expected]
+
+
+def test_listings_without_coordinates_use_neighborhood_centroid():
+    centroids = {"florentin": (32.056, 34.769), "ramat-aviv": (32.113, 34.798)}
+    index = ComparablesIndex(
+        [
+            ("near", "florentin", None, None, 2, 50, 1, 6000, 0),
+            ("far", "ramat-aviv", None, None, 2, 50, 1, 9000, 0),
+            ("placed", None, 32.057, 34.770, 2, 50, 1, 6500, 0),
+            ("unplaced", None, None, None, 2, 50, 1, 7000, 0),
+        ],
+        centroids,
+    )
+    assert len(index) == 3
+    found = index.find(ComparableQuery("florentin", rooms=2, sqm=50), max_distance=3.0)
+    assert [c.listing_id for c in found] == ["near", "placed"]
+
+
+def test_find_many_shares_repeated_queries():
+    index = ComparablesIndex(
+        [("a", "florentin", None, None, 2, 50, 1, 6000, 0)], {"florentin": (32.056, 34.769)}
+    )
+    query = ComparableQuery("florentin", rooms=2)
+    first, second, missing = index.find_many([query, query, ComparableQuery("nowhere", 2)])
+    assert first is second
+    assert [c.listing_id for c in first] == ["a"]
+    assert missing == []
@@ -0,0 +1,145 @@
+import asyncio
+from datetime import date, datetime
+
+import httpx
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine
+
+from api import database
+from api.config import settings
+from api.main import app
+from api.models import Neighborhood, RentalListing, SaleTransaction
+from api.services.comparison import build_comparison_stats
+from api.services.price_sketches import rebuild_sketches
+
+LISTINGS = [
+    # neighborhood, rooms, price, sqm, days on market
+    ("florentin", 2, 6000, 50, 10),
+    ("florentin", 2, 7000, 50, 20),
+    ("florentin", 3, 9000, 75, None),
+    ("ajami", 3, 8000, 80, 30),
+]
+SALES = [
+    # neighborhood, rooms, price per sqm, deal date
+    ("florentin", 2, 60_000, date(2026, 5, 1)),
+    ("florentin", 3, 66_000, date(2026, 2, 1)),
+    ("florentin", 3, 50_000, date(2025, 3, 1)),  # the year before
+    ("florentin", 3, 10_000, date(2023, 1, 1)),  # too old to count
+]
+TODAY = date(2026, 8, 15)
+NO_DATA = {
+    "median_rent": None,
+    "avg_rent_per_sqm": None,
+    "avg_sale_price_per_sqm": None,
+    "sale_price_per_sqm_change_pct": None,
+    "sales_last_year": 0,
+    "avg_days_on_market": None,
+    "active_supply": 0,
+}
+
+
+def _engine():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        for hood in ("florentin", "ajami", "jaffa"):
+            session.add(Neighborhood(id=hood, name_en=hood.title(), name_he="", lat=32, lng=34.7))
+        for i, (hood, rooms, price, sqm, dom) in enumerate(LISTINGS):
+            session.add(
+                RentalListing(
+                    id=f"l{i}",
+                    neighborhood_id=hood,
+                    rooms=rooms,
+                    sqm=sqm,
+                    price=price,
+                    price_per_sqm=price / sqm,
+                    days_on_market=dom,
+                    first_seen=datetime(2026, 1, 1),
+                    last_seen=datetime(2026, 1, 1),
+                )
+            )
+        for i, (hood, rooms, per_sqm, deal_date) in enumerate(SALES):
+            session.add(
+                SaleTransaction(
+                    id=f"s{i}",
+                    address="",
+                    neighborhood_id=hood,
+                    rooms=rooms,
+                    sqm=100,
+                    floor=1,
+                    price=per_sqm * 100,
+                    price_per_sqm=per_sqm,
+                    deal_date=deal_date,
+                )
+            )
+        session.flush()
+        rebuild_sketches(session)
+        session.commit()
+    return engine
+
+
+def test_metrics_combine_room_buckets():
+    with Session(_engine()) as session:
+        stats = build_comparison_stats(session, today=TODAY)
+
+    florentin = stats["florentin"]["metrics"]
+    assert florentin[None] == {
+        "median_rent": 7000,
+        "avg_rent_per_sqm": 126.7,
+        "avg_sale_price_per_sqm": 63_000,
+        "sale_price_per_sqm_change_pct": 26.0,
+        "sales_last_year": 2,
+        "avg_days_on_market": 15.0,
+        "active_supply": 3,
+    }
+    assert florentin[2.0]["median_rent"] == 6500
+    assert florentin[2.0]["sale_price_per_sqm_change_pct"] is None
+    assert florentin[3.0]["avg_sale_price_per_sqm"] == 66_000
+    assert stats["jaffa"]["metrics"] == {None: NO_DATA}
+
+
+def test_duplicate_listings_count_once():
+    engine = _engine()
+    with Session(engine) as session:
+        before = build_comparison_stats(session, today=TODAY)["florentin"]["metrics"]
+        # The 7000 listing again from another source, posted later at a different size
+        session.add(
+            RentalListing(
+                id="l1-dup",
+                canonical_id="l1",
+                neighborhood_id="florentin",
+                rooms=2,
+                sqm=35,
+                price=7000,
+                price_per_sqm=200,
+                days_on_market=90,
+                first_seen=datetime(2026, 2, 1),
+                last_seen=datetime(2026, 2, 1),
+            )
+        )
+        session.commit()
+        after = build_comparison_stats(session, today=TODAY)["florentin"]["metrics"]
+
+    assert after == before
+
+
+def test_compare_endpoint(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "read_snapshot_dir", str(tmp_path))  # nothing published
+    monkeypatch.setitem(database._engines, settings.default_city, _engine())
+
+    async def fetch(query):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get(f"/api/neighborhoods/compare?{query}")
+
+    body = asyncio.run(fetch("ids=ajami,florentin&ids=jaffa&rooms=3")).json()
+    assert [(n["id"], n["active_supply"]) for n in body["neighborhoods"]] == [
+        ("ajami", 1),
+        ("florentin", 1),
+        ("jaffa", 0),
+    ]
+    assert body["trend"] == "unknown"
+    assert asyncio.run(fetch("ids=ajami,nowhere")).status_code == 404
+    assert asyncio.run(fetch("ids=")).status_code == 422
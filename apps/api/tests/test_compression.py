@@ -0,0 +1,113 @@
+import asyncio
+import gzip
+import json
+
+import httpx
+import pytest
+
+from api import compression
+from api.compression import CompressionMiddleware, PrecompressedBody, negotiate
+
+PAYLOAD = [
+    {"id": f"n{i}", "name_en": "Florentin", "name_he": "\u05e4\u05dc\u05d5\u05e8"}
+    for i in range(200)
+]
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        (None, None),
+        ("identity", None),
+        ("gzip, deflate", "gzip"),
+        ("gzip;q=0, deflate", None),
+        ("*", "gzip"),
+        ("*;q=0.5, gzip;q=0", None),
+    ],
+)
+def test_negotiate(monkeypatch, header, expected):
+    monkeypatch.setattr(compression, "ENCODINGS", ("gzip",))
+    assert negotiate(header) == expected
+
+
+@pytest.mark.skipif(compression.brotli is None, reason="brotli is not installed")
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        ("gzip, br", "br"),
+        ("*", "br"),
+        ("br;q=0, gzip", "gzip"),
+        ("*;q=0.5, gzip;q=0", "br"),
+    ],
+)
+def test_negotiate_prefers_brotli(header, expected):
+    assert negotiate(header) == expected
+
+
+def test_precompressed_body_serves_accepted_encoding():
+    body = PrecompressedBody.from_content(PAYLOAD)
+    assert json.loads(body.raw) == PAYLOAD
+    assert len(body.encoded["gzip"]) < len(body.raw)
+
+    compressed = body.response("gzip")
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert compressed.headers["vary"] == "Accept-Encoding"
+    assert json.loads(gzip.decompress(compressed.body)) == PAYLOAD
+
+    plain = body.response(None)
+    assert "content-encoding" not in plain.headers
+    assert plain.body == body.raw
+
+
+def test_small_payloads_are_not_compressed():
+    body = PrecompressedBody.from_content({"status": "ok"})
+    assert body.encoded == {}
+    assert "content-encoding" not in body.response("gzip").headers
+
+
+def request(app, path, encoding="gzip"):
+    async def run():
+        transport = httpx.ASGITransport(app=CompressionMiddleware(app, minimum_size=100))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get(path, headers={"accept-encoding": encoding})
+
+    return asyncio.run(run())
+
+
+async def streaming_app(scope, receive, send):
+    content_type = b"text/event-stream" if scope["path"] == "/events" else b"application/json"
+    headers = [(b"content-type", content_type)]
+    if scope["path"] == "/encoded":
+        headers.append((b"content-encoding", b"x-test"))
+    await send({"type": "http.response.start", "status": 200, "headers": headers})
+    if scope["path"] == "/small":
+        await send({"type": "http.response.body", "body": b"{}"})
+        return
+    for chunk in (b'{"a":"' + b"x" * 500, b'","b":"' + b"y" * 500, b'"}'):
+        await send({"type": "http.response.body", "body": chunk, "more_body": True})
+    await send({"type": "http.response.body", "body": b""})
+
+
+def test_middleware_streams_gzip():
+    response = request(streaming_app, "/stream")
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.json() == {"a": "x" * 500, "b": "y" * 500}
+
+
+@pytest.mark.parametrize("path", ["/small", "/events"])
+def test_middleware_passes_through(path):
+    response = request(streaming_app, path)
+    assert "content-encoding" not in response.headers
+
+
+def test_middleware_keeps_existing_encoding():
+    response = request(streaming_app, "/encoded")
+    assert response.headers["content-encoding"] == "x-test"
+    assert "vary" not in response.headers
+
+
+def test_middleware_without_accept_encoding():
+    response = request(streaming_app, "/stream", encoding="identity")
+    assert "content-encoding" not in response.headers
+    assert response.json()["b"] == "y" * 500
@@ -0,0 +1,147 @@
+import pytest
+from sqlalchemy import event
+from sqlmodel import Session, SQLModel, create_engine, func, select
+
+from api.cities import HAIFA, RAMAT_GAN
+from api.models import ListingSignatureBand, Neighborhood, RentalListing
+from api.scrapers.yad2 import Yad2Scraper
+from api.services.dedup import BANDS, normalize_address
+from api.services.market_signals import get_signals
+
+FLORENTIN = "\u05e4\u05dc\u05d5\u05e8\u05e0\u05d8\u05d9\u05df"
+VITAL_15 = "\u05d5\u05d9\u05d8\u05dc 15"
+STREET = "\u05e8\u05d7\u05d5\u05d1"
+TEL_AVIV = "\u05ea\u05dc \u05d0\u05d1\u05d9\u05d1"
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://", echo=False)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(
+            Neighborhood(
+                id="florentin", name_en="Florentin", name_he=FLORENTIN, lat=32.056, lng=34.769
+            )
+        )
+        session.commit()
+        yield session
+
+
+def item(listing_id, address, source="yad2", floor=2, sqm=50, price=6000):
+    return {
+        "id": listing_id,
+        "source": source,
+        "address": address,
+        "area": FLORENTIN,
+        "rooms": 2,
+        "sqm": sqm,
+        "floor": floor,
+        "price": price,
+    }
+
+
+def test_normalize_address_drops_noise():
+    assert normalize_address(f"{STREET} {VITAL_15}, {TEL_AVIV}") == normalize_address(VITAL_15)
+    assert normalize_address("Vital St. 15") == "vital 15"
+
+
+def test_normalize_address_drops_each_citys_own_name():
+    assert normalize_address("Herzl 3, Haifa", HAIFA) == "herzl 3"
+    assert normalize_address("Herzl 3, Haifa") == "herzl 3 haifa"  # not a Tel Aviv name
+    assert normalize_address(f"Herzl 3, {RAMAT_GAN.name_he}", RAMAT_GAN) == "herzl 3"
+
+
+def test_candidate_lookup_searches_the_band_key(session):
+    Yad2Scraper().ingest_listings(session, [item("yad2-1", VITAL_15)])
+    statements = []
+    engine = session.get_bind()
+
+    def explain(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("SELECT") and "FROM listing_signature_band" in statement:
+            plan = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+            statements.append(" ".join(row[-1] for row in plan))
+
+    event.listen(engine, "before_cursor_execute", explain)
+    try:
+        Yad2Scraper().ingest_listings(
+            session, [item("yad2-1", VITAL_15), item("onmap-1", VITAL_15, source="onmap")]
+        )
+    finally:
+        event.remove(engine, "before_cursor_execute", explain)
+    assert statements
+    assert all("SEARCH" in plan and "SCAN" not in plan for plan in statements)
+
+
+def test_cross_source_duplicates_share_canonical_id(session):
+    Yad2Scraper().ingest_listings(
+        session,
+        [
+            item("yad2-1", VITAL_15),
+            item("homeless-1", f"{STREET} {VITAL_15}, {TEL_AVIV}", source="homeless"),
+            item("komo-1", VITAL_15, source="komo", floor=4),  # same building, other floor
+            item("madlan-1", VITAL_15, source="madlan", sqm=None),  # size unknown
+        ],
+    )
+    canonical = dict(session.exec(select(RentalListing.id, RentalListing.canonical_id)).all())
+    assert canonical == {
+        "yad2-1": "yad2-1",
+        "homeless-1": "yad2-1",
+        "komo-1": "komo-1",
+        "madlan-1": "madlan-1",
+    }
+    assert get_signals("florentin", 2, session)["active_supply"] == 3
+
+
+def test_missing_fields_do_not_chain_floors_together(session):
+    Yad2Scraper().ingest_listings(
+        session,
+        [
+            item("yad2-1", VITAL_15, floor=None),
+            item("madlan-1", VITAL_15, source="madlan", floor=1),
+            item("komo-1", VITAL_15, source="komo", floor=4),
+        ],
+    )
+    groups = set(session.exec(select(RentalListing.canonical_id)).all())
+    assert groups == {"yad2-1", "madlan-1", "komo-1"}
+
+
+def test_one_source_never_lists_an_apartment_twice(session):
+    scraper = Yad2Scraper()
+    scraper.ingest_listings(
+        session, [item("yad2-1", VITAL_15), item("homeless-1", VITAL_15, source="homeless")]
+    )
+    # Matches homeless-1, but its group already holds a yad2 listing
+    scraper.ingest_listings(
+        session,
+        [
+            item("yad2-1", VITAL_15),
+            item("homeless-1", VITAL_15, source="homeless"),
+            item("yad2-2", VITAL_15),
+        ],
+    )
+    assert session.get(RentalListing, "yad2-2").canonical_id == "yad2-2"
+
+
+def test_incremental_scrape_only_hashes_new_rows(session):
+    scraper = Yad2Scraper()
+    scraper.ingest_listings(session, [item("yad2-1", VITAL_15)])
+    scraper.ingest_listings(
+        session, [item("yad2-1", VITAL_15), item("onmap-1", f"{VITAL_15} ", source="onmap")]
+    )
+    bands = session.exec(select(func.count()).select_from(ListingSignatureBand)).one()
+    assert bands == 2 * BANDS
+    assert session.get(RentalListing, "onmap-1").canonical_id == "yad2-1"
+
+
+def test_batch_only_deactivates_its_own_sources(session):
+    scraper = Yad2Scraper()
+    scraper.ingest_listings(session, [item("yad2-1", VITAL_15), item("yad2-2", "Herzl 3")])
+    scraper.ingest_listings(session, [item("homeless-9", "Florentin 7", source="homeless")])
+    active = dict(session.exec(select(RentalListing.id, RentalListing.is_active)).all())
+    assert active == {"yad2-1": True, "yad2-2": True, "homeless-9": True}
+
+    # A later yad2 scrape still retires the yad2 listings it no longer sees
+    scraper.ingest_listings(session, [item("yad2-1", VITAL_15)])
+    assert not session.get(RentalListing, "yad2-2").is_active
+    assert session.get(RentalListing, "homeless-9").is_active
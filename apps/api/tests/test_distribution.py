@@ -0,0 +1,106 @@
+import asyncio
+from datetime import datetime
+
+import httpx
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine
+
+from api import database
+from api.config import settings
+from api.main import app
+from api.models import Neighborhood, RentalListing
+from api.services.comparables import ComparableQuery
+from api.services.distribution import get_distributions, what_if
+from api.services.price_sketches import rebuild_sketches
+from api.services.rent_scorer import score_rent
+
+PRICES = [5100, 5400, 5600, 6200, 6300, 7900]
+
+
+def _engine():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(
+            Neighborhood(id="florentin", name_en="Florentin", name_he="", lat=32.05, lng=34.77)
+        )
+        for i, (rooms, price) in enumerate([*((3, p) for p in PRICES), (2, 4000)]):
+            session.add(
+                RentalListing(
+                    id=f"l{i}",
+                    neighborhood_id="florentin",
+                    rooms=rooms,
+                    price=price,
+                    first_seen=datetime(2026, 1, 1),
+                    last_seen=datetime(2026, 1, 1),
+                )
+            )
+        session.flush()
+        rebuild_sketches(session)
+        session.commit()
+    return engine
+
+
+def test_distributions_have_aligned_fixed_bins():
+    with Session(_engine()) as session:
+        assert [d["rooms"] for d in get_distributions(session, "florentin")] == [2.0, 3.0]
+        (three,) = get_distributions(session, "florentin", rooms=3.2)
+
+    assert (three["count"], three["min"], three["median"], three["max"]) == (6, 5100, 5900, 7900)
+    assert three["histogram"] == {
+        "start": 5000,
+        "bin_width": settings.distribution_bin_width,
+        "counts": [1, 1, 1, 0, 1, 1, 0, 0, 0, 0, 0, 1],
+    }
+
+
+def test_what_if_scores_a_grid_like_a_rent_check():
+    rents = [5000, 6000, 7000]
+    with Session(_engine()) as session:
+        result = what_if(session, ComparableQuery("florentin", 3), rents)
+        checks = [score_rent("florentin", 3, None, rent, session) for rent in rents]
+
+    assert (result["basis"], result["count"]) == ("comparables", 7)
+    assert [c["market_avg"] for c in checks] == [result["market_avg"]] * 3
+    assert [
+        {"score": p["score"], "percentile": p["percentile"], "delta_pct": p["delta_pct"]}
+        for p in result["grid"]
+    ] == [{k: c[k] for k in ("score", "percentile", "delta_pct")} for c in checks]
+
+
+def test_what_if_falls_back_to_the_sketch(monkeypatch):
+    monkeypatch.setattr("api.services.distribution.match_comparables", lambda *args: ([], True))
+    with Session(_engine()) as session:
+        result = what_if(session, ComparableQuery("florentin", 3), [5000, 6000, 7000])
+
+    assert (result["basis"], result["count"], result["market_avg"]) == ("sketch", 6, 6083)
+    assert [(p["rent"], p["percentile"], p["score"]) for p in result["grid"]] == [
+        (5000, 0, "below_market"),
+        (6000, 52, "at_market"),
+        (7000, 82, "above_market"),
+    ]
+
+
+def test_distribution_endpoints(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "read_snapshot_dir", str(tmp_path))  # nothing published
+    monkeypatch.setitem(database._engines, settings.default_city, _engine())
+
+    async def fetch(path):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get(path)
+
+    path = "/api/neighborhoods/florentin/distribution"
+    response = asyncio.run(fetch(f"{path}?rooms=3"))
+    assert [d["count"] for d in response.json()["distributions"]] == [6]
+    response = asyncio.run(fetch(f"{path}/what-if?rooms=3&rent_min=5000&rent_max=8000"))
+    assert len(response.json()["grid"]) == 13
+    # Tiny inputs snap to the smallest bucket, as POST /api/check does
+    tiny = asyncio.run(fetch(f"{path}/what-if?rooms=0.2&sqm=2&rent_min=5000&rent_max=6000"))
+    assert tiny.status_code == 200
+    assert tiny.json()["rooms"] == 0.5
+    too_fine = f"{path}/what-if?rooms=3&rent_min=0&rent_max=1000000&step=1"
+    assert asyncio.run(fetch(too_fine)).status_code == 422
+    assert asyncio.run(fetch("/api/neighborhoods/nowhere/distribution")).status_code == 404
@@ -0,0 +1,72 @@
+import asyncio
+import json
+
+from sqlmodel import Session, SQLModel, create_engine
+
+from api.services.events import RETRY_FRAME, Broadcaster, market_update
+from api.services.generation import bump_generation
+
+
+def parse(frame):
+    fields = dict(line.split(": ", 1) for line in frame.decode().strip().split("\n"))
+    return int(fields["id"]), fields["event"], json.loads(fields["data"])
+
+
+def test_poller_turns_generations_into_events():
+    engine = create_engine("sqlite://", echo=False)
+    SQLModel.metadata.create_all(engine)
+    broadcaster = Broadcaster()
+    with Session(engine) as session:
+        bump_generation(session, "seed")
+        session.commit()
+        assert broadcaster.fetch_new(session) == []  # history before startup isn't replayed
+
+        bump_generation(
+            session,
+            "yad2",
+            {"added": 3, "removed": 1, "repriced": 2, "neighborhoods": ["florentin"]},
+        )
+        session.commit()
+        [generation] = broadcaster.fetch_new(session)
+        payload = market_update(generation)
+
+    assert payload["generation"] == 2
+    assert payload["neighborhoods"] == ["florentin"]
+    assert (payload["added"], payload["removed"], payload["repriced"]) == (3, 1, 2)
+
+
+def test_every_subscriber_gets_each_event_once():
+    async def scenario():
+        broadcaster = Broadcaster()
+        broadcaster.last_generation = 4
+        streams = [broadcaster.stream() for _ in range(50)]
+        for stream in streams:
+            assert await anext(stream) == RETRY_FRAME
+        pending = [asyncio.create_task(anext(stream)) for stream in streams]
+        await asyncio.sleep(0)
+        assert broadcaster.subscribers == 50
+
+        broadcaster.publish(5, {"generation": 5})
+        broadcaster.publish(6, {"generation": 6})
+        frames = await asyncio.gather(*pending)
+        assert {parse(frame)[0] for frame in frames} == {5}
+        assert [parse(await anext(stream))[0] for stream in streams] == [6] * 50
+
+        for stream in streams:
+            await stream.aclose()
+        assert broadcaster.subscribers == 0
+
+    asyncio.run(scenario())
+
+
+def test_resumes_after_last_event_id():
+    async def scenario():
+        broadcaster = Broadcaster(history=3)
+        for generation in range(1, 6):
+            broadcaster.publish(generation, {"generation": generation})
+        stream = broadcaster.stream(last_event_id=3)
+        assert await anext(stream) == RETRY_FRAME
+        assert [parse(await anext(stream))[0] for _ in range(2)] == [4, 5]
+        await stream.aclose()
+
+    asyncio.run(scenario())
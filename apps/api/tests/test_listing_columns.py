@@ -0,0 +1,100 @@
+import math
+from datetime import datetime
+
+from sqlmodel import Session, SQLModel, create_engine
+
+from api.models import Neighborhood, RentalListing
+from api.services.comparables import (
+    ComparableQuery,
+    ComparablesIndex,
+    build_comparables_index,
+    export_listing_columns,
+)
+from api.services.generation import bump_generation
+from api.services.listing_columns import (
+    MISSING_FLOOR,
+    NO_NEIGHBORHOOD,
+    ListingColumns,
+    attach,
+    columns_for,
+)
+
+LISTINGS = [
+    # id, neighborhood, lat, lng, rooms, sqm, floor, price
+    ("a", "florentin", 32.056, 34.769, 3, 70, 2, 9000),
+    ("b", "florentin", None, None, 2, None, None, 6500),
+    ("c", "florentin", 32.057, 34.770, 2, 50, 1, 6000),
+    ("d", "ajami", 32.050, 34.752, 2, 55, 3, 5500),
+    ("e", None, 32.060, 34.780, 2, 45, 1, 7000),  # located, outside any neighborhood
+    ("f", None, None, None, 2, 45, 1, 7000),  # can't be placed at all
+]
+
+
+def _session():
+    engine = create_engine("sqlite://", echo=False)
+    SQLModel.metadata.create_all(engine)
+    session = Session(engine)
+    session.add(Neighborhood(id="florentin", name_en="", name_he="", lat=32.056, lng=34.769))
+    session.add(Neighborhood(id="ajami", name_en="", name_he="", lat=32.050, lng=34.752))
+    for i, (listing_id, hood, lat, lng, rooms, sqm, floor, price) in enumerate(LISTINGS):
+        session.add(
+            RentalListing(
+                id=listing_id,
+                neighborhood_id=hood,
+                lat=lat,
+                lng=lng,
+                rooms=rooms,
+                sqm=sqm,
+                floor=floor,
+                price=price,
+                amenities=i,
+                first_seen=datetime(2026, 1, 1),
+                last_seen=datetime(2026, 1, 1),
+            )
+        )
+    bump_generation(session, "test")
+    session.commit()
+    return session
+
+
+def test_columns_are_sorted_by_neighborhood_rooms_and_price(tmp_path):
+    session = _session()
+    assert export_listing_columns(session, tmp_path / "g1.listings") == 5
+    columns = ListingColumns(tmp_path / "g1.listings")
+
+    assert columns.generation == 1
+    assert list(columns.ids) == ["d", "c", "b", "a", "e"]
+    assert columns.neighborhoods == ["ajami", "florentin"]
+    assert list(columns.neighborhood) == [0, 1, 1, 1, NO_NEIGHBORHOOD]
+    assert list(columns.price) == [5500, 6000, 6500, 9000, 7000]
+    assert math.isnan(columns.sqm[2]) and columns.floor[2] == MISSING_FLOOR
+    assert columns.amenities[3] == 0  # "a" was added first
+
+
+def test_comparables_served_from_columns_match_in_memory_index(tmp_path):
+    session = _session()
+    export_listing_columns(session, tmp_path / "g1.listings")
+    in_memory = build_comparables_index(session)
+    assert isinstance(in_memory.ids, list)  # built from the database
+
+    attach(session.get_bind(), ListingColumns(tmp_path / "g1.listings"))
+    mapped = build_comparables_index(session)
+    assert isinstance(mapped.tree.columns[0], memoryview)
+    for query in [
+        ComparableQuery("florentin", 2, 50, 1),
+        ComparableQuery("ajami", 3),
+        ComparableQuery("florentin", 2, amenities=2),
+    ]:
+        assert mapped.find(query) == in_memory.find(query)
+
+
+def test_columns_are_ignored_once_the_generation_moves(tmp_path):
+    session = _session()
+    export_listing_columns(session, tmp_path / "g1.listings")
+    attach(session.get_bind(), ListingColumns(tmp_path / "g1.listings"))
+    assert columns_for(session) is not None
+
+    bump_generation(session, "test")
+    session.commit()
+    assert columns_for(session) is None
+    assert isinstance(build_comparables_index(session), ComparablesIndex)
@@ -0,0 +1,98 @@
+import math
+import random
+
+import pytest
+
+from api.services.listing_index import RANGE_COLUMNS, ListingIndex, SearchFilters
+
+
+def make_rows(n, seed=7):
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n):
+        rooms = rng.choice([1, 1.5, 2, 2.5, 3, 3.5, 4, 5])
+        sqm = None if rng.random() < 0.05 else rng.randint(20, 150)
+        price = rng.randrange(3000, 20000, 50)
+        rows.append(
+            (
+                f"l{i:05d}",
+                rng.choice(["florentin", "ajami", "old-north", None]),
+                rng.getrandbits(4),
+                price,
+                sqm,
+                rooms,
+                rng.choice([None, 0, 1, 2, 3, 4, 8]),
+                round(price / sqm, 1) if sqm else None,
+                rng.randint(0, 30),
+            )
+        )
+    return rows
+
+
+def brute_force(rows, filters, sort, descending):
+    col = {name: 3 + i for i, name in enumerate(RANGE_COLUMNS)}
+
+    def ok(row):
+        if row[col[sort]] is None:
+            return False
+        if filters.neighborhood_id is not None and row[1] != filters.neighborhood_id:
+            return False
+        if row[2] & filters.amenities != filters.amenities:
+            return False
+        for column, low, high in filters.ranges():
+            value = row[col[column]]
+            if value is None or (low is not None and value < low):
+                return False
+            if high is not None and value > high:
+                return False
+        return True
+
+    matched = sorted((r for r in rows if ok(r)), key=lambda r: (r[col[sort]], r[0]))
+    if descending:
+        matched.reverse()
+    return [r[0] for r in matched]
+
+
+def paginate(index, filters, sort, descending, limit):
+    ids, after = [], None
+    while True:
+        page, after = index.search(filters, sort, descending, after, limit)
+        ids.extend(page)
+        if after is None:
+            return ids
+
+
+FILTERS = [
+    SearchFilters(),
+    SearchFilters(neighborhood_id="ajami"),
+    SearchFilters(min_price=8000, max_price=9000),
+    SearchFilters(max_sqm=30, amenities=0b0101),
+    SearchFilters(min_rooms=3, max_rooms=3, min_floor=2),
+    SearchFilters(neighborhood_id="florentin", min_price=15000, amenities=0b1000),
+    SearchFilters(min_price=50000),
+]
+
+
+@pytest.mark.parametrize("sparse", [4096, 0])
+@pytest.mark.parametrize("filters", FILTERS)
+@pytest.mark.parametrize("sort", ["price", "price_per_sqm", "days_on_market"])
+def test_matches_brute_force(filters, sort, sparse):
+    rows = make_rows(3000)
+    index = ListingIndex(rows)
+    index.SPARSE_CANDIDATES = sparse  # 0 forces the sort-order walk
+    for descending in (False, True):
+        expected = brute_force(rows, filters, sort, descending)
+        assert paginate(index, filters, sort, descending, limit=37) == expected
+
+
+def test_empty_index():
+    index = ListingIndex([])
+    assert index.search(SearchFilters(), "price") == ([], None)
+
+
+def test_missing_values_are_not_indexed():
+    index = ListingIndex([("a", None, 0, 5000, None, 2, None, None, 3)])
+    assert index.search(SearchFilters(), "price") == (["a"], None)
+    assert index.search(SearchFilters(), "price_per_sqm") == ([], None)
+    assert index.search(SearchFilters(min_floor=0), "price") == ([], None)
+    assert not math.isnan(index.columns["price"][0])
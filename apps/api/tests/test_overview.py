@@ -0,0 +1,99 @@
+import asyncio
+import threading
+import time
+from datetime import date, datetime
+
+import httpx
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine
+
+from api import database
+from api.compression import response_cache
+from api.config import settings
+from api.main import app
+from api.models import Neighborhood, RentalListing
+from api.services.generation import bump_generation
+from api.services.overview import build_neighborhood_summaries, get_overview, neighborhood_summaries
+from api.services.price_sketches import rebuild_sketches
+
+
+def test_overview_summarizes_every_neighborhood():
+    engine = create_engine("sqlite://", echo=False)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(
+            Neighborhood(id="florentin", name_en="Florentin", name_he="", lat=32.05, lng=34.77)
+        )
+        session.add(Neighborhood(id="ajami", name_en="Ajami", name_he="", lat=32.05, lng=34.75))
+        for i, (rooms, price) in enumerate([(2, 6000), (2, 7000), (2, 8000), (3, 9000)]):
+            session.add(
+                RentalListing(
+                    id=f"l{i}",
+                    neighborhood_id="florentin",
+                    rooms=rooms,
+                    price=price,
+                    first_seen=datetime(2026, 1, 1),
+                    last_seen=datetime(2026, 1, 1),
+                )
+            )
+        session.flush()
+        rebuild_sketches(session)
+        session.commit()
+
+        overview = get_overview(session, today=date(2026, 8, 15))
+
+    assert [n["id"] for n in overview["neighborhoods"]] == ["ajami", "florentin"]
+    ajami, florentin = overview["neighborhoods"]
+    assert ajami["price_summary"] == {"active_listings": 0, "median_rent": None, "by_rooms": []}
+    summary = florentin["price_summary"]
+    assert summary["active_listings"] == 4
+    assert [(b["rooms"], b["count"], b["median"]) for b in summary["by_rooms"]] == [
+        (2.0, 3, 7000),
+        (3.0, 1, 9000),
+    ]
+    assert overview["trends"] == []
+    assert overview["seasonal"]["current"] == "bad_to_negotiate"
+
+
+def test_overview_built_while_rebuilding_is_not_cached(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "read_snapshot_dir", str(tmp_path))  # nothing published
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    SQLModel.metadata.create_all(engine)
+    monkeypatch.setitem(database._engines, settings.default_city, engine)
+    response_cache.clear()
+    release = threading.Event()
+
+    def slow_build(session):
+        release.wait(5)
+        return build_neighborhood_summaries(session)
+
+    def overview():
+        async def run():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await client.get("/api/overview")
+
+        body = asyncio.run(run()).json()
+        return body["generation"], [n["id"] for n in body["neighborhoods"]]
+
+    with Session(engine) as session:
+        session.add(Neighborhood(id="a", name_en="A", name_he="", lat=32.05, lng=34.77))
+        bump_generation(session, "seed")
+        session.commit()
+        assert overview() == (1, ["a"])
+
+        monkeypatch.setattr(neighborhood_summaries, "_build", slow_build)
+        session.add(Neighborhood(id="b", name_en="B", name_he="", lat=32.06, lng=34.78))
+        bump_generation(session, "scrape")
+        session.commit()
+        # The old summaries are served while they rebuild, labelled with their own generation
+        assert overview() == (1, ["a"])
+
+        release.set()
+        deadline = time.monotonic() + 5
+        while neighborhood_summaries.get_with_generation(session)[0] != 2:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        assert overview() == (2, ["a", "b"])
@@ -0,0 +1,63 @@
+import asyncio
+import json
+
+import httpx
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlmodel import create_engine
+
+from api.profiling import ProfilingMiddleware, _before_cursor_execute, classify
+
+
+def busy_query(engine):
+    with engine.connect() as conn:
+        conn.execute(text("select 1")).all()
+    total = 0
+    for i in range(300_000):
+        total += i * i
+    return total
+
+
+def request(tmp_path, headers):
+    engine = create_engine("sqlite://")
+
+    async def app(scope, receive, send):
+        await asyncio.to_thread(busy_query, engine)  # like a sync endpoint in the threadpool
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    async def run():
+        middleware = ProfilingMiddleware(app, token="secret", sample_rate=0, directory=tmp_path)
+        transport = httpx.ASGITransport(app=middleware)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/api/check", headers=headers)
+
+    return asyncio.run(run())
+
+
+def test_profiles_requests_with_the_debug_header(tmp_path):
+    response = request(tmp_path, {"x-dira-profile": "secret"})
+    profile_id = response.headers["x-dira-profile-id"]
+    assert "GET-api-check" in profile_id
+
+    summary = json.loads((tmp_path / f"{profile_id}.json").read_text())
+    assert summary["request"] == "GET /api/check"
+    assert summary["sql_statements"] == 1
+    assert summary["samples"] > 0
+    stacks = (tmp_path / f"{profile_id}.collapsed").read_text()
+    assert "test_profiling:busy_query" in stacks
+    assert not event.contains(Engine, "before_cursor_execute", _before_cursor_execute)
+
+
+def test_other_requests_are_not_profiled(tmp_path):
+    for headers in ({}, {"x-dira-profile": "wrong"}):
+        response = request(tmp_path, headers)
+        assert "x-dira-profile-id" not in response.headers
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_classify_uses_innermost_known_module():
+    assert classify(["api.routers.rent_check", "sqlalchemy.engine.base"]) == "sql"
+    assert classify(["fastapi.encoders", "api.models.listing"]) == "serialization"
+    assert classify(["api.routers.rent_check", "api.services.market_signals"]) == "python"
+    assert classify(["asyncio.base_events", "selectors"]) == "idle"
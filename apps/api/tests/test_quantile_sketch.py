@@ -0,0 +1,52 @@
+import random
+
+from api.services.quantile_sketch import TDigest
+
+
+def _values(n, seed=7):
+    rng = random.Random(seed)
+    return [rng.lognormvariate(9, 0.3) for _ in range(n)]
+
+
+def test_small_digest_is_exact():
+    digest = TDigest()
+    digest.extend([5000, 5500, 6000, 6500])
+    assert digest.cdf(6000) == 0.625  # (2 below + 0.5 equal) / 4
+    assert digest.cdf(4000) == 0.0
+    assert digest.cdf(9000) == 1.0
+    assert digest.mean == 5750
+
+
+def test_quantiles_on_large_stream_stay_bounded():
+    values = _values(50_000)
+    digest = TDigest()
+    digest.extend(values)
+    ordered = sorted(values)
+    for q in (0.05, 0.25, 0.5, 0.75, 0.95):
+        exact = ordered[int(q * len(ordered))]
+        assert abs(digest.quantile(q) - exact) / exact < 0.01
+    assert len(digest.centroids()) <= 100
+
+
+def test_merge_and_roundtrip():
+    values = _values(20_000)
+    left, right = TDigest(), TDigest()
+    left.extend(values[::2])
+    right.extend(values[1::2])
+
+    merged = TDigest.merged([TDigest.from_bytes(left.to_bytes()), right])
+    whole = TDigest()
+    whole.extend(values)
+
+    assert merged.count == len(values)
+    assert abs(merged.mean - whole.mean) < 1e-6 * whole.mean
+    assert abs(merged.quantile(0.5) - whole.quantile(0.5)) / whole.quantile(0.5) < 0.01
+
+
+def test_cdf_many_matches_cdf():
+    digest = TDigest()
+    digest.extend(_values(5_000))
+    digest.extend([8000] * 50)  # a run of equal prices
+    grid = [digest.min - 1, digest.max + 1, digest.min, digest.max, 8000.0]
+    grid += [3000 + 250 * i for i in range(80)]
+    assert digest.cdf_many(grid) == [digest.cdf(value) for value in grid]
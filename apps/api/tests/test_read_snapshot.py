@@ -0,0 +1,73 @@
+import sqlite3
+
+import pytest
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from api.config import settings
+from api.models import Neighborhood
+from api.services.generation import bump_generation, current_generation
+from api.services.read_snapshot import SnapshotReader, publish, read_pointer
+
+
+def _add(engine, hood_id: str):
+    with Session(engine) as session:
+        session.add(Neighborhood(id=hood_id, name_en=hood_id, name_he="", lat=0, lng=0))
+        bump_generation(session, "test", {"neighborhoods": [hood_id]})
+        session.commit()
+
+
+@pytest.fixture
+def live(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'live.db'}")
+    SQLModel.metadata.create_all(engine)
+    return engine
+
+
+def test_publish_builds_analyzed_snapshot_and_prunes(live, tmp_path):
+    out = tmp_path / "snapshots"
+    _add(live, "florentin")
+    first = publish(live, out, keep=1)
+    assert first["built"] and first["generation"] == 1
+    assert read_pointer(out)["file"] == first["file"] == "g1.db"
+    with sqlite3.connect(out / "g1.db") as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+        assert conn.execute("SELECT count(*) FROM sqlite_stat1").fetchone()[0] > 0
+
+    assert publish(live, out, keep=1)["built"] is False  # nothing committed since
+
+    _add(live, "ajami")
+    second = publish(live, out, keep=1)
+    assert second["file"] == "g2.db" and second["pruned"] == 2
+    assert sorted(p.name for p in out.glob("g*")) == ["g2.db", "g2.listings"]
+
+
+def test_reader_swaps_to_published_snapshot(live, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "generation_poll_seconds", 0.0)
+    out = tmp_path / "snapshots"
+    reader = SnapshotReader(out)
+    assert reader.refresh() is False  # nothing published yet
+
+    _add(live, "florentin")
+    publish(live, out)
+    assert reader.refresh() is True
+    engine = reader.engine
+
+    def ids():
+        with Session(reader.engine) as session:
+            return session.exec(select(Neighborhood.id).order_by(Neighborhood.id)).all()
+
+    assert ids() == ["florentin"]
+    _add(live, "ajami")
+    reader.refresh()
+    assert ids() == ["florentin"]  # unpublished writes stay invisible
+
+    publish(live, out)
+    reader.refresh()
+    assert reader.engine is engine
+    assert ids() == ["ajami", "florentin"]
+    with Session(reader.engine) as session:
+        assert current_generation(session) == 2
+        session.add(Neighborhood(id="x", name_en="x", name_he="", lat=0, lng=0))
+        with pytest.raises(OperationalError):
+            session.commit()
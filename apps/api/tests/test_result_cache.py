@@ -0,0 +1,147 @@
+import threading
+import time
+
+import pytest
+from pydantic import ValidationError
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine
+
+from api.config import settings
+from api.routers.rent_check import RentCheckRequest, _normalize
+from api.services.generation import GenerationalIndex, bump_generation, get_or_compute_current
+from api.services.result_cache import ResultCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_hit_after_miss():
+    cache = ResultCache(maxsize=4, ttl=60)
+    calls = []
+    for _ in range(3):
+        assert cache.get_or_compute("a", lambda: calls.append(1) or "value") == "value"
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 2
+
+
+def test_lru_eviction():
+    cache = ResultCache(maxsize=2, ttl=60)
+    cache.get_or_compute("a", lambda: 1)
+    cache.get_or_compute("b", lambda: 2)
+    cache.get_or_compute("a", lambda: 1)  # refresh "a"
+    cache.get_or_compute("c", lambda: 3)  # evicts "b"
+    assert len(cache) == 2
+    assert cache.get_or_compute("a", lambda: "recomputed") == 1
+    assert cache.get_or_compute("b", lambda: "recomputed") == "recomputed"
+
+
+def test_ttl_expiry():
+    clock = FakeClock()
+    cache = ResultCache(maxsize=4, ttl=10, clock=clock)
+    cache.get_or_compute("a", lambda: "old")
+    clock.now = 9
+    assert cache.get_or_compute("a", lambda: "new") == "old"
+    clock.now = 11
+    assert cache.get_or_compute("a", lambda: "new") == "new"
+
+
+def test_concurrent_misses_compute_once():
+    cache = ResultCache(maxsize=4, ttl=60)
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "value"
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_or_compute("k", slow)))
+        for _ in range(8)
+    ]
+    threads[0].start()
+    started.wait(5)
+    for t in threads[1:]:
+        t.start()
+    while cache.coalesced < 7:
+        time.sleep(0.001)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert calls == [1]
+    assert results == ["value"] * 8
+
+
+def test_errors_propagate_and_are_not_cached():
+    cache = ResultCache(maxsize=4, ttl=60)
+
+    def boom():
+        raise RuntimeError("db down")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute("k", boom)
+    assert cache.get_or_compute("k", lambda: "ok") == "ok"
+
+
+def test_uncacheable_values_are_returned_but_not_stored():
+    cache = ResultCache(maxsize=4, ttl=60)
+    assert cache.get_or_compute("k", lambda: "draft", cacheable=lambda v: v != "draft") == "draft"
+    assert cache.get_or_compute("k", lambda: "final", cacheable=lambda v: v != "draft") == "final"
+    assert cache.get_or_compute("k", lambda: "recomputed") == "final"
+
+
+def test_results_from_a_stale_index_are_not_cached():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    SQLModel.metadata.create_all(engine)
+    release, builds = threading.Event(), []
+
+    def build(session):
+        if builds:
+            release.wait(5)  # hold the background rebuild
+        builds.append(1)
+        return f"built #{len(builds)}"
+
+    index = GenerationalIndex("test", build)
+    cache = ResultCache(maxsize=4, ttl=60)
+    with Session(engine) as session:
+
+        def lookup():
+            return get_or_compute_current(cache, ("k",), session, lambda: index.get(session))
+
+        bump_generation(session, "a")
+        session.commit()
+        assert lookup() == "built #1"
+        bump_generation(session, "b")
+        session.commit()
+        assert lookup() == "built #1"  # stale while rebuilding, so not stored for generation 2
+        assert len(cache) == 1
+
+        release.set()
+        deadline = time.monotonic() + 5
+        while index.get_with_generation(session)[0] != 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert lookup() == "built #2"
+        assert len(cache) == 2
+
+
+def test_check_keys_never_snap_to_zero():
+    bucket = settings.check_cache_sqm_bucket
+    req = RentCheckRequest(neighborhood_id="florentin", rooms=0.2, sqm=2, monthly_rent=3000)
+    normalized = _normalize(req)
+    assert (normalized.rooms, normalized.sqm) == (0.5, bucket)
+
+    with pytest.raises(ValidationError):
+        RentCheckRequest(neighborhood_id="florentin", rooms=0, sqm=40, monthly_rent=3000)
+    with pytest.raises(ValidationError):
+        RentCheckRequest(neighborhood_id="florentin", rooms=2, sqm=-5, monthly_rent=3000)
@@ -0,0 +1,69 @@
+import sqlite3
+from datetime import datetime, timedelta
+
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from api.models import ListingSignatureBand, RentalListing, RentalListingArchive
+from api.services.dedup import assign_canonical_ids
+from api.services.generation import bump_generation
+from api.services.read_snapshot import publish
+from api.services.retention import archive_inactive_listings
+
+NOW = datetime(2026, 3, 1)
+
+
+def listing(listing_id, is_active, last_seen_days_ago):
+    return RentalListing(
+        id=listing_id,
+        address=f"{listing_id} 1",
+        rooms=2,
+        sqm=50,
+        price=6000,
+        first_seen=NOW - timedelta(days=90),
+        last_seen=NOW - timedelta(days=last_seen_days_ago),
+        is_active=is_active,
+        days_on_market=10,
+    )
+
+
+def test_archives_only_long_inactive_listings():
+    engine = create_engine("sqlite://", echo=False)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        listings = [
+            listing("live", True, 0),
+            listing("recently-gone", False, 5),
+            listing("long-gone", False, 45),
+        ]
+        session.add_all(listings)
+        assign_canonical_ids(session, listings)
+        session.commit()
+
+        assert archive_inactive_listings(session, older_than_days=30, now=NOW) == 1
+        assert archive_inactive_listings(session, older_than_days=30, now=NOW) == 0
+
+        remaining = set(session.exec(select(RentalListing.id)).all())
+        assert remaining == {"live", "recently-gone"}
+        summary = session.get(RentalListingArchive, "long-gone")
+        assert summary.final_price == 6000
+        assert summary.days_on_market == 45  # first to last sighting
+        bands = session.exec(select(ListingSignatureBand.listing_id).distinct()).all()
+        assert set(bands) == remaining
+
+
+def test_archiving_publishes_a_snapshot_without_the_rows(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'live.db'}")
+    SQLModel.metadata.create_all(engine)
+    out = tmp_path / "snapshots"
+    with Session(engine) as session:
+        session.add_all([listing("live", True, 0), listing("long-gone", False, 45)])
+        bump_generation(session, "test")
+        session.commit()
+    first = publish(engine, out)
+
+    with Session(engine) as session:
+        archive_inactive_listings(session, older_than_days=30, now=NOW)
+    second = publish(engine, out)
+    assert second["built"] and second["generation"] > first["generation"]
+    with sqlite3.connect(out / second["file"]) as conn:
+        assert conn.execute("SELECT id FROM rental_listing").fetchall() == [("live",)]
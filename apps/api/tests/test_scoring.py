@@ -4,6 +4,10 @@ import pytest
 from sqlmodel import Session, SQLModel, create_engine
 
 from api.models import CBSRentStat, Neighborhood, RentalListing
+from api.services.amenities import Amenity
+from api.services.cbs_reference import get_cbs_reference
+from api.services.comparables import ComparableQuery, match_comparables
+from api.services.price_sketches import rebuild_sketches
 from api.services.rent_scorer import score_rent
 
 
@@ -49,6 +53,7 @@ def session():
             )
         )
 
+        rebuild_sketches(session)
         session.commit()
         yield session
 
@@ -77,3 +82,101 @@ def test_fallback_to_cbs(session):
     # Should still return a result using CBS data
     assert result["score"] in ("below_market", "at_market", "above_market")
     assert result["market_avg"] == 6500  # CBS fallback
+
+
+def test_sparse_bucket_widens_to_adjacent_rooms(session):
+    """1 room has no listings in the half-room window, so 2-room sketches join in."""
+    result = score_rent("florentin", rooms=1, sqm=35, monthly_rent=5200, session=session)
+    assert result["market_avg"] == 6600  # mean of the 2-room comps, not CBS
+    assert result["score"] == "below_market"
+
+
+def test_sparse_bucket_merges_nearby_neighborhood(session):
+    session.add(
+        Neighborhood(
+            id="neve-tzedek",
+            name_en="Neve Tzedek",
+            name_he="\u05e0\u05d5\u05d5\u05d4 \u05e6\u05d3\u05e7",
+            lat=32.060,
+            lng=34.766,
+        )
+    )
+    session.commit()
+    result = score_rent("neve-tzedek", rooms=2, sqm=50, monthly_rent=8200, session=session)
+    assert result["market_avg"] == 6600  # Florentin is ~0.5km away
+    assert result["score"] == "above_market"
+
+
+def test_cbs_fallback_interpolates_room_counts(session):
+    session.add(
+        CBSRentStat(
+            city="\u05ea\u05dc \u05d0\u05d1\u05d9\u05d1-\u05d9\u05e4\u05d5",
+            rooms=3,
+            avg_rent=8500,
+            period="2025-Q4",
+            tenant_type="all",
+        )
+    )
+    session.commit()
+    get_cbs_reference(session).load(session)
+    result = score_rent("old-north", rooms=2.5, sqm=60, monthly_rent=7500, session=session)
+    assert result["market_avg"] == 7500  # halfway between the 2- and 3-room averages
+
+
+def test_required_amenities_filter_comparables(session):
+    mamad_elevator = Amenity.MAMAD | Amenity.ELEVATOR
+    for i, price in enumerate([9000, 9200, 9400, 9600, 9800]):
+        session.add(
+            RentalListing(
+                id=f"test-amenity-{i}",
+                neighborhood_id="florentin",
+                rooms=2,
+                sqm=50,
+                price=price,
+                amenities=mamad_elevator | (Amenity.PARKING if i % 2 else 0),
+                is_active=True,
+            )
+        )
+    session.commit()
+
+    filtered = score_rent(
+        "florentin", rooms=2, sqm=50, monthly_rent=9400, session=session, amenities=mamad_elevator
+    )
+    assert filtered["market_avg"] == 9400
+    assert filtered["score"] == "at_market"
+
+    # Too few listings with parking as well: falls back to all comparables
+    fallback = score_rent(
+        "florentin",
+        rooms=2,
+        sqm=50,
+        monthly_rent=9400,
+        session=session,
+        amenities=mamad_elevator | Amenity.PARKING,
+    )
+    assert fallback["score"] == "above_market"
+
+    query = ComparableQuery("florentin", 2, 50, amenities=mamad_elevator)
+    assert match_comparables(session, query)[1] is True
+    query = ComparableQuery("florentin", 2, 50, amenities=mamad_elevator | Amenity.PARKING)
+    comparables, applied = match_comparables(session, query)
+    assert not applied
+    assert len(comparables) >= 10
+
+
+def test_nearest_comparables_match_apartment_size(session):
+    for i, price in enumerate([11500, 12000, 12500, 11800, 12200]):
+        session.add(
+            RentalListing(
+                id=f"test-large-{i}",
+                neighborhood_id="florentin",
+                rooms=2,
+                sqm=100,
+                price=price,
+                is_active=True,
+            )
+        )
+    session.commit()
+    result = score_rent("florentin", rooms=2, sqm=100, monthly_rent=12000, session=session)
+    assert result["market_avg"] == 12000  # the 50 sqm listings are too far in size
+    assert result["score"] == "at_market"
@@ -0,0 +1,128 @@
+import time
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from sqlmodel import Session, SQLModel, create_engine, func, select
+
+from api.loadtest.fake_upstream import FakeUpstream, UpstreamConfig, load_fixtures
+from api.models import CBSRentStat, RentalListing, SaleTransaction
+from api.scrapers import base
+from api.scrapers.base import fetch_json
+from api.scrapers.cbs import CBSScraper
+from api.scrapers.nadlan import NadlanScraper
+from api.scrapers.yad2 import Yad2Scraper
+from api.seed import seed_neighborhoods
+
+
+@pytest.fixture
+def slept(monkeypatch):
+    """Delays fetch_json asked for; each really waits a quarter as long."""
+    delays = []
+
+    def sleep(seconds):
+        delays.append(seconds)
+        time.sleep(seconds / 4)
+
+    monkeypatch.setattr(base, "time", SimpleNamespace(sleep=sleep))
+    return delays
+
+
+@pytest.fixture
+def upstream(request):
+    server = FakeUpstream(UpstreamConfig(**getattr(request, "param", {}))).start()
+    yield server
+    server.stop()
+
+
+def count(session, model):
+    return session.exec(select(func.count()).select_from(model)).one()
+
+
+@pytest.mark.parametrize(
+    "upstream", [{"rate_limit_rps": 3, "retry_after_seconds": 2}], indirect=True
+)
+def test_rate_limited_requests_wait_for_retry_after(upstream, slept):
+    with httpx.Client(base_url=upstream.url_for("yad2")) as client:
+        for _ in range(3):
+            client.get("", params={"page": 1})  # spend the bucket
+        body = fetch_json(client, params={"page": 1})
+
+    assert len(body["items"]) == len(load_fixtures()["yad2"])
+    assert slept == [2.0]
+    assert upstream.stats["rate_limited"] == 1
+
+
+@pytest.mark.parametrize("upstream", [{"error_rate": 1.0}], indirect=True)
+def test_server_errors_back_off_then_raise(upstream, slept):
+    with httpx.Client(base_url=upstream.url_for("nadlan")) as client:
+        with pytest.raises(httpx.HTTPStatusError) as error:
+            fetch_json(client, retries=3, backoff=0.1)
+
+    assert error.value.response.status_code == 503
+    assert slept == [0.1, 0.2, 0.4]
+    assert upstream.stats["requests"] == 4
+
+
+def test_client_errors_are_not_retried(upstream, slept):
+    with httpx.Client(base_url=f"{upstream.base_url}/nowhere") as client:
+        with pytest.raises(httpx.HTTPStatusError):
+            fetch_json(client)
+
+    assert slept == []
+    assert upstream.stats["requests"] == 1
+
+
+def test_transport_errors_are_retried(upstream, slept):
+    url = upstream.url_for("cbs")
+    upstream.stop()
+    with httpx.Client(base_url=url) as client:
+        with pytest.raises(httpx.TransportError):
+            fetch_json(client, retries=2, backoff=0.1)
+
+    assert slept == [0.1, 0.2]
+
+
+@pytest.mark.parametrize("upstream", [{"pages": 2}], indirect=True)
+def test_ingest_fetched_pages(upstream):
+    engine = create_engine("sqlite://", echo=False)
+    SQLModel.metadata.create_all(engine)
+    fixtures = load_fixtures()
+
+    def fetch_pages(source):
+        with httpx.Client(base_url=upstream.url_for(source)) as client:
+            first = fetch_json(client, params={"page": 1})
+            pages = [first] + [
+                fetch_json(client, params={"page": page})
+                for page in range(2, first["total_pages"] + 1)
+            ]
+        return [item for page in pages for item in page["items"]]
+
+    with Session(engine) as session:
+        seed_neighborhoods(session)
+        listings = fetch_pages("yad2")
+        assert Yad2Scraper().ingest_listings(session, listings) == 2 * len(fixtures["yad2"])
+        transactions = fetch_pages("nadlan")
+        assert NadlanScraper().ingest_transactions(session, transactions) == 2 * len(
+            fixtures["nadlan"]
+        )
+        # CBS publishes one unpaginated table
+        assert CBSScraper().ingest_rent_survey(session, fetch_pages("cbs")) == len(fixtures["cbs"])
+
+        assert count(session, RentalListing) == 2 * len(fixtures["yad2"])
+        assert count(session, SaleTransaction) == 2 * len(fixtures["nadlan"])
+        assert count(session, CBSRentStat) == len(fixtures["cbs"])
+        # Second-page listings are the fixture again under page-suffixed ids
+        first = fixtures["yad2"][0]
+        repeat = session.get(RentalListing, f"{first['id']}-p2")
+        assert (repeat.rooms, repeat.sqm, repeat.address) == (
+            first["rooms"],
+            first["sqm"],
+            first["address"],
+        )
+        assert repeat.neighborhood_id == session.get(RentalListing, first["id"]).neighborhood_id
+
+        # A scrape missing the second page deactivates its listings
+        Yad2Scraper().ingest_listings(session, listings[: len(fixtures["yad2"])])
+        active = select(func.count()).where(RentalListing.is_active == True)  # noqa: E712
+        assert session.exec(active).one() == len(fixtures["yad2"])
@@ -0,0 +1,71 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from api.models import RentalListing
+from api.services.slow_queries import SlowQueryLog, normalize_sql, param_shape
+
+
+def test_normalize_sql_collapses_literals_and_lists():
+    assert normalize_sql("SELECT *\n  FROM t WHERE a = 'x''y' AND b IN (?, ?, ?) LIMIT 10") == (
+        "SELECT * FROM t WHERE a = ? AND b IN (?, ...) LIMIT ?"
+    )
+    assert normalize_sql("INSERT INTO t1 VALUES (?, ?), (?, ?), (?, ?)") == (
+        "INSERT INTO t1 VALUES (?, ...), ..."
+    )
+
+
+def test_param_shape():
+    assert param_shape(("a", "b", 3, None, 2.5)) == "(str x2, int, null, float)"
+    assert param_shape({"id": "x"}) == "{id: str}"
+    assert param_shape([("a", 1), ("b", 2)], executemany=True) == "2 x (str, int)"
+
+
+def test_aggregates_shapes_with_query_plan():
+    engine = create_engine("sqlite://", echo=False)
+    SQLModel.metadata.create_all(engine)
+    log = SlowQueryLog(threshold_ms=0)
+    log.install(engine)
+    with Session(engine) as session:
+        for ids in (["a"], ["a", "b"], ["a", "b", "c"]):
+            session.exec(select(RentalListing).where(RentalListing.id.in_(ids))).all()
+        session.exec(select(RentalListing).where(RentalListing.price > 5000)).all()
+        session.exec(text("DELETE FROM rental_listing WHERE price < 0"))
+
+    report = log.report(limit=100, sort="count")
+    by_sql = {entry["sql"]: entry for entry in report}
+    in_query = next(e for sql, e in by_sql.items() if "IN (?, ...)" in sql)
+    assert in_query["count"] == 3
+    assert in_query["param_shapes"] == ["(str)", "(str x2)", "(str x3)"]
+    assert any("USING INDEX" in line for line in in_query["plan"])
+
+    scan = next(e for sql, e in by_sql.items() if "rental_listing.price > ?" in sql)
+    assert any(line.startswith("SCAN") for line in scan["plan"])
+    delete = next(e for sql, e in by_sql.items() if sql.startswith("DELETE"))
+    assert delete["rows"] == 0
+
+    assert log.report(limit=1, sort="count") == report[:1]
+
+
+def test_keeps_the_costliest_shapes():
+    engine = create_engine("sqlite://", echo=False)
+    log = SlowQueryLog(threshold_ms=0, max_shapes=2)
+    log.install(engine)
+    with engine.connect() as conn:
+        for table in ("a", "b", "c"):
+            conn.execute(text(f"SELECT '{table}' AS {table}"))
+    assert len(log.report()) == 2
+
+
+def test_failed_statements_leave_no_timing_state():
+    engine = create_engine("sqlite://", echo=False)
+    log = SlowQueryLog(threshold_ms=0)
+    log.install(engine)
+    with engine.connect() as conn:
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                conn.execute(text("SELECT * FROM missing_table"))
+        conn.execute(text("SELECT 1"))
+        assert not any(key.startswith("slow_query") for key in conn.info)
+    assert [entry["count"] for entry in log.report()] == [1]
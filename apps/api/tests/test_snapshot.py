@@ -0,0 +1,80 @@
+import json
+from datetime import date, datetime
+
+from sqlmodel import Session, SQLModel, create_engine
+
+from api.models import Neighborhood, RentalListing
+from api.services.generation import bump_generation
+from api.services.price_sketches import rebuild_sketches
+from api.services.snapshot import export_snapshot
+
+TODAY = date(2026, 3, 1)
+
+
+def make_db():
+    engine = create_engine("sqlite://", echo=False)
+    SQLModel.metadata.create_all(engine)
+    session = Session(engine)
+    for hood in ("florentin", "ajami"):
+        session.add(Neighborhood(id=hood, name_en=hood.title(), name_he="", lat=32.05, lng=34.77))
+        session.add(
+            RentalListing(
+                id=f"{hood}-1",
+                neighborhood_id=hood,
+                rooms=2,
+                price=6000,
+                first_seen=datetime(2026, 1, 1),
+                last_seen=datetime(2026, 1, 1),
+            )
+        )
+    session.flush()
+    rebuild_sketches(session)
+    bump_generation(session, "neighborhoods", {"neighborhoods": ["ajami", "florentin"]})
+    session.commit()
+    return session
+
+
+def test_incremental_export_only_rewrites_changed_neighborhoods(tmp_path):
+    session = make_db()
+    first = export_snapshot(session, tmp_path, today=TODAY)
+    assert set(first["written"]) == {
+        "neighborhoods",
+        "trends",
+        "stats",
+        "neighborhoods/ajami",
+        "neighborhoods/florentin",
+    }
+    manifest = json.loads((tmp_path / "manifest.json").read_text())
+    shard = json.loads((tmp_path / manifest["shards"]["neighborhoods/ajami"]).read_text())
+    assert [listing["id"] for listing in shard["listings"]] == ["ajami-1"]
+    [distribution] = shard["distributions"]
+    assert (distribution["rooms"], distribution["count"]) == (2.0, 1)
+    assert distribution["histogram"]["bin_width"] == shard["bin_width"]
+    assert sum(distribution["histogram"]["counts"]) == 1
+
+    assert export_snapshot(session, tmp_path, today=TODAY)["written"] == []
+
+    session.get(RentalListing, "florentin-1").price = 6500
+    bump_generation(session, "yad2", {"repriced": 1, "neighborhoods": ["florentin"]})
+    session.commit()
+    second = export_snapshot(session, tmp_path, today=TODAY)
+    assert second["written"] == ["neighborhoods/florentin"]
+    assert second["pruned"] == 0  # the previous manifest's files are kept one round
+
+    third = export_snapshot(session, tmp_path, today=TODAY, full=True)
+    assert third["written"] == []
+    assert third["pruned"] == 1
+    files = {p.relative_to(tmp_path).as_posix() for p in tmp_path.rglob("*.json")}
+    manifest = json.loads((tmp_path / "manifest.json").read_text())
+    assert files == {"manifest.json", *manifest["shards"].values()}
+
+
+def test_sources_without_neighborhoods_rebuild_every_shard(tmp_path):
+    session = make_db()
+    export_snapshot(session, tmp_path, today=TODAY)
+    for listing_id in ("florentin-1", "ajami-1"):
+        session.get(RentalListing, listing_id).sqm = 50
+    bump_generation(session, "dedup", {"groups": 2})
+    session.commit()
+    written = export_snapshot(session, tmp_path, today=TODAY)["written"]
+    assert sorted(written) == ["neighborhoods/ajami", "neighborhoods/florentin"]
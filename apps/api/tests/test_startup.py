@@ -0,0 +1,82 @@
+import asyncio
+import subprocess
+import sys
+
+import httpx
+from sqlalchemy import inspect, text
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine
+
+from api import database
+from api.cities import HAIFA, TEL_AVIV
+from api.compression import response_cache
+from api.config import settings
+from api.main import app
+from api.migrations import MIGRATIONS, schema_version
+from api.seed import seed_neighborhoods
+from api.warmup import Warmup
+
+
+def test_schema_setup_is_skipped_while_the_fingerprint_matches(monkeypatch, tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'city.db'}")
+    monkeypatch.setitem(database._engines, "haifa", engine)
+
+    assert database.create_db_and_tables("haifa") == [name for name, _ in MIGRATIONS]
+    with engine.begin() as conn:
+        assert conn.exec_driver_sql("PRAGMA user_version").scalar() == schema_version()
+        conn.execute(text("DROP TABLE neighborhood"))
+    assert database.create_db_and_tables("haifa") == []
+    assert "neighborhood" not in inspect(engine).get_table_names()
+
+    # A different fingerprint, e.g. after a model change, sets the schema up again
+    with engine.begin() as conn:
+        conn.exec_driver_sql("PRAGMA user_version = 0")
+    assert database.create_db_and_tables("haifa") == []
+    assert "neighborhood" in inspect(engine).get_table_names()
+
+
+def test_serving_does_not_import_scrapers():
+    loaded = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, api.main; print(' '.join(sorted(sys.modules)))",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.split()
+    for module in ("api.scrapers", "api.profiling", "httpx", "playwright"):
+        assert module not in loaded
+
+
+def test_ready_once_caches_are_warm(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "read_snapshot_dir", str(tmp_path))  # nothing published
+    for city in (TEL_AVIV, HAIFA):
+        engine = create_engine(
+            "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+        )
+        SQLModel.metadata.create_all(engine)
+        with Session(engine) as session:
+            seed_neighborhoods(session, city)
+        monkeypatch.setitem(database._engines, city.id, engine)
+    warmup = Warmup()
+    monkeypatch.setattr("api.main.warmup", warmup)
+    response_cache.clear()
+
+    async def ready():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/api/ready")
+
+    response = asyncio.run(ready())
+    assert response.status_code == 503
+    assert response.json()["status"] == "starting"
+
+    warmup.run([TEL_AVIV, HAIFA])
+    response = asyncio.run(ready())
+    assert response.status_code == 200
+    assert set(response.json()["cities_ms"]) == {"tel-aviv", "haifa"}
+    assert response.json()["failed"] == []
+    # Both cities' neighborhood lists and overviews are already cached
+    assert len(response_cache) == 4
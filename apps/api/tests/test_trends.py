@@ -0,0 +1,103 @@
+import asyncio
+from datetime import date, timedelta
+
+import httpx
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine
+
+from api import database
+from api.compression import response_cache
+from api.config import settings
+from api.main import app
+from api.scrapers.cbs import CBSScraper
+from api.services.trends import get_trend_series, lttb, months_back
+
+
+def test_lttb_keeps_endpoints_and_spikes():
+    points = [(float(x), 0.0) for x in range(100)]
+    points[37] = (37.0, 50.0)
+    kept = lttb(points, 10)
+    assert len(kept) == 10
+    assert kept[0] == 0 and kept[-1] == 99
+    assert 37 in kept
+    assert lttb(points[:5], 10) == [0, 1, 2, 3, 4]
+
+
+def test_months_back_uses_calendar_months():
+    assert months_back(date(2026, 3, 31), 2) == date(2026, 1, 1)
+    assert months_back(date(2026, 1, 15), 13) == date(2024, 12, 1)
+
+
+def test_series_from_rollups():
+    engine = create_engine("sqlite://", echo=False)
+    SQLModel.metadata.create_all(engine)
+    scraper = CBSScraper()
+    daily = [
+        {"date": date(2024, 1, 1) + timedelta(days=i), "index_value": 100.0 + i, "yoy_change": 5.0}
+        for i in range(366)
+    ]
+    with Session(engine) as session:
+        scraper.ingest_rent_index(session, daily)
+
+        quarters = get_trend_series(session, "quarter")
+        assert [q["date"] for q in quarters] == [
+            "2024-01-01",
+            "2024-04-01",
+            "2024-07-01",
+            "2024-10-01",
+        ]
+        assert quarters[0]["index"] == 145.0  # mean of days 0..90
+
+        months = get_trend_series(session, "month", date(2024, 3, 15), date(2024, 6, 30))
+        assert [m["date"] for m in months] == [
+            "2024-03-01",
+            "2024-04-01",
+            "2024-05-01",
+            "2024-06-01",
+        ]
+        assert len(get_trend_series(session, "month", max_points=5)) == 5
+
+        # A new ingest is a new generation, so cached series are not reused
+        assert len(get_trend_series(session, "year")) == 1
+        scraper.ingest_rent_index(
+            session, [{"date": date(2025, 2, 1), "index_value": 500.0, "yoy_change": 6.0}]
+        )
+        years = get_trend_series(session, "year")
+        assert [(y["date"], y["index"]) for y in years][-1] == ("2025-01-01", 500.0)
+
+
+def test_default_range_moves_with_the_month(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "read_snapshot_dir", str(tmp_path))  # nothing published
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    SQLModel.metadata.create_all(engine)
+    daily = [
+        {"date": date(2024, 1, 1) + timedelta(days=i), "index_value": 100.0, "yoy_change": 5.0}
+        for i in range(366)
+    ]
+    with Session(engine) as session:
+        CBSScraper().ingest_rent_index(session, daily)
+    monkeypatch.setitem(database._engines, settings.default_city, engine)
+    response_cache.clear()
+
+    today = date(2024, 6, 30)
+
+    class FakeDate(date):
+        @classmethod
+        def today(cls):
+            return today
+
+    monkeypatch.setattr("api.routers.stats.date", FakeDate)
+
+    def first_month():
+        async def run():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await client.get("/api/stats/trends?months=2")
+
+        return asyncio.run(run()).json()[0]["date"]
+
+    assert first_month() == "2024-05-01"
+    today = date(2024, 7, 1)
+    assert first_month() == "2024-06-01"